@@ -0,0 +1,203 @@
+"""Load test of python -m crm api: concurrent keep-alive connections getting
+clients by id and streaming the list of the clients, against one
+python -m crm client get-client process per request.
+
+python -m benchmarks.api_load --clients 20000 --connections 16 --requests 5000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from peewee import SqliteDatabase, chunked
+from crm import audit
+from crm.auth import encode_token
+from crm.hashing import hash_password
+from crm.models.audit_entry import AuditEntry
+from crm.models.client import Client
+from crm.models.permission import Permission
+from crm.models.permission_epoch import PermissionEpoch
+from crm.models.role import Role
+from crm.models.rolepermission import RolePermission
+from crm.models.user import User
+
+MODELS = [Role, PermissionEpoch, User, Client, Permission, RolePermission, AuditEntry]
+# The commands run in a temporary directory, crm is imported from here
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(path, clients):
+    """Function to create an admin (admin@bench, admin) allowed to read the
+    clients, and clients clients"""
+    db = SqliteDatabase(path)
+    db.bind(MODELS)
+    db.create_tables(MODELS)
+    with db.atomic():
+        admin = Role.create(name="Admin")
+        for name in ("get-client", "list-client"):
+            RolePermission.create(role=admin, permission=Permission.create(name=name))
+        user = User.create(
+            name="Admin",
+            email="admin@bench",
+            password=hash_password("admin", rounds=4),
+            role=admin,
+        )
+        for ids in chunked(range(clients), 5000):
+            Client.insert_many(
+                {
+                    "first_name": f"first{i}",
+                    "last_name": f"last{i}",
+                    "email": f"client{i}@bench",
+                    "phone": "0123456",
+                    "company_name": "co",
+                    "epic_events_contact": user.id,
+                }
+                for i in ids
+            ).execute()
+        token = encode_token(user.id, user.claims())
+    audit.flush()
+    db.close()
+    return token
+
+
+async def get(reader, writer, path, token):
+    """Function to send a GET on a keep-alive connection, returns the body size"""
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: bench\r\nAuthorization: Bearer {token}\r\n\r\n".encode()
+    )
+    head = (await reader.readuntil(b"\r\n\r\n")).decode().lower()
+    if not head.startswith("http/1.1 200"):
+        raise RuntimeError(f"GET {path}: {head.splitlines()[0]}")
+    if "transfer-encoding: chunked" in head:
+        size = 0
+        while chunk := int((await reader.readuntil(b"\r\n"))[:-2], 16):
+            size += len(await reader.readexactly(chunk + 2)) - 2
+        await reader.readexactly(2)
+        return size
+    length = int(head.split("content-length: ")[1].split("\r\n")[0])
+    return len(await reader.readexactly(length))
+
+
+async def load(port, token, connections, requests, clients):
+    """Function to send requests GET /clients/<id> over connections
+    connections. Returns (requests per second, latencies in ms)"""
+    latencies = []
+
+    async def worker(count):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for _ in range(count):
+            start = time.perf_counter()
+            await get(reader, writer, f"/clients/{random.randint(1, clients)}", token)
+            latencies.append((time.perf_counter() - start) * 1000)
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(requests // connections) for _ in range(connections)))
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+async def stream(port, token, clients):
+    """Function to read every client with GET /clients pages of 10000 rows"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    start = time.perf_counter()
+    after_id, size = 0, 0
+    while after_id < clients:
+        size += await get(
+            reader, writer, f"/clients?after_id={after_id}&limit=10000", token
+        )
+        after_id += 10000
+    writer.close()
+    return time.perf_counter() - start, size
+
+
+def wait_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The api has stopped")
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("The api is not listening")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=20000)
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--cli-requests", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.sqlite3")
+        env = {
+            **os.environ,
+            "CRM_DATABASE_URL": f"sqlite+pool:///{path}",
+            "CRM_DATABASE": path,
+            "PYTHONPATH": ROOT,
+        }
+        token = seed(path, args.clients)
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "crm", "api", "--port", str(port)],
+            env=env,
+            cwd=directory,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_port(port, server)
+            rate, latencies = asyncio.run(
+                load(port, token, args.connections, args.requests, args.clients)
+            )
+            quantiles = statistics.quantiles(latencies, n=100)
+            print(
+                f"api GET /clients/<id>, {args.connections} connections: "
+                f"{rate:,.0f} requests/s, p50 {quantiles[49]:.2f} ms, "
+                f"p99 {quantiles[98]:.2f} ms"
+            )
+            elapsed, size = asyncio.run(stream(port, token, args.clients))
+            print(
+                f"api GET /clients, {args.clients} clients streamed in "
+                f"{elapsed * 1000:.0f} ms ({size / elapsed / 1e6:.1f} MB/s)"
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        with open(os.path.join(directory, "token.txt"), "w") as token_file:
+            token_file.write(token)
+        durations = []
+        for _ in range(args.cli_requests):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, "-m", "crm", "client", "get-client", "-i", "1"],
+                env=env,
+                cwd=directory,
+                capture_output=True,
+                check=True,
+            )
+            durations.append((time.perf_counter() - start) * 1000)
+        print(
+            f"cli python -m crm client get-client, one process per request: "
+            f"{1000 / statistics.median(durations):,.1f} requests/s, "
+            f"{statistics.median(durations):.0f} ms each"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Benchmark of python -m crm event auto-assign: the loading of the events,
+the planning of the assignment and its writing, in one transaction.
+Half of the events of the calendar benchmark are without support contact.
+
+python -m benchmarks.assign_throughput --rows 200000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from peewee import SqliteDatabase
+from crm import audit
+from crm.assignment import load_assignment_data, plan_assignments, save_assignments
+from benchmarks.calendar_latency import MODELS, seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--supports", type=int, default=500)
+    parser.add_argument("--days", type=int, default=5 * 365)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = SqliteDatabase(os.path.join(directory, "bench.sqlite3"))
+        db.bind(MODELS)
+        db.create_tables(MODELS[:-1])
+        with db.atomic():
+            seed(args.rows, args.supports, args.days)
+        with db.atomic():
+            start = time.perf_counter()
+            events, supports, bookings = load_assignment_data()
+            loaded = time.perf_counter()
+            plan, left = plan_assignments(events, supports, bookings)
+            planned = time.perf_counter()
+            updated = save_assignments(plan)
+            saved = time.perf_counter()
+        print(
+            f"{len(events)} events without support, {len(supports)} supports: "
+            f"{updated} assigned, {len(left)} left"
+        )
+        print(
+            f"load {loaded - start:6.2f} s   plan {planned - loaded:6.2f} s   "
+            f"save {saved - planned:6.2f} s   total {saved - start:6.2f} s"
+        )
+        audit.flush()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark of the cost of the audit journal on the hot path: updates of one
+client per transaction, as update-client-direct does, without journal, with
+the buffered journal (written by batches of CRM_AUDIT_BATCH changes) and with
+one journal INSERT per update. Fails when the buffered journal costs more
+than --budget of the time of the updates.
+
+python -m benchmarks.audit_overhead --updates 5000 --budget 0.25
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from peewee import Model, SqliteDatabase
+from crm import audit
+from crm.models.audit_entry import AuditEntry, create_audit_journal
+from crm.models.client import Client
+from crm.models.role import Role
+from crm.models.user import User
+
+MODELS = [Role, User, Client, AuditEntry]
+
+
+def seed(rows):
+    Role.insert(name="Commercial").execute()
+    User.insert(name="Com", email="com@bench", password="x", role=1).execute()
+    Client.insert_many(
+        {
+            "first_name": f"first{i}",
+            "last_name": f"last{i}",
+            "email": f"client{i}@bench",
+            "phone": "0123456",
+            "company_name": "co",
+            "epic_events_contact": 1,
+        }
+        for i in range(rows)
+    ).execute()
+
+
+def timed_updates(db, clients, save):
+    start = time.perf_counter()
+    for i, client in enumerate(clients):
+        client.company_name = f"co{i}"
+        with db.atomic():
+            save(client)
+    audit.flush()
+    return time.perf_counter() - start
+
+
+def save_and_insert(client):
+    # The journal written by the update, in its transaction
+    changes = client.audit_changes()
+    Model.save(client)
+    audit.record("client", client.id, "update", changes)
+    audit.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--budget", type=float, default=0.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = SqliteDatabase(os.path.join(directory, "bench.sqlite3"))
+        db.bind(MODELS)
+        db.create_tables(MODELS[:-1])
+        create_audit_journal(db)
+        with db.atomic():
+            seed(args.updates)
+        clients = list(Client.select())
+
+        results = {}
+        for name, save in (
+            ("no journal", Model.save),
+            ("buffered journal", Client.save),
+            ("insert per update", save_and_insert),
+        ):
+            elapsed = timed_updates(db, clients, save)
+            results[name] = elapsed
+            print(f"{name:18} {args.updates / elapsed:10,.0f} updates/s")
+        db.close()
+
+    overhead = results["buffered journal"] / results["no journal"] - 1
+    print(f"buffered journal overhead {overhead:.1%} (budget {args.budget:.0%})")
+    if overhead > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
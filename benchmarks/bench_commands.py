@@ -0,0 +1,187 @@
+"""pytest-benchmark suite of the commands on the synthetic datasets of
+crm.dataset: every list-*, get-*, create-* and update-*-direct command is run
+through CliRunner at each scale of CRM_BENCH_SCALES (number of clients, 1000
+by default). The number of queries of a run and the peak RSS of the process
+are in the extra info of each benchmark. pytest-benchmark is in requirements.txt.
+
+CRM_BENCH_SCALES=1e3,1e4,1e5 python -m pytest benchmarks/bench_commands.py \
+    --benchmark-group-by=func --benchmark-columns=median,ops
+"""
+
+import itertools
+import os
+import resource
+from unittest.mock import patch
+import pytest
+from peewee import JOIN
+from typer.testing import CliRunner
+from crm import audit
+from crm.__main__ import app
+from crm.config import make_database
+from crm.dataset import MODELS, check_scale, generate
+from crm.models.contract import Contract
+from crm.models.event import Event
+from crm.models.role import Role
+from crm.models.user import User
+from crm.profiler import profiled
+
+pytest.importorskip("pytest_benchmark")
+
+SCALES = [
+    check_scale(scale) for scale in os.getenv("CRM_BENCH_SCALES", "1e3").split(",")
+]
+# Rounds of the commands writing rows or listing every row
+WRITE_ROUNDS = 20
+LIST_ROUNDS = 3
+
+runner = CliRunner()
+unique = itertools.count()
+
+
+@pytest.fixture(scope="module", params=SCALES, ids=lambda scale: f"scale={scale}")
+def dataset(request, tmp_path_factory):
+    """Database of one scale step, bound to the models while its benchmarks run"""
+    path = tmp_path_factory.mktemp("bench") / "bench.sqlite3"
+    database = make_database(str(path))
+    database.bind(MODELS)
+    generate(database, request.param)
+    yield request.param
+    audit.flush()
+    database.close()
+
+
+def user_of_role(role):
+    return User.select().join(Role).where(Role.name == role).first()
+
+
+def invoke(user, args, input=None):
+    with patch("crm.auth.get_authenticated_user", return_value=user):
+        result = runner.invoke(app, [str(arg) for arg in args], input=input)
+    assert result.exit_code == 0 and "rror" not in result.output, result.output
+    return result
+
+
+def run_command(benchmark, scale, user, make_args, input=None, rounds=None):
+    """Function to time the command of make_args() (new arguments for each
+    run) and to report its queries and the peak RSS"""
+    with profiled(User._meta.database) as profile:
+        invoke(user, make_args(), input)
+    if rounds:
+        benchmark.pedantic(
+            lambda: invoke(user, make_args(), input), rounds=rounds, iterations=1
+        )
+    else:
+        benchmark(lambda: invoke(user, make_args(), input))
+    benchmark.extra_info["scale"] = scale
+    benchmark.extra_info["queries"] = len(profile.statements)
+    # Kilobytes on Linux: the peak of the process up to this scale step
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    benchmark.extra_info["peak_rss_mib"] = round(peak / 1024, 1)
+
+
+@pytest.mark.parametrize("model", ["user", "client", "contract", "event"])
+def test_list(benchmark, dataset, model):
+    args = [model, f"list-{model}s"]
+    run_command(
+        benchmark, dataset, user_of_role("Admin"), lambda: args, rounds=LIST_ROUNDS
+    )
+
+
+@pytest.mark.parametrize("model", ["user", "client", "contract", "event"])
+def test_get(benchmark, dataset, model):
+    # A row in the middle of the table
+    row_id = Event.select().count() // 2 if model == "event" else dataset // 2
+    row_id = min(row_id, User.select().count()) if model == "user" else row_id
+    args = [model, f"get-{model}", "-i", row_id]
+    run_command(benchmark, dataset, user_of_role("Admin"), lambda: args)
+
+
+def test_create_user(benchmark, dataset):
+    def args():
+        n = next(unique)
+        return ["user", "create-user", "-n", f"new{n}", "-e", f"new{n}@bench.crm"] + [
+            "-p",
+            "bench",
+        ]
+
+    run_command(
+        benchmark,
+        dataset,
+        user_of_role("Admin"),
+        args,
+        input="Commercial\n",
+        rounds=WRITE_ROUNDS,
+    )
+
+
+def test_create_client(benchmark, dataset):
+    def args():
+        n = next(unique)
+        return ["client", "create-client", "-f", "New", "-l", f"Client{n}"] + [
+            "-e",
+            f"new{n}@client.crm",
+            "-p",
+            "0600000000",
+            "-c",
+            "New Co",
+        ]
+
+    commercial = user_of_role("Commercial")
+    run_command(benchmark, dataset, commercial, args, rounds=WRITE_ROUNDS)
+
+
+def test_create_contract(benchmark, dataset):
+    def args():
+        client = next(unique) % dataset + 1
+        return ["contract", "create-contract", "-i", client, "-t", 1000, "-r", 500]
+
+    run_command(benchmark, dataset, user_of_role("Admin"), args, rounds=WRITE_ROUNDS)
+
+
+def test_create_event(benchmark, dataset):
+    # One event per contract: the signed contracts without event, in turn
+    contracts = iter(
+        Contract.select(Contract.id)
+        .join(Event, JOIN.LEFT_OUTER, on=(Event.contract == Contract.id))
+        .where(Contract.status == True, Event.id.is_null())  # noqa: E712
+        .order_by(Contract.id)
+        .limit(WRITE_ROUNDS + 1)
+        .tuples()
+    )
+
+    def args():
+        (contract,) = next(contracts)
+        return ["event", "create-event", "-na", "new event", "-l", "Paris"] + [
+            "-a",
+            100,
+            "-ic",
+            contract,
+        ]
+
+    run_command(
+        benchmark,
+        dataset,
+        user_of_role("Admin"),
+        args,
+        input="2027-01-04\n2027-01-05\n",
+        rounds=WRITE_ROUNDS,
+    )
+
+
+@pytest.mark.parametrize(
+    "model, option, value",
+    [
+        ("user", "-n", "Renamed"),
+        ("client", "-c", "Renamed Co"),
+        ("contract", "-r", 0),
+        ("event", "-no", "renamed"),
+    ],
+)
+def test_update_direct(benchmark, dataset, model, option, value):
+    rows = dataset if model != "user" else User.select().count()
+
+    def args():
+        row_id = next(unique) % rows + 1
+        return [model, f"update-{model}-direct", "-i", row_id, option, value]
+
+    run_command(benchmark, dataset, user_of_role("Admin"), args, rounds=WRITE_ROUNDS)
@@ -0,0 +1,76 @@
+"""Benchmark of python -m crm contract bulk-update: marking contracts as paid
+with one UPDATE against one get and save() per contract, as
+update-contract-direct does, each in its own transaction.
+
+python -m benchmarks.bulk_update_throughput --rows 200000 --contracts 2000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from peewee import SqliteDatabase
+from crm import audit
+from crm.models.contract import Contract
+from crm.models.receivable_summary import create_receivable_summary
+from crm.views.bulk import bulk_update, ids_in
+from benchmarks.report_latency import MODELS, seed
+
+
+def unpaid_ids(count, offset):
+    return [
+        contract_id
+        for contract_id, in Contract.select(Contract.id)
+        .where(Contract.remaining_amount > 0)
+        .order_by(Contract.id)
+        .limit(count)
+        .offset(offset)
+        .tuples()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--contracts", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--contacts", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = SqliteDatabase(os.path.join(directory, "bench.sqlite3"))
+        db.bind(MODELS)
+        db.create_tables(MODELS)
+        create_receivable_summary(db)
+        with db.atomic():
+            seed(args.rows, args.clients, args.contacts)
+
+        ids = unpaid_ids(args.contracts, 0)
+        start = time.perf_counter()
+        for contract_id in ids:
+            with db.atomic():
+                contract = Contract.get(id=contract_id)
+                contract.remaining_amount = 0
+                contract.save()
+        per_row = time.perf_counter() - start
+
+        # The first contracts are paid now: the next ones are updated
+        ids = unpaid_ids(args.contracts, 0)
+        start = time.perf_counter()
+        with db.atomic():
+            updated = bulk_update(
+                Contract,
+                [ids_in(Contract, ",".join(map(str, ids)))],
+                {Contract.remaining_amount: 0},
+            )
+        bulk = time.perf_counter() - start
+
+        print(f"{len(ids)} contracts marked as paid out of {args.rows}")
+        print(f"get + save() per contract: {per_row * 1000:8.1f} ms")
+        print(f"one UPDATE ({updated} rows):  {bulk * 1000:8.1f} ms")
+        audit.flush()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Benchmark of python -m crm event calendar and of the support contact
+conflict check: the R*Tree of the event dates against the scan of the
+event table, and the cost of its triggers on the insertion of the events.
+
+python -m benchmarks.calendar_latency --rows 200000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from peewee import SqliteDatabase, chunked
+from crm import audit
+from crm.models.audit_entry import AuditEntry
+from crm.models.client import Client
+from crm.models.contract import Contract
+from crm.models.event import Event
+from crm.models.event_span import EventSpan, create_event_span
+from crm.models.permission_epoch import PermissionEpoch
+from crm.models.role import Role
+from crm.models.user import User
+from crm.queries import calendar_conflicts, overlapping, seconds, support_conflicts
+
+MODELS = [Role, PermissionEpoch, User, Client, Contract, Event, AuditEntry, EventSpan]
+FIRST_DAY = datetime(2020, 1, 1)
+
+
+def seed(rows, supports, days):
+    """Function to insert rows events of 1 to 5 days spread over days days,
+    half of them with one of the supports contacts"""
+    random.seed(16)
+    Role.create(name="Support")
+    User.insert_many(
+        {"name": f"Sup{i}", "email": f"sup{i}@bench", "password": "x", "role": 1}
+        for i in range(supports)
+    ).execute()
+    Client.create(
+        first_name="first",
+        last_name="last",
+        email="client@bench",
+        phone="0123456",
+        company_name="co",
+        epic_events_contact=1,
+    )
+    Contract.create(client=1, total_amount=1, remaining_amount=0, commercial_contact=1)
+    start = time.perf_counter()
+    for ids in chunked(range(rows), 5000):
+        Event.insert_many(
+            {
+                "name": f"event{i}",
+                "contract": 1,
+                "start_date": (
+                    begin := FIRST_DAY + timedelta(days=random.randrange(days))
+                ),
+                "end_date": begin + timedelta(days=random.randint(1, 5)),
+                "support_contact": random.choice([None, random.randint(1, supports)]),
+                "location": f"venue{random.randrange(500)}",
+                "attendees": 100,
+                "notes": "",
+            }
+            for i in ids
+        ).execute()
+    return time.perf_counter() - start
+
+
+def scanned(query, start, end):
+    """Function to keep the events of query overlapping start - end
+    without the R*Tree"""
+    return query.where(
+        (seconds(Event.start_date) <= int(end.timestamp()))
+        & (seconds(Event.end_date) >= int(start.timestamp()))
+    )
+
+
+def timed(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--supports", type=int, default=200)
+    parser.add_argument("--days", type=int, default=5 * 365)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for triggers in (False, True):
+        with tempfile.TemporaryDirectory() as directory:
+            db = SqliteDatabase(os.path.join(directory, "bench.sqlite3"))
+            db.bind(MODELS)
+            db.create_tables(MODELS[:-1])
+            if triggers:
+                create_event_span(db)
+            with db.atomic():
+                elapsed = seed(args.rows, args.supports, args.days)
+            print(
+                f"{args.rows} events inserted {'with' if triggers else 'without'} "
+                f"the R*Tree triggers: {args.rows / elapsed:,.0f} rows/s"
+            )
+            if not triggers:
+                audit.flush()
+                db.close()
+                continue
+            start = FIRST_DAY + timedelta(days=args.days // 2)
+            week = start + timedelta(days=7)
+            event = Event.get(Event.support_contact.is_null(False))
+            cases = [
+                (
+                    "calendar of a week",
+                    lambda: list(overlapping(Event.select(), start, week)),
+                    lambda: list(scanned(Event.select(), start, week)),
+                ),
+                (
+                    "support conflict check",
+                    lambda: list(support_conflicts(event, event.support_contact)),
+                    lambda: list(
+                        scanned(Event.select(), event.start_date, event.end_date)
+                        .where(Event.support_contact == event.support_contact)
+                        .where(Event.id != event.id)
+                    ),
+                ),
+            ]
+            for name, indexed, scan in cases:
+                print(
+                    f"{name:24} R*Tree {timed(indexed, args.repeat):8.2f} ms   "
+                    f"scan {timed(scan, args.repeat):8.2f} ms"
+                )
+            conflicts = timed(lambda: calendar_conflicts(start, week), args.repeat)
+            print(f"{'conflicts of a week':24} R*Tree {conflicts:8.2f} ms")
+            audit.flush()
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
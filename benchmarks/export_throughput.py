@@ -0,0 +1,93 @@
+"""Benchmark of python -m crm export: rows/s for each format.
+
+python -m benchmarks.export_throughput --rows 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from peewee import SqliteDatabase, chunked
+from crm.models.client import Client
+from crm.models.contract import Contract
+from crm.models.event import Event
+from crm.models.role import Role
+from crm.models.user import User
+from crm.views.export import FORMATS, export, events_query
+
+MODELS = [Role, User, Client, Contract, Event]
+
+
+def seed(rows):
+    """Function to insert rows clients, contracts and events with insert_many"""
+    Role.insert_many([{"name": "Commercial"}, {"name": "Support"}]).execute()
+    User.insert_many(
+        [
+            {"name": "Com", "email": "com@bench", "password": "x", "role": 1},
+            {"name": "Sup", "email": "sup@bench", "password": "x", "role": 2},
+        ]
+    ).execute()
+    for ids in chunked(range(1, rows + 1), 1000):
+        Client.insert_many(
+            {
+                "first_name": f"first{i}",
+                "last_name": f"last{i}",
+                "email": f"client{i}@bench",
+                "phone": "0123456",
+                "company_name": f"company{i % 100}",
+                "epic_events_contact": 1,
+            }
+            for i in ids
+        ).execute()
+        Contract.insert_many(
+            {
+                "client": i,
+                "total_amount": 1000 + i,
+                "remaining_amount": i % 3 * 100,
+                "status": True,
+                "commercial_contact": 1,
+            }
+            for i in ids
+        ).execute()
+        Event.insert_many(
+            {
+                "name": f"event{i}",
+                "contract": i,
+                "start_date": "2025-10-12",
+                "end_date": "2025-10-13",
+                "location": "paris",
+                "attendees": i % 500,
+                "notes": "bench",
+                "support_contact": 2 if i % 2 else None,
+            }
+            for i in ids
+        ).execute()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = SqliteDatabase(os.path.join(directory, "bench.sqlite3"))
+        db.bind(MODELS)
+        db.create_tables(MODELS)
+        with db.atomic():
+            seed(args.rows)
+        for fmt in FORMATS:
+            output = os.path.join(directory, f"events.{fmt}")
+            start = time.perf_counter()
+            count = export(events_query(), fmt, output, stats=False)
+            elapsed = time.perf_counter() - start
+            if count:
+                print(
+                    f"{fmt:8} {count} rows {elapsed:.3f}s {count / elapsed:,.0f} rows/s"
+                )
+            else:
+                print(f"{fmt:8} skipped")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
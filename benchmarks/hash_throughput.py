@@ -0,0 +1,37 @@
+"""Benchmark of the password hashing of python -m crm import users:
+hashes/s one after the other and over the process pool.
+
+python -m benchmarks.hash_throughput --users 200 --rounds 12
+"""
+
+import argparse
+import time
+from crm.hashing import bcrypt_rounds, hash_passwords, password_pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=bcrypt_rounds())
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    passwords = [f"password{i}" for i in range(args.users)]
+
+    start = time.perf_counter()
+    hash_passwords(passwords, rounds=args.rounds)
+    serial = time.perf_counter() - start
+    print(f"serial  {serial:8.3f}s ({args.users / serial:,.1f} hashes/s)")
+
+    with password_pool(args.workers) as pool:
+        start = time.perf_counter()
+        hash_passwords(passwords, pool, rounds=args.rounds)
+        pooled = time.perf_counter() - start
+        print(
+            f"pool    {pooled:8.3f}s ({args.users / pooled:,.1f} hashes/s) "
+            f"with {pool._max_workers} processes"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark of python -m crm import: rows/s of a client import.
+
+python -m benchmarks.import_throughput --rows 200000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from peewee import SqliteDatabase
+from crm import audit
+from crm.models.audit_entry import AuditEntry
+from crm.models.client import Client
+from crm.models.import_checkpoint import ImportCheckpoint
+from crm.models.permission_epoch import PermissionEpoch
+from crm.models.role import Role
+from crm.models.user import User
+from crm.views.importer import client_validator, import_file
+
+MODELS = [Role, PermissionEpoch, User, Client, AuditEntry, ImportCheckpoint]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = SqliteDatabase(os.path.join(directory, "bench.sqlite3"))
+        db.bind(MODELS)
+        db.create_tables(MODELS)
+        role = Role.create(name="Commercial")
+        user = User.create(name="Com", email="com@bench", password="x", role=role)
+
+        path = os.path.join(directory, "clients.csv")
+        with open(path, "w") as source:
+            source.write("first_name,last_name,email,phone,company_name,last_contact\n")
+            for i in range(args.rows):
+                source.write(
+                    f"first{i},last{i},client{i}@bench,0123456,company{i % 100},"
+                    f"2024-06-{i % 28 + 1:02}\n"
+                )
+
+        start = time.perf_counter()
+        imported, refused = import_file(
+            path, Client, client_validator(user), args.chunk_size
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"{imported} rows imported, {refused} refused in {elapsed:.3f}s "
+            f"({imported / elapsed:,.0f} rows/s)"
+        )
+        audit.flush()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark of python -m crm report receivables: the rollups read from the
+summary table against the GROUP BY over every contract, and the cost of the
+triggers on the insertion of the contracts.
+
+python -m benchmarks.report_latency --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from peewee import SqliteDatabase, chunked
+from crm import audit
+from crm.models.audit_entry import AuditEntry
+from crm.models.client import Client
+from crm.models.contract import Contract
+from crm.models.permission_epoch import PermissionEpoch
+from crm.models.receivable_summary import ReceivableSummary, create_receivable_summary
+from crm.models.role import Role
+from crm.models.user import User
+from crm.views.report import GROUPS, receivables
+
+MODELS = [Role, PermissionEpoch, User, Client, Contract, ReceivableSummary, AuditEntry]
+
+
+def seed(rows, clients, contacts):
+    """Function to insert rows contracts spread over clients, contacts and 24 months"""
+    random.seed(12)
+    Role.create(name="Commercial")
+    User.insert_many(
+        {"name": f"Com{i}", "email": f"com{i}@bench", "password": "x", "role": 1}
+        for i in range(contacts)
+    ).execute()
+    Client.insert_many(
+        {
+            "first_name": f"first{i}",
+            "last_name": f"last{i}",
+            "email": f"client{i}@bench",
+            "phone": "0123456",
+            "company_name": "co",
+            "epic_events_contact": i % contacts + 1,
+        }
+        for i in range(clients)
+    ).execute()
+    start = time.perf_counter()
+    for ids in chunked(range(rows), 5000):
+        Contract.insert_many(
+            {
+                "client": (client := random.randint(1, clients)),
+                "total_amount": (total := random.randint(1, 1000) * 100),
+                "remaining_amount": total * random.randint(0, 4) // 4,
+                "commercial_contact": client % contacts + 1,
+                "created_at": f"20{23 + i % 2}-{i % 12 + 1:02}-15 10:00:00",
+            }
+            for i in ids
+        ).execute()
+    return time.perf_counter() - start
+
+
+def timed(query, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(query.clone())
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--contacts", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for triggers in (False, True):
+        with tempfile.TemporaryDirectory() as directory:
+            db = SqliteDatabase(os.path.join(directory, "bench.sqlite3"))
+            db.bind(MODELS)
+            db.create_tables(MODELS)
+            if triggers:
+                create_receivable_summary(db)
+            with db.atomic():
+                elapsed = seed(args.rows, args.clients, args.contacts)
+            print(
+                f"{args.rows} contracts inserted {'with' if triggers else 'without'} "
+                f"the summary triggers: {args.rows / elapsed:,.0f} rows/s"
+            )
+            if triggers:
+                for by in GROUPS:
+                    summary = timed(receivables(ReceivableSummary, by), args.repeat)
+                    scan = timed(receivables(Contract, by), args.repeat)
+                    print(
+                        f"by {by:8} summary {summary:8.2f} ms   "
+                        f"group by contracts {scan:8.2f} ms"
+                    )
+            audit.flush()
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
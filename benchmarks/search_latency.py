@@ -0,0 +1,107 @@
+"""Benchmark of python -m crm search: latency of a full-text query over the
+events against the LIKE scan it replaces.
+
+python -m benchmarks.search_latency --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from itertools import accumulate
+from peewee import SqliteDatabase, chunked
+from crm.models.event import Event
+from crm.models.search_index import EventIndex, create_search_index
+from crm.views.search import search_events
+
+CITIES = ["paris", "london", "madrid", "berlin", "rome", "lisbon", "vienna"]
+SYLLABLES = ["ba", "co", "di", "fe", "ga", "lo", "mi", "nu", "pa", "ri", "so", "tu"]
+
+
+def vocabulary(size):
+    """Function to make size distinct words, the first ones are the most used
+    (Zipf distribution, as in real notes)"""
+    random.seed(12)
+    words = set()
+    while len(words) < size:
+        words.add("".join(random.choices(SYLLABLES, k=random.randint(2, 4))))
+    words = sorted(words)
+    random.shuffle(words)
+    return words, list(accumulate(1 / rank for rank in range(1, size + 1)))
+
+
+def seed(rows, words, weights):
+    """Function to insert rows events with random names, locations and notes"""
+    for ids in chunked(range(1, rows + 1), 5000):
+        Event.insert_many(
+            {
+                "name": " ".join(random.choices(words, cum_weights=weights, k=2)),
+                "contract": i,
+                "start_date": "2025-10-12",
+                "end_date": "2025-10-13",
+                "location": random.choice(CITIES),
+                "attendees": i % 500,
+                "notes": " ".join(random.choices(words, cum_weights=weights, k=12)),
+            }
+            for i in ids
+        ).execute()
+    # A word of 100 events in a million
+    Event.update(notes=Event.notes.concat(" zeppelin")).where(
+        Event.id.in_(list(range(10000, rows + 1, 10000)))
+    ).execute()
+
+
+def timed(query, repeat):
+    """Function to run query repeat times. Returns the median in milliseconds"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(query.tuples())
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--words", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = SqliteDatabase(os.path.join(directory, "bench.sqlite3"))
+        db.bind([Event, EventIndex])
+        db.create_tables([Event])
+        create_search_index(db, [EventIndex])
+        words, weights = vocabulary(args.words)
+        start = time.perf_counter()
+        with db.atomic():
+            seed(args.rows, words, weights)
+        print(f"{args.rows} events indexed in {time.perf_counter() - start:.1f}s")
+
+        # A rare word, words of decreasing frequency and a prefix
+        queries = ["zeppelin", words[2000], words[200], words[20], words[300][:4] + "*"]
+        for text in queries:
+            matches = EventIndex.select().where(EventIndex.match(text)).count()
+            fts = timed(search_events(text, 20), args.repeat)
+            word = text.rstrip("*")
+            # What list-events and grep do: read every event
+            like = timed(
+                Event.select(Event.id).where(
+                    Event.name.contains(word)
+                    | Event.location.contains(word)
+                    | Event.notes.contains(word)
+                ),
+                args.repeat,
+            )
+            print(
+                f"{text!r:12} {matches:8} matches   top 20 fts {fts:8.2f} ms   "
+                f"like scan {like:8.2f} ms"
+            )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
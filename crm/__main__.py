@@ -1,38 +1,169 @@
+import importlib
 import typer
-import sentry_sdk
 import sys
-from sentry_sdk.integrations.logging import LoggingIntegration
-from crm.views.client import app as client_app
-from crm.views.user import app as user_app
-from crm.views.contract import app as contract_app
-from crm.views.event import app as event_app
-
-sentry_sdk.init(
-    dsn="https://7f3e3fa8e1da07fa34416675437df761@o4507657772269568.ingest.de.sentry.io/4507689957589072",
-    integrations=[LoggingIntegration()],
-    traces_sample_rate=1.0,
-)
-
-app = typer.Typer()
-
-app.add_typer(
-    user_app, name="user", help="To access user functions: python -m crm user --help"
-)
-app.add_typer(
-    client_app,
-    name="client",
-    help="To access client functions: python -m crm client --help",
-)
-app.add_typer(
-    contract_app,
-    name="contract",
-    help="To access contract functions: python -m crm contract --help",
-)
-app.add_typer(
-    event_app,
-    name="event",
-    help="To access event functions: python -m crm event --help",
-)
+from typing_extensions import Annotated, Optional
+from typer.core import TyperGroup
+from crm import monitoring
+
+# Static manifest of the sub-apps: name -> (module, help).
+# A module is only imported when its sub-app is invoked.
+COMMANDS = {
+    "user": ("crm.views.user", "To access user functions: python -m crm user --help"),
+    "client": (
+        "crm.views.client",
+        "To access client functions: python -m crm client --help",
+    ),
+    "contract": (
+        "crm.views.contract",
+        "To access contract functions: python -m crm contract --help",
+    ),
+    "event": (
+        "crm.views.event",
+        "To access event functions: python -m crm event --help",
+    ),
+    "export": (
+        "crm.views.export",
+        "To export the data as jsonl, csv, arrow or parquet: python -m crm export --help",
+    ),
+    "report": (
+        "crm.views.report",
+        "To sum the receivables per contact, client or month: python -m crm report --help",
+    ),
+    "search": (
+        "crm.views.search",
+        "To search the clients or events by words: python -m crm search --help",
+    ),
+    "audit": (
+        "crm.views.audit",
+        "To see who changed the clients, contracts, events and users: python -m crm audit --help",
+    ),
+    "bench": (
+        "crm.views.bench",
+        "To fill an empty database with a synthetic dataset: python -m crm bench --help",
+    ),
+    "import": (
+        "crm.views.importer",
+        "To import users, clients, contracts or events from csv or jsonl: python -m crm import --help",
+    ),
+}
+
+
+class LazyGroup(TyperGroup):
+    """Root group loading the sub-apps of COMMANDS on demand.
+    The help is built from the manifest without importing any sub-app"""
+
+    manifest_only = False
+
+    def list_commands(self, ctx):
+        return list(COMMANDS) + super().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        if name not in COMMANDS:
+            return super().get_command(ctx, name)
+        module_name, help = COMMANDS[name]
+        if self.manifest_only:
+            return TyperGroup(name=name, help=help)
+        module = importlib.import_module(module_name)
+        command = typer.main.get_group(module.app)
+        command.name = name
+        command.help = help
+        return command
+
+    def invoke(self, ctx):
+        """A command of a sub-app checks a connection out of the database the
+        models are bound to and gives it back when it ends"""
+        if ctx.protected_args and ctx.protected_args[0] in COMMANDS:
+            from crm import audit, cache
+            from crm.config import checkout_connection
+            from crm.models.permission_index import forget_epoch
+            from crm.models.user import User
+
+            with checkout_connection(User._meta.database):
+                try:
+                    return super().invoke(ctx)
+                finally:
+                    # The changes of the command are journaled together, the
+                    # rows it cached and its epoch are not read by the next one
+                    audit.flush_quietly()
+                    cache.clear()
+                    forget_epoch()
+        return super().invoke(ctx)
+
+    def format_help(self, ctx, formatter):
+        self.manifest_only = True
+        try:
+            return super().format_help(ctx, formatter)
+        finally:
+            self.manifest_only = False
+
+
+app = typer.Typer(cls=LazyGroup)
+
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    profile: Annotated[
+        bool,
+        typer.Option("--profile", help="Report the SQL statements of the command"),
+    ] = False,
+    profile_format: Annotated[
+        str, typer.Option("--profile-format", help="Report as text or json")
+    ] = "text",
+    profile_top: Annotated[
+        int, typer.Option("--profile-top", help="Number of slowest statements")
+    ] = 5,
+):
+    """Epic CRM: python -m crm COMMAND --help to see the functions of each command"""
+    if profile:
+        from crm.profiler import profile_command
+
+        profile_command(ctx, profile_format, profile_top)
+
+
+@app.command()
+def serve(
+    socket_path: Annotated[
+        Optional[str], typer.Option("-s", help="Path of the Unix socket")
+    ] = None,
+):
+    """Function to start the crm daemon: python -m crm serve or python -m crm serve -s "socket path".
+    Then forward commands with python -m crm.remote client list-clients
+    """
+    from crm.daemon import run_daemon
+
+    run_daemon(app, socket_path)
+
+
+@app.command()
+def api(
+    host: Annotated[str, typer.Option("--host", help="Address to listen on")] = (
+        "127.0.0.1"
+    ),
+    port: Annotated[int, typer.Option("--port", help="Port to listen on")] = 8000,
+):
+    """Function to serve the HTTP/JSON API: python -m crm api --host "address" --port "port".
+    Then POST /login and GET /clients, /contracts, /events or /users
+    """
+    from crm.api import run_api
+
+    run_api(host, port)
+
+
+@app.command()
+def migrate():
+    """Function to apply the database migrations: python -m crm migrate"""
+    from crm.create_table import migrate_database
+
+    done = migrate_database()
+    typer.echo(f"Migrations applied: {', '.join(done) or 'none'}")
+
+
+@app.command()
+def flush_events():
+    """Function to send the spooled Sentry events: python -m crm flush-events"""
+    count = monitoring.drain_spool()
+    typer.echo(f"{count} events sent to Sentry")
 
 
 def handle_exception(exc_type, exc_value, exc_traceback):
@@ -42,7 +173,7 @@ def handle_exception(exc_type, exc_value, exc_traceback):
         return
 
     # Log the exception with Sentry
-    sentry_sdk.capture_exception(exc_value)
+    monitoring.capture_exception(exc_value)
     print(f"Exception captured: {exc_value}")
 
 
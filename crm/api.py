@@ -0,0 +1,391 @@
+"""HTTP/JSON API of the crm on asyncio: python -m crm api
+
+Only the standard library is used to serve HTTP/1.1 with keep-alive
+connections. The event loop only parses the requests and writes the
+responses, the queries run in a thread pool with one connection per
+thread: checked out of the pool for each query with the pooled backends
+(CRM_DATABASE_URL=sqlite+pool:///db.sqlite3), kept open by the thread
+otherwise.
+
+POST /login {"email": ..., "password": ...} -> {"token": ...}
+GET /users, /clients, /contracts, /events?after_id=&limit= -> one JSON
+object per line (application/x-ndjson), streamed
+GET /users/<id>, /clients/<id>, /contracts/<id>, /events/<id> -> JSON
+The other requests need the header Authorization: Bearer <token>.
+"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+import jwt
+from peewee import DateTimeField
+from playhouse.pool import PooledDatabase
+from crm import audit, cache
+from crm.auth import actor, encode_token, token_user
+from crm.config import SECRET_KEY, checkout_connection, pool_options
+from crm.hashing import check_password, hash_password, needs_rehash
+from crm.models.client import Client
+from crm.models.contract import Contract
+from crm.models.event import Event
+from crm.models.permission_index import forget_epoch
+from crm.models.user import User
+from crm.queries import paginate
+
+DEFAULT_PAGE = 100
+MAX_PAGE = 10000
+# Rows read by one query and written as one chunk of a streamed list
+STREAM_ROWS = 200
+MAX_BODY = 1024 * 1024
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+def keep_alive_timeout():
+    """Function to get the seconds an idle connection is kept open (CRM_API_KEEP_ALIVE)"""
+    return float(os.getenv("CRM_API_KEEP_ALIVE", 15))
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    """Request line, headers (lower case names) and body of an HTTP request"""
+
+    def __init__(self, method, target, version, headers, body):
+        self.method = method
+        self.version = version
+        self.headers = headers
+        self.body = body
+        url = urlsplit(target)
+        self.path = [part for part in url.path.split("/") if part]
+        self.query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            self.keep_alive = connection == "keep-alive"
+        else:
+            self.keep_alive = connection != "close"
+
+    @property
+    def chunked(self):
+        """An HTTP/1.0 client does not read the chunked transfer encoding"""
+        return self.version != "HTTP/1.0"
+
+
+async def read_request(reader, timeout):
+    """Function to read the next request of a connection, None when the
+    client has closed it or stayed idle more than timeout seconds"""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise HttpError(413, "Headers too large")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Malformed request")
+    if length > MAX_BODY:
+        raise HttpError(413, "Body too large")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method, target, version, headers, body)
+
+
+def response_head(status, headers, keep_alive):
+    lines = [f"HTTP/1.1 {status} {REASONS[status]}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def to_json(data):
+    # Dates and decimals are written as strings
+    return json.dumps(data, default=str, separators=(",", ":"))
+
+
+def send_json(writer, status, data, keep_alive):
+    body = to_json(data).encode()
+    headers = {"Content-Type": "application/json", "Content-Length": len(body)}
+    writer.write(response_head(status, headers, keep_alive) + body)
+
+
+def page_size(request):
+    """Function to read the limit of a list request: DEFAULT_PAGE to MAX_PAGE rows"""
+    try:
+        limit = int(request.query.get("limit", DEFAULT_PAGE))
+        after_id = request.query.get("after_id")
+        after_id = int(after_id) if after_id is not None else None
+    except ValueError:
+        raise HttpError(400, "after_id and limit must be integers")
+    if not 0 < limit <= MAX_PAGE:
+        raise HttpError(400, f"limit must be between 1 and {MAX_PAGE}")
+    return after_id, limit
+
+
+class Resource:
+    """Reads of one model for the API. Their SQL is generated once, building
+    a peewee query costs more than running it on a primary key"""
+
+    def __init__(self, model, permission, fields=None):
+        self.model = model
+        self.permission = permission
+        self.fields = fields or model._meta.sorted_fields
+        self.names = [field.name for field in self.fields]
+        # The dates are stored as text and written as text in the JSON:
+        # parsing them would cost more than the query
+        self.converters = [
+            None if isinstance(field, DateTimeField) else field.python_value
+            for field in self.fields
+        ]
+        query = model.select(*self.fields)
+        self.row_sql, _ = query.where(model.id == 0).sql()
+        # The ids start at 1: the first page is the one after 0
+        self.page_sql, _ = paginate(query, model, 0, 1).sql()
+
+    def rows(self, sql, params):
+        cursor = self.model._meta.database.execute_sql(sql, params)
+        return [
+            {
+                name: value if convert is None or value is None else convert(value)
+                for name, convert, value in zip(self.names, self.converters, row)
+            }
+            for row in cursor
+        ]
+
+    def page(self, after_id, limit):
+        """Function to read limit rows after after_id, as dicts"""
+        return self.rows(self.page_sql, (after_id or 0, limit))
+
+    def get(self, row_id):
+        rows = self.rows(self.row_sql, (row_id,))
+        if not rows:
+            raise HttpError(404, f"{self.model.__name__} not found")
+        return rows[0]
+
+
+RESOURCES = {
+    "users": Resource(User, "user", [User.id, User.name, User.email, User.role]),
+    "clients": Resource(Client, "client"),
+    "contracts": Resource(Contract, "contract"),
+    "events": Resource(Event, "event"),
+}
+
+
+def authenticate(token, permission):
+    """Function to get the user of a token having permission.
+    The user is built from the claims of the token while they are up to date"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms="HS256")
+    except jwt.ExpiredSignatureError:
+        raise HttpError(401, "Token has expired")
+    except jwt.InvalidTokenError:
+        raise HttpError(401, "Invalid Token")
+    user, _ = token_user(payload)
+    if not user.has_permission(permission):
+        raise HttpError(403, "You don't have the permissions required")
+    return user
+
+
+def login(body):
+    """Function to check the email and password of body, returns a token"""
+    try:
+        credentials = json.loads(body)
+        email, password = credentials["email"], credentials["password"]
+    except (ValueError, TypeError, KeyError):
+        raise HttpError(400, "email and password expected")
+    user = User.get_or_none(User.email == email)
+    if user is None or not check_password(password, user.password):
+        raise HttpError(401, "Wrong email or password")
+    if needs_rehash(user.password):
+        # The work factor has changed since the last login
+        user.password = hash_password(password)
+        token = actor.set(user.id)
+        try:
+            user.save()
+        finally:
+            actor.reset(token)
+    return {"token": encode_token(user.id, user.claims())}
+
+
+class ApiServer:
+    """asyncio server of the API. The queries run in executor (a thread pool
+    of CRM_DB_MAX_CONNECTIONS threads by default) on database"""
+
+    def __init__(self, database=None, executor=None):
+        self.database = database or User._meta.database
+        self.pooled = isinstance(self.database, PooledDatabase)
+        self.executor = executor or ThreadPoolExecutor(
+            pool_options()["max_connections"], thread_name_prefix="crm-api"
+        )
+        self.keep_alive_timeout = keep_alive_timeout()
+
+    def call(self, function, args, token, permission):
+        if not self.pooled:
+            # Each thread of the executor keeps its own connection
+            return self.call_as(function, args, token, permission)
+        with checkout_connection(self.database):
+            return self.call_as(function, args, token, permission)
+
+    @staticmethod
+    def call_as(function, args, token, permission):
+        user_id = authenticate(token, permission).id if token is not None else None
+        # The changes of the request are journaled as made by its user
+        actor_token = actor.set(user_id)
+        try:
+            return function(*args)
+        finally:
+            actor.reset(actor_token)
+            # A request is a command: its changes are journaled, its cached
+            # rows and permissions epoch dropped when it ends
+            audit.flush_quietly()
+            cache.clear()
+            forget_epoch()
+
+    async def run(self, function, *args, token=None, permission=None):
+        """Function to run function(*args) in the executor, after checking
+        that the user of token has permission when a token is given: one
+        job of the executor and one connection per request"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self.call, function, args, token, permission
+        )
+
+    async def handle(self, reader, writer):
+        """Serve the requests of one connection until the client closes it"""
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, self.keep_alive_timeout)
+                    if request is None:
+                        break
+                    await self.dispatch(request, writer, request.keep_alive)
+                    # A list streamed to an HTTP/1.0 client ends with the connection
+                    keep_alive = request.keep_alive
+                except HttpError as e:
+                    keep_alive = False
+                    send_json(writer, e.status, {"error": str(e)}, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, request, writer, keep_alive):
+        try:
+            if request.path == ["login"]:
+                if request.method != "POST":
+                    raise HttpError(405, "POST expected")
+                token = await self.run(login, request.body)
+                return send_json(writer, 200, token, keep_alive)
+            if not request.path or request.path[0] not in RESOURCES:
+                raise HttpError(404, "Not found")
+            if request.method != "GET":
+                raise HttpError(405, "GET expected")
+            resource = RESOURCES[request.path[0]]
+            scheme, _, token = request.headers.get("authorization", "").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                raise HttpError(401, "Authentication required")
+            if len(request.path) == 1:
+                after_id, limit = page_size(request)
+                rows = await self.run(
+                    resource.page,
+                    after_id,
+                    min(limit, STREAM_ROWS),
+                    token=token,
+                    permission=f"list-{resource.permission}",
+                )
+                if not request.chunked:
+                    request.keep_alive = keep_alive = False
+                return await self.stream_rows(
+                    writer, resource, rows, limit, keep_alive, request.chunked
+                )
+            if len(request.path) != 2 or not request.path[1].isdigit():
+                raise HttpError(404, "Not found")
+            row = await self.run(
+                resource.get,
+                int(request.path[1]),
+                token=token,
+                permission=f"get-{resource.permission}",
+            )
+            send_json(writer, 200, row, keep_alive)
+        except HttpError as e:
+            # Once the request is read the connection can serve the next one
+            send_json(writer, e.status, {"error": str(e)}, keep_alive)
+        except ConnectionError:
+            raise
+        except Exception as e:
+            send_json(writer, 500, {"error": f"Error: {e}"}, keep_alive)
+
+    async def stream_rows(
+        self, writer, resource, rows, limit, keep_alive, chunked=True
+    ):
+        """Write the first rows then the next ones up to limit rows, one per
+        line, in chunks of STREAM_ROWS rows each read by its own query:
+        no connection is held while the client reads. Without chunked the
+        body is written as is and ends when the connection is closed"""
+        headers = {"Content-Type": "application/x-ndjson"}
+        if chunked:
+            headers["Transfer-Encoding"] = "chunked"
+        writer.write(response_head(200, headers, keep_alive))
+        try:
+            while rows:
+                chunk = "".join(to_json(row) + "\n" for row in rows).encode()
+                if chunked:
+                    chunk = f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n"
+                writer.write(chunk)
+                await writer.drain()
+                limit -= len(rows)
+                if limit <= 0 or len(rows) < STREAM_ROWS:
+                    break
+                rows = await self.run(
+                    resource.page, rows[-1]["id"], min(limit, STREAM_ROWS)
+                )
+        except Exception:
+            # The status is sent: the client sees a truncated response
+            writer.transport.abort()
+            raise ConnectionError("Stream interrupted")
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+
+    async def serve(self, host, port):
+        return await asyncio.start_server(self.handle, host, port)
+
+
+def run_api(host, port):
+    """Function to serve the API until interrupted"""
+    server = ApiServer()
+
+    async def main():
+        listening = await server.serve(host, port)
+        print(f"crm api listening on http://{host}:{port}", flush=True)
+        async with listening:
+            await listening.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.executor.shutdown()
@@ -0,0 +1,131 @@
+import heapq
+from bisect import bisect_right
+from itertools import accumulate
+from crm.audit import record_each_matching
+from crm.models.event import Event
+from crm.models.role import Role
+from crm.models.user import User
+from crm.queries import seconds
+
+
+class Bookings:
+    """Events already assigned to a support contact, sorted by start, with
+    the latest end of the first ones to find an overlap by bisection"""
+
+    def __init__(self, intervals):
+        intervals = sorted(intervals)
+        self.starts = [start for start, _ in intervals]
+        self.latest_ends = list(accumulate((end for _, end in intervals), max))
+
+    def overlaps(self, start, end):
+        """Function to get the latest end of the events overlapping start - end,
+        None when there are none"""
+        # The events starting before end overlap start - end if one ends after start
+        count = bisect_right(self.starts, end)
+        if count > 0 and self.latest_ends[count - 1] >= start:
+            return self.latest_ends[count - 1]
+        return None
+
+
+def plan_assignments(events, supports, bookings=None):
+    """Function to assign the (id, start, end) events to the supports ids:
+    greedy over the events sorted by start, each one goes to the free support
+    with the fewest events. The supports are kept in a heap by load while free,
+    in a heap by end of their event when busy: after their last event of the
+    plan or after the bookings overlapping the event (the next events start
+    later, an event fitting before such a booking is not looked for).
+    Returns (dict event id -> support id, list of the events left unassigned)"""
+    bookings = bookings or {}
+    loads = dict.fromkeys(supports, 0)
+    free = [(0, support) for support in supports]
+    heapq.heapify(free)
+    busy = []
+    plan = {}
+    left = []
+    for event_id, start, end in sorted(events, key=lambda event: event[1:]):
+        # Closed intervals: a support is free the day after its event ends
+        while busy and busy[0][0] < start:
+            _, support = heapq.heappop(busy)
+            heapq.heappush(free, (loads[support], support))
+        while free:
+            _, support = heapq.heappop(free)
+            if support in bookings:
+                booked_until = bookings[support].overlaps(start, end)
+                if booked_until is not None:
+                    heapq.heappush(busy, (booked_until, support))
+                    continue
+            plan[event_id] = support
+            loads[support] += 1
+            heapq.heappush(busy, (end, support))
+            break
+        else:
+            left.append(event_id)
+    return plan, left
+
+
+def load_assignment_data():
+    """Function to load the events without support contact, the support
+    users and the dates of the events already assigned to them, in seconds"""
+    events = list(
+        Event.select(Event.id, seconds(Event.start_date), seconds(Event.end_date))
+        .where(Event.support_contact.is_null(True))
+        .tuples()
+        .iterator()
+    )
+    supports = [
+        user_id
+        for user_id, in User.select(User.id)
+        .join(Role)
+        .where(Role.name == "Support")
+        .tuples()
+    ]
+    intervals = {}
+    assigned = (
+        Event.select(
+            Event.support_contact,
+            seconds(Event.start_date),
+            seconds(Event.end_date),
+        )
+        .where(Event.support_contact.in_(supports))
+        .tuples()
+        .iterator()
+    )
+    for support, start, end in assigned:
+        intervals.setdefault(support, []).append((start, end))
+    bookings = {support: Bookings(dates) for support, dates in intervals.items()}
+    return events, supports, bookings
+
+
+def save_assignments(plan):
+    """Function to write the plan with executemany: the UPDATE statement is
+    generated once instead of once per event. An event assigned in the
+    meantime keeps its support contact. The events updated are journaled by
+    an INSERT ... SELECT run the same way, before the update.
+    Returns the number of events updated"""
+    database = Event._meta.database
+    sql = (
+        'UPDATE "event" SET "support_contact_id" = {0} '
+        'WHERE "id" = {0} AND "support_contact_id" IS NULL'
+    ).format(database.param)
+    record_each_matching(
+        Event,
+        {
+            event_id: {Event.support_contact: support}
+            for event_id, support in plan.items()
+        },
+        '"support_contact_id" IS NULL',
+    )
+    params = [(support, event_id) for event_id, support in plan.items()]
+    cursor = database.cursor()
+    cursor.executemany(sql, params)
+    return cursor.rowcount
+
+
+def auto_assign(database, dry_run=False):
+    """Function to assign the events without support contact in one
+    transaction. Returns (plan, events left unassigned, events updated)"""
+    with database.atomic():
+        events, supports, bookings = load_assignment_data()
+        plan, left = plan_assignments(events, supports, bookings)
+        updated = 0 if dry_run else save_assignments(plan)
+    return plan, left, updated
@@ -0,0 +1,226 @@
+"""Append-only audit journal of the clients, contracts, events and users.
+
+The models mixing Audited in record who changed which fields on save and
+delete_instance. The changes are buffered and group-committed: written
+together with one executemany in one transaction at the end of the command,
+or as soon as CRM_AUDIT_BATCH changes are waiting. A write of the hot path
+only costs the building of its entry. The bulk updates are journaled by one
+INSERT ... SELECT over the rows they update, the bulk inserts of the imports
+by one executemany over the rows they create.
+
+Environment variables:
+CRM_AUDIT_BATCH: number of buffered changes written at once, 200 by default
+"""
+
+import atexit
+import json
+import os
+import threading
+from datetime import datetime
+import typer
+from peewee import DatabaseError, Value
+from crm import monitoring
+from crm.auth import actor
+from crm.config import after_rollback
+from crm.models.audit_entry import AuditEntry
+
+HIDDEN = "***"
+FIELDS = [
+    AuditEntry.at,
+    AuditEntry.user,
+    AuditEntry.entity,
+    AuditEntry.entity_id,
+    AuditEntry.action,
+    AuditEntry.changes,
+]
+
+_buffer = []
+_lock = threading.Lock()
+_exit_hook = False
+
+
+def batch_size():
+    return int(os.getenv("CRM_AUDIT_BATCH", "200"))
+
+
+def now():
+    return datetime.now().isoformat(" ", "seconds")
+
+
+def record(entity, entity_id, action, changes):
+    """Function to add a change (dict field -> new value) of the row entity_id
+    of the table entity to the journal, by the user running the command.
+    The change is dropped if its transaction rolls back"""
+    global _exit_hook
+    entry = (
+        now(),
+        actor.get(),
+        entity,
+        entity_id,
+        action,
+        json.dumps(changes, default=str),
+    )
+    with _lock:
+        _buffer.append(entry)
+        full = len(_buffer) >= batch_size()
+        if not _exit_hook:
+            # The scripts not run by a command write their changes at exit
+            atexit.register(flush_quietly)
+            _exit_hook = True
+    after_rollback(AuditEntry._meta.database, lambda: discard(entry))
+    if full:
+        flush()
+
+
+def flush():
+    """Function to write the buffered changes in one transaction, with an
+    INSERT statement generated once. Returns the number of changes written"""
+    with _lock:
+        entries = _buffer[:]
+        _buffer.clear()
+    if not entries:
+        return 0
+    database = AuditEntry._meta.database
+    sql, _ = AuditEntry.insert_many([entries[0]], fields=FIELDS).sql()
+    with database.atomic():
+        database.cursor().executemany(sql, entries)
+    return len(entries)
+
+
+def flush_quietly():
+    """Function to flush the journal at the end of a command: a journal not
+    written is reported, the changes of the command are already saved"""
+    try:
+        return flush()
+    except DatabaseError as e:
+        typer.echo(f"Error: audit journal not written: {e}", err=True)
+        monitoring.capture_exception(e)
+        return 0
+
+
+def discard(entry):
+    """Function to drop a buffered change, written or not"""
+    with _lock:
+        if entry in _buffer:
+            _buffer.remove(entry)
+
+
+def clear():
+    """Function to drop the buffered changes"""
+    with _lock:
+        _buffer.clear()
+
+
+def record_matching(model, where, changes):
+    """Function to journal an update of changes (field -> value) of the rows
+    of model matching where, with one INSERT ... SELECT run before the update
+    in its transaction"""
+    query = model.select(
+        Value(now()),
+        Value(actor.get()),
+        Value(model._meta.table_name),
+        model.id,
+        Value("update"),
+        Value(changes_json(changes)),
+    ).where(where)
+    return AuditEntry.insert_from(query, FIELDS).execute()
+
+
+def record_each_matching(model, updates, where):
+    """Function to journal the updates (row id -> changes) of the rows of model
+    still matching where, an SQL condition on their columns, with one
+    INSERT ... SELECT run by executemany before the update in its transaction"""
+    database = model._meta.database
+    param = database.param
+    columns = ", ".join(f'"{field.column_name}"' for field in FIELDS)
+    sql = (
+        f'INSERT INTO "{AuditEntry._meta.table_name}" ({columns}) '
+        f'SELECT {param}, {param}, {param}, "id", {param}, {param} '
+        f'FROM "{model._meta.table_name}" WHERE "id" = {param} AND {where}'
+    )
+    at, user, entity = now(), actor.get(), model._meta.table_name
+    params = [
+        (at, user, entity, "update", changes_json(changes), row_id)
+        for row_id, changes in updates.items()
+    ]
+    database.cursor().executemany(sql, params)
+
+
+def record_created(model, rows):
+    """Function to journal the creation of rows (row id, dict field name ->
+    value) of model with one executemany, run in the transaction of their
+    insertion. The fields of model.audit_hidden are journaled without value"""
+    fields = model._meta.fields
+    at, user, entity = now(), actor.get(), model._meta.table_name
+    entries = [
+        (
+            at,
+            user,
+            entity,
+            row_id,
+            "create",
+            json.dumps(
+                {
+                    name: (
+                        HIDDEN
+                        if name in model.audit_hidden
+                        else fields[name].db_value(value)
+                    )
+                    for name, value in sorted(data.items())
+                },
+                default=str,
+            ),
+        )
+        for row_id, data in rows
+    ]
+    if entries:
+        sql, _ = AuditEntry.insert_many([entries[0]], fields=FIELDS).sql()
+        model._meta.database.cursor().executemany(sql, entries)
+    return len(entries)
+
+
+def changes_json(changes):
+    """Function to write changes (field -> value) as stored in the journal"""
+    values = {field.name: field.db_value(value) for field, value in changes.items()}
+    return json.dumps(values, default=str)
+
+
+class Audited:
+    """Mixin of the models whose changes are journaled. The fields of
+    audit_hidden are journaled without their value"""
+
+    audit_hidden = ()
+
+    def audit_changes(self, only=None):
+        names = (
+            only and {getattr(field, "name", field) for field in only} or self._dirty
+        )
+        fields = self._meta.fields
+        return {
+            name: (
+                HIDDEN
+                if name in self.audit_hidden
+                else fields[name].db_value(self.__data__.get(name))
+            )
+            for name in sorted(names)
+            if name in fields and name != self._meta.primary_key.name
+        }
+
+    def save(self, force_insert=False, only=None):
+        created = force_insert or self._pk is None
+        changes = self.audit_changes(only)
+        rows = super().save(force_insert=force_insert, only=only)
+        if rows and (created or changes):
+            record(
+                self._meta.table_name,
+                self._pk,
+                "create" if created else "update",
+                changes,
+            )
+        return rows
+
+    def delete_instance(self, *args, **kwargs):
+        rows = super().delete_instance(*args, **kwargs)
+        if rows:
+            record(self._meta.table_name, self._pk, "delete", {})
+        return rows
@@ -1,24 +1,47 @@
 import jwt
 import typer
+from contextvars import ContextVar
 from datetime import datetime, timezone, timedelta
 from functools import wraps
 from crm.config import SECRET_KEY
 
+# Decoded payload of the last token, kept warm by the daemon between commands
+_session = {}
+# Id of the user running the command, journaled with its changes
+actor = ContextVar("actor", default=None)
 
-def generate_token(user_id):
+
+def encode_token(user_id, claims=None, exp=None):
+    """Function to sign a token for user_id with the authorization claims
+    (role id and name, permission bitmask, permissions epoch)"""
     payload = {
         "user_id": user_id,
-        "exp": datetime.now(timezone.utc) + timedelta(hours=3),
+        **(claims or {}),
+        "exp": exp or datetime.now(timezone.utc) + timedelta(hours=3),
     }
-    token = jwt.encode(payload, SECRET_KEY, algorithm="HS256")
+    return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
+
+
+def generate_token(user_id, claims=None):
+    token = encode_token(user_id, claims)
     print(token)
     return token
 
 
-def verify_token(token):
-    try:
+def decode_token(token):
+    """Function to decode a token, reusing the last decoded payload until it expires"""
+    payload = _session.get(token)
+    if payload is None or payload["exp"] <= datetime.now(timezone.utc).timestamp():
         payload = jwt.decode(token, SECRET_KEY, algorithms="HS256")
-        return payload["user_id"]
+        _session.clear()
+        _session[token] = payload
+    return payload
+
+
+def verify_claims(token):
+    """Function to get the payload of a valid token, None otherwise"""
+    try:
+        return decode_token(token)
     except jwt.ExpiredSignatureError:
         typer.echo("Token has expired")
         return None
@@ -27,15 +50,51 @@ def verify_token(token):
         return None
 
 
+def verify_token(token):
+    payload = verify_claims(token)
+    return payload["user_id"] if payload else None
+
+
+def claims_principal(payload):
+    """Function to build the user of a token from its claims, without any query.
+    Only the id, the role and the permissions of this user are known"""
+    from crm.models.role import Role
+    from crm.models.user import User
+    from crm.models.permission_index import mask_permissions
+
+    user = User(
+        id=payload["user_id"],
+        role=Role(id=payload["role_id"], name=payload["role"]),
+    )
+    user.claimed_permissions = mask_permissions(payload["perms"])
+    return user
+
+
+def token_user(payload):
+    """Function to get the user of a token payload: from its claims while the
+    permissions epoch is the same, from the database otherwise.
+    Returns (user, True if the claims are stale)"""
+    from crm.models.permission_index import current_epoch
+    from crm.models.user import User
+
+    if payload.get("epoch") == current_epoch():
+        return claims_principal(payload), False
+    return User.get_by_id(payload["user_id"]), True
+
+
 def get_authenticated_user():
     try:
         with open("token.txt", "r") as token_file:
             token = token_file.read().strip()
-        user_id = verify_token(token)
-        if user_id:
-            from crm.models.user import User
-
-            user = User.get_by_id(user_id)
+        payload = verify_claims(token)
+        if payload:
+            user, stale = token_user(payload)
+            if stale:
+                # Refresh the claims of the token
+                with open("token.txt", "w") as token_file:
+                    token_file.write(
+                        encode_token(user.id, user.claims(), payload["exp"])
+                    )
             return user
 
     except Exception as e:
@@ -51,7 +110,11 @@ def auth_required(func):
             typer.echo("Authentication required")
             return
         kwargs.pop("user", None)
-        return func(*args, **kwargs, user=user)
+        token = actor.set(user.id)
+        try:
+            return func(*args, **kwargs, user=user)
+        finally:
+            actor.reset(token)
 
     return wrapper
 
@@ -0,0 +1,113 @@
+"""Row cache of the lookups by primary key of the users, roles, clients and
+contracts.
+
+The models mixing Cached answer Model.get(id=...), get_by_id and the
+dereference of a foreign key (user.role, contract.client) from the rows
+already read: each lookup gets its own instance, built from the cached row,
+so a change not saved does not leak into the cache. The least recently used
+rows are evicted past CRM_ROW_CACHE_SIZE rows. A row is evicted when it is
+saved or deleted; a query updating or deleting rows of a model must call
+forget(model), as the bulk updates do. The cache is emptied at the end of
+each command, so a command never reads the rows cached by a previous one.
+
+Environment variables:
+CRM_ROW_CACHE_SIZE: number of rows cached, 1024 by default, 0 to disable
+"""
+
+import os
+import threading
+from collections import Counter, OrderedDict
+from peewee import OP, Expression
+
+_rows = OrderedDict()
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def cache_size():
+    return int(os.getenv("CRM_ROW_CACHE_SIZE", "1024"))
+
+
+def stats():
+    """Function to get the hits and misses of the cache since the process started"""
+    with _lock:
+        return {"hits": _stats["hits"], "misses": _stats["misses"]}
+
+
+def clear():
+    """Function to empty the cache"""
+    with _lock:
+        _rows.clear()
+
+
+def forget(model, pk=None):
+    """Function to evict the row pk of model, all its rows without pk"""
+    table = model._meta.table_name
+    with _lock:
+        if pk is not None:
+            _rows.pop((table, pk), None)
+            return
+        for key in [key for key in _rows if key[0] == table]:
+            del _rows[key]
+
+
+def lookup_key(model, query, filters):
+    """Function to get the primary key looked up by Model.get(*query,
+    **filters), None when the lookup is not by primary key only"""
+    primary_key = model._meta.primary_key
+    if query and filters or len(query) > 1:
+        return None
+    if filters:
+        if list(filters) != [primary_key.name]:
+            return None
+        pk = filters[primary_key.name]
+    elif isinstance(query[0], Expression):
+        expression = query[0]
+        if expression.lhs is not primary_key or expression.op != OP.EQ:
+            return None
+        pk = expression.rhs
+    else:
+        pk = query[0]
+    if isinstance(pk, bool) or not isinstance(pk, int):
+        return None
+    return pk
+
+
+class Cached:
+    """Mixin of the models whose lookups by primary key are cached"""
+
+    @classmethod
+    def get(cls, *query, **filters):
+        pk = lookup_key(cls, query, filters)
+        size = cache_size()
+        if pk is None or size <= 0:
+            return super().get(*query, **filters)
+        key = (cls._meta.table_name, pk)
+        with _lock:
+            data = _rows.get(key)
+            if data is not None:
+                _rows.move_to_end(key)
+            _stats["hits" if data is not None else "misses"] += 1
+        if data is None:
+            instance = super().get(*query, **filters)
+            with _lock:
+                _rows[key] = dict(instance.__data__)
+                while len(_rows) > size:
+                    _rows.popitem(last=False)
+            return instance
+        instance = cls(__no_default__=1, **data)
+        instance._dirty.clear()
+        return instance
+
+    def save(self, *args, **kwargs):
+        try:
+            return super().save(*args, **kwargs)
+        finally:
+            if self._pk is not None:
+                forget(type(self), self._pk)
+
+    def delete_instance(self, *args, **kwargs):
+        try:
+            return super().delete_instance(*args, **kwargs)
+        finally:
+            forget(type(self), self._pk)
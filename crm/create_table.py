@@ -1,5 +1,4 @@
-from peewee import SqliteDatabase
-import bcrypt
+import os
 from crm.models.user import User
 from crm.models.client import Client
 from crm.models.contract import Contract
@@ -7,22 +6,37 @@ from crm.models.event import Event
 from crm.models.role import Role
 from crm.models.permission import Permission
 from crm.models.rolepermission import RolePermission
+from crm.models.permission_epoch import PermissionEpoch
+from crm.models.permission_index import invalidate_permission_index
+from crm.config import db
+from crm.hashing import hash_password
 
 
-db = SqliteDatabase("db.sqlite3")
+MIGRATE_DIR = os.path.join(os.path.dirname(__file__), "migrations")
 
 
 def create_tables():
     """Function to create tables"""
     db.connect()
-    db.create_tables([User, Client, Contract, Event, Role, Permission, RolePermission])
+    db.create_tables(
+        [
+            User,
+            Client,
+            Contract,
+            Event,
+            Role,
+            Permission,
+            RolePermission,
+            PermissionEpoch,
+        ]
+    )
     db.close()
 
 
-def create_roles():
+def create_roles(database=db):
     """Function to create roles"""
     roles = ["Commercial", "Gestion", "Support", "Admin"]
-    with db.atomic():
+    with database.atomic():
         for role in roles:
             Role.get_or_create(name=role)
 
@@ -32,32 +46,32 @@ def create_users():
     user1 = User.get_or_create(
         name="Com",
         email="com@gmail.com",
-        password=bcrypt.hashpw("com".encode(), bcrypt.gensalt()).decode(),
+        password=hash_password("com"),
         role=Role.get(id=1),
     )
     user2 = User.get_or_create(
         name="Gest",
         email="gest@gmail.com",
-        password=bcrypt.hashpw("gest".encode(), bcrypt.gensalt()).decode(),
+        password=hash_password("gest"),
         role=Role.get(id=2),
     )
     user3 = User.get_or_create(
         name="Sup",
         email="sup@gmail.com",
-        password=bcrypt.hashpw("sup".encode(), bcrypt.gensalt()).decode(),
+        password=hash_password("sup"),
         role=Role.get(id=3),
     )
     user4 = User.get_or_create(
         name="Admin",
         email="admin@gmail.com",
-        password=bcrypt.hashpw("admin".encode(), bcrypt.gensalt()).decode(),
+        password=hash_password("admin"),
         role=Role.get(id=4),
     )
 
     user5 = User.get_or_create(
         name="Com1",
         email="com1@gmail.com",
-        password=bcrypt.hashpw("com1".encode(), bcrypt.gensalt()).decode(),
+        password=hash_password("com1"),
         role=Role.get(id=1),
     )
 
@@ -172,10 +186,10 @@ def create_events():
     return event1, event2, event3
 
 
-def create_permissions():
+def create_permissions(database=db):
     """Function to assign permissions to the roles"""
     permissions = Permission.generate_permissions()
-    with db.atomic():
+    with database.atomic():
         for permission in permissions:
             Permission.get_or_create(name=permission)
 
@@ -210,6 +224,17 @@ def create_permissions():
                 or "event" in perm.name
             ):
                 RolePermission.get_or_create(role=admin, permission=perm)
+    invalidate_permission_index()
+
+
+def migrate_database(database=db):
+    """Function to apply the migrations of crm/migrations not applied yet"""
+    from peewee_migrate import Router
+
+    router = Router(database, migrate_dir=MIGRATE_DIR)
+    already_done = set(router.done)
+    router.run()
+    return [name for name in router.done if name not in already_done]
 
 
 def setup_database():
@@ -220,6 +245,7 @@ def setup_database():
     create_contracts()
     create_events()
     create_permissions()
+    migrate_database()
 
 
 if __name__ == "__main__":
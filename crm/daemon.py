@@ -0,0 +1,181 @@
+import contextlib
+import io
+import json
+import os
+import signal
+import socketserver
+import sys
+import time
+import click
+import typer
+from playhouse.pool import PooledDatabase
+from crm import monitoring
+from crm.config import db
+from crm.models.permission_index import forget_epoch, get_role_permissions
+from crm.remote import (
+    EXIT,
+    INPUT,
+    OUTPUT,
+    REQUEST,
+    SECRET,
+    default_socket_path,
+    read_frame,
+    send_frame,
+)
+
+
+class SocketOutput(io.RawIOBase):
+    """Binary stream sending every write to the client as an output frame"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        send_frame(self.stream, OUTPUT, bytes(data))
+        return len(data)
+
+
+class SocketInput(io.TextIOBase):
+    """Text stream asking the client for each line read, so the prompts of a
+    command run from a terminal are answered there"""
+
+    def __init__(self, rfile, wfile):
+        self.rfile = rfile
+        self.wfile = wfile
+
+    def readable(self):
+        return True
+
+    def ask(self, kind, prompt=""):
+        send_frame(self.wfile, kind, prompt.encode())
+        kind, payload = read_frame(self.rfile)
+        return payload.decode() if kind == INPUT else ""
+
+    def readline(self, size=-1):
+        return self.ask(INPUT)
+
+    def read(self, size=-1):
+        return "".join(iter(self.readline, ""))
+
+    def secret(self, prompt=""):
+        """Function to read a hidden line, used for the prompts with hide_input"""
+        line = self.ask(SECRET, prompt)
+        if not line:
+            raise EOFError
+        return line
+
+
+@contextlib.contextmanager
+def hidden_prompts(read):
+    """Function to read the hidden prompts of click with read while in the block"""
+    previous = click.termui.hidden_prompt_func
+    click.termui.hidden_prompt_func = read
+    try:
+        yield
+    finally:
+        click.termui.hidden_prompt_func = previous
+
+
+def run_command(command, argv, cwd, stdin, stdout):
+    """Function to run one crm command in this process. stdin is the input
+    of the command, a string or a text stream.
+    The output is written in stdout and the exit code is returned"""
+    previous_cwd = os.getcwd()
+    previous_stdin = sys.stdin
+    try:
+        os.chdir(cwd)
+        sys.stdin = io.StringIO(stdin) if isinstance(stdin, str) else stdin
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stdout):
+            try:
+                result = command.main(args=argv, prog_name="crm", standalone_mode=False)
+                return result if isinstance(result, int) else 0
+            except click.ClickException as e:
+                e.show()
+                return e.exit_code
+            except click.exceptions.Abort:
+                typer.echo("Aborted!", err=True)
+                return 1
+            except Exception as e:
+                typer.echo(f"Error: {e}", err=True)
+                return 1
+    finally:
+        sys.stdin = previous_stdin
+        os.chdir(previous_cwd)
+
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    """Handler running the command sent by crm.remote"""
+
+    def handle(self):
+        kind, payload = read_frame(self.rfile)
+        if kind != REQUEST:
+            return
+        request = json.loads(payload)
+        stdout = io.TextIOWrapper(
+            SocketOutput(self.wfile), encoding="utf-8", write_through=True
+        )
+        stdin = request.get("stdin", "")
+        prompts = contextlib.nullcontext()
+        if request.get("interactive"):
+            stdin = SocketInput(self.rfile, self.wfile)
+            prompts = hidden_prompts(stdin.secret)
+        with prompts:
+            code = run_command(
+                self.server.command, request["argv"], request["cwd"], stdin, stdout
+            )
+        stdout.flush()
+        send_frame(self.wfile, EXIT, str(code).encode())
+
+
+class Daemon(socketserver.UnixStreamServer):
+    """Unix socket server keeping the crm commands, models and database warm.
+    Requests are handled one at a time as they share stdout and the cwd"""
+
+    def __init__(self, app, socket_path=None):
+        self.socket_path = socket_path or default_socket_path()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.command = typer.main.get_command(app)
+        self.drain_interval = float(os.getenv("CRM_SENTRY_DRAIN_INTERVAL", "30"))
+        self.last_drain = time.monotonic()
+        super().__init__(self.socket_path, CommandHandler)
+        os.chmod(self.socket_path, 0o600)
+
+    def service_actions(self):
+        """Drain the spooled Sentry events every CRM_SENTRY_DRAIN_INTERVAL seconds"""
+        if time.monotonic() - self.last_drain >= self.drain_interval:
+            self.last_drain = time.monotonic()
+            try:
+                monitoring.drain_spool()
+            except Exception as e:
+                typer.echo(f"Error while sending Sentry events: {e}", err=True)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def run_daemon(app, socket_path=None):
+    """Function to serve the crm commands on a Unix socket until interrupted"""
+    db.connect(reuse_if_open=True)
+    get_role_permissions(None)
+    # The epoch is read again by the first command
+    forget_epoch()
+    if isinstance(db, PooledDatabase):
+        # The commands check their connection out of the pool
+        db.close()
+    daemon = Daemon(app, socket_path)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    typer.echo(f"crm daemon listening on {daemon.socket_path}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+        monitoring.drain_spool()
+        db.close()
@@ -0,0 +1,231 @@
+"""Deterministic synthetic dataset: python -m crm bench seed --scale 100000
+
+scale clients and contracts, one user per 100 clients (10 at least) and an
+event for 60% of the signed contracts, bulk-loaded with executemany into an
+empty database. The same scale and seed always give the same rows.
+Every user has the password given to generate, a random one by default,
+the first one is the admin admin@bench.crm.
+"""
+
+import random
+import secrets
+from datetime import datetime, timedelta
+from crm.create_table import create_permissions, create_roles, migrate_database
+from crm.hashing import hash_password
+from crm.models.audit_entry import AuditEntry
+from crm.models.client import Client
+from crm.models.contract import Contract
+from crm.models.event import Event
+from crm.models.event_span import EventSpan
+from crm.models.permission import Permission
+from crm.models.permission_epoch import PermissionEpoch
+from crm.models.receivable_summary import ReceivableSummary
+from crm.models.role import Role
+from crm.models.rolepermission import RolePermission
+from crm.models.search_index import INDEXES as SEARCH_INDEXES
+from crm.models.user import User
+from crm.views.importer import bulk_insert
+
+MIN_SCALE = 1000
+MAX_SCALE = 1000000
+CHUNK_SIZE = 10000
+ADMIN_EMAIL = "admin@bench.crm"
+TABLES = [
+    Role,
+    Permission,
+    RolePermission,
+    PermissionEpoch,
+    User,
+    Client,
+    Contract,
+    Event,
+]
+# The models of the tables the migrations create, bound with TABLES to the
+# database being seeded
+MODELS = TABLES + SEARCH_INDEXES + [ReceivableSummary, EventSpan, AuditEntry]
+
+# Shares of the roles among the users, by tenths
+ROLE_CYCLE = ["Commercial"] * 4 + ["Gestion"] + ["Support"] * 5
+FIRST_NAMES = (
+    "Alice Bruno Chloe David Emma Farid Grace Hugo Ines Jules Karim Lea "
+    "Marc Nina Oscar Paul Quentin Rose Sami Theo Ugo Vera Willy Yanis "
+    "Zoe"
+).split()
+LAST_NAMES = (
+    "Martin Bernard Dubois Thomas Robert Richard Petit Durand Leroy "
+    "Moreau Simon Laurent Lefebvre Michel Garcia David Bertrand Roux "
+    "Vincent Fournier Morel"
+).split()
+CITIES = (
+    "Paris Lyon Marseille Toulouse Nice Nantes Strasbourg Montpellier "
+    "Bordeaux Lille Rennes Reims Toulon Grenoble Dijon Angers Nimes "
+    "Brest Tours Limoges London Madrid Berlin Rome Lisbon Brussels "
+    "Geneva Amsterdam"
+).split()
+WORDS = (
+    "gala wedding seminar launch concert party summit workshop dinner "
+    "festival speaker catering stage music security parking buffet "
+    "lights vip shuttle badge press award charity brunch cocktail tour "
+    "expo"
+).split()
+COMPANY_SUFFIXES = ["SA", "SARL", "SAS", "Group", "& Co", "Events", "Ltd"]
+
+
+def check_scale(scale):
+    """Function to check that scale is a number of clients from MIN_SCALE to
+    MAX_SCALE, e.g. 1e3 or 1000000"""
+    scale = int(float(scale))
+    if not MIN_SCALE <= scale <= MAX_SCALE:
+        raise ValueError(f"The scale goes from {MIN_SCALE:,} to {MAX_SCALE:,}")
+    return scale
+
+
+def timestamp(start, days, rng):
+    moment = start + timedelta(days=rng.randrange(days), seconds=rng.randrange(86400))
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def user_rows(count, password, roles):
+    """Function to generate count users, the first one is the admin"""
+    yield {
+        "name": "Admin",
+        "email": ADMIN_EMAIL,
+        "password": password,
+        "role": roles["Admin"],
+    }
+    for i in range(1, count):
+        role = ROLE_CYCLE[i % len(ROLE_CYCLE)]
+        yield {
+            "name": f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {role} {i}",
+            "email": f"{role.lower()}{i}@bench.crm",
+            "password": password,
+            "role": roles[role],
+        }
+
+
+def client_rows(count, commercials, rng):
+    """Function to generate count clients. Returns the rows and the commercial
+    contact of each client"""
+    contacts = [rng.choice(commercials) for _ in range(count)]
+    start = datetime(2023, 1, 1)
+
+    def rows():
+        for i, contact in enumerate(contacts, 1):
+            yield {
+                "first_name": rng.choice(FIRST_NAMES),
+                "last_name": rng.choice(LAST_NAMES),
+                "email": f"client{i}@bench.crm",
+                "phone": f"06{rng.randrange(10**8):08}",
+                "company_name": f"{rng.choice(WORDS).capitalize()} {rng.choice(COMPANY_SUFFIXES)}",
+                "created_at": timestamp(start, 730, rng),
+                "last_contact": timestamp(start, 730, rng),
+                "epic_events_contact": contact,
+            }
+
+    return rows(), contacts
+
+
+def contract_rows(count, clients, contacts, rng, signed):
+    """Function to generate count contracts of random clients (their ids, and
+    the commercial contact of each one in contacts), 70% signed. The numbers
+    (from 1) of the signed contracts are appended to signed"""
+    start = datetime(2023, 1, 1)
+    for i in range(1, count + 1):
+        index = rng.randrange(len(clients))
+        total = rng.randint(1, 1000) * 100
+        status = rng.random() < 0.7
+        if status:
+            signed.append(i)
+        yield {
+            "client": clients[index],
+            "total_amount": total,
+            "remaining_amount": total * rng.randint(0, 4) // 4,
+            "created_at": timestamp(start, 730, rng),
+            "status": status,
+            "commercial_contact": contacts[index],
+        }
+
+
+def event_rows(signed, supports, rng):
+    """Function to generate an event for 60% of the signed contracts, 80% of
+    them with a support contact, over 2025 and 2026"""
+    start = datetime(2025, 1, 1)
+    for contract in signed:
+        if rng.random() >= 0.6:
+            continue
+        begin = start + timedelta(days=rng.randrange(730))
+        yield {
+            "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)}",
+            "contract": contract,
+            "start_date": begin.strftime("%Y-%m-%d"),
+            "end_date": (begin + timedelta(days=rng.randrange(4))).strftime("%Y-%m-%d"),
+            "support_contact": rng.choice(supports) if rng.random() < 0.8 else None,
+            "location": rng.choice(CITIES),
+            "attendees": rng.randint(10, 5000),
+            "notes": " ".join(rng.choices(WORDS, k=rng.randint(3, 8))),
+        }
+
+
+def insert_rows(model, rows):
+    """Function to insert rows by chunks of CHUNK_SIZE, one transaction each.
+    Returns the number of rows inserted"""
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            count += insert_chunk(model, chunk)
+            chunk = []
+    if chunk:
+        count += insert_chunk(model, chunk)
+    return count
+
+
+def insert_chunk(model, rows):
+    with model._meta.database.atomic():
+        bulk_insert(model, rows)
+    return len(rows)
+
+
+def inserted_ids(model):
+    """Function to read back the ids of the rows of model, in insertion order"""
+    return [row_id for row_id, in model.select(model.id).order_by(model.id).tuples()]
+
+
+def generate(database, scale, seed=12, password=None):
+    """Function to create the tables of database, the roles, the permissions
+    and the dataset of scale clients. The users have password, a random one
+    nobody knows by default. The database must not have any user, client,
+    contract or event. Returns the number of rows per table"""
+    scale = check_scale(scale)
+    password = password or secrets.token_urlsafe(16)
+    database.create_tables(TABLES)
+    migrate_database(database)
+    if any(model.select().exists() for model in (User, Client, Contract, Event)):
+        raise ValueError(
+            "The database already has users, clients, contracts or events, seed an empty one"
+        )
+    create_roles(database)
+    create_permissions(database)
+    rng = random.Random(seed)
+    roles = dict(Role.select(Role.name, Role.id).tuples())
+    users = max(10, scale // 100)
+    counts = {
+        "users": insert_rows(User, user_rows(users, hash_password(password), roles))
+    }
+    by_role = {}
+    for user_id, role in User.select(User.id, User.role).tuples():
+        by_role.setdefault(role, []).append(user_id)
+    clients, contacts = client_rows(scale, by_role[roles["Commercial"]], rng)
+    counts["clients"] = insert_rows(Client, clients)
+    signed = []
+    # The ids are given by the database, they do not always start at 1
+    counts["contracts"] = insert_rows(
+        Contract, contract_rows(scale, inserted_ids(Client), contacts, rng, signed)
+    )
+    contract_ids = inserted_ids(Contract)
+    signed = [contract_ids[number - 1] for number in signed]
+    counts["events"] = insert_rows(
+        Event, event_rows(signed, by_role[roles["Support"]], rng)
+    )
+    return counts
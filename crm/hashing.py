@@ -0,0 +1,49 @@
+import os
+import bcrypt
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+DEFAULT_ROUNDS = 12
+
+
+def bcrypt_rounds():
+    """Function to get the bcrypt work factor of the environment (CRM_BCRYPT_ROUNDS).
+    Each extra round doubles the time of a hash"""
+    return int(os.getenv("CRM_BCRYPT_ROUNDS", DEFAULT_ROUNDS))
+
+
+def hash_password(password, rounds=None):
+    """Function to hash a password with the work factor of the environment"""
+    salt = bcrypt.gensalt(rounds or bcrypt_rounds())
+    return bcrypt.hashpw(password.encode(), salt).decode()
+
+
+def check_password(password, hashed_password):
+    return bcrypt.checkpw(password.encode(), hashed_password.encode())
+
+
+def password_rounds(hashed_password):
+    """Function to read the work factor of a hash: $2b$<rounds>$<salt and hash>"""
+    return int(hashed_password.split("$")[2])
+
+
+def needs_rehash(hashed_password, rounds=None):
+    """Function to know if a hash was made with another work factor"""
+    return password_rounds(hashed_password) != (rounds or bcrypt_rounds())
+
+
+def password_pool(workers=None):
+    """Function to create the process pool hashing the passwords of the bulk
+    operations, CRM_HASH_WORKERS processes (one per core by default)"""
+    workers = workers or int(os.getenv("CRM_HASH_WORKERS", 0)) or os.cpu_count()
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def hash_passwords(passwords, pool=None, rounds=None):
+    """Function to hash a list of passwords, spread over the processes of pool.
+    Without pool the passwords are hashed one after the other"""
+    hash_one = partial(hash_password, rounds=rounds or bcrypt_rounds())
+    if pool is None:
+        return [hash_one(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (pool._max_workers * 4))
+    return list(pool.map(hash_one, passwords, chunksize=chunksize))
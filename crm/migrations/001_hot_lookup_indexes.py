@@ -0,0 +1,54 @@
+"""Peewee migrations -- 001_hot_lookup_indexes.
+
+Indexes matching the listing and authorization queries of the views.
+The names are the ones peewee gives to the indexes declared on the models,
+so a database made by create_tables and a migrated one are identical.
+"""
+
+import peewee as pw
+from peewee_migrate import Migrator
+
+INDEXES = [
+    ("user_name", "user", "name", False),
+    ("permission_name", "permission", "name", True),
+    ("contract_remaining_amount", "contract", "remaining_amount", False),
+    ("contract_status_remaining_amount", "contract", "status, remaining_amount", False),
+    (
+        "rolepermission_role_id_permission_id",
+        "rolepermission",
+        "role_id, permission_id",
+        True,
+    ),
+]
+
+
+def migrate(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your migrations here."""
+    # Duplicated permission names would break the unique index: their roles
+    # are given to the first one, then the others are deleted
+    migrator.sql(
+        'UPDATE "rolepermission" SET "permission_id" = (SELECT MIN("p2"."id") '
+        'FROM "permission" AS "p1" JOIN "permission" AS "p2" ON "p1"."name" = "p2"."name" '
+        'WHERE "p1"."id" = "rolepermission"."permission_id")'
+    )
+    migrator.sql(
+        'DELETE FROM "permission" WHERE "id" NOT IN '
+        '(SELECT MIN("id") FROM "permission" GROUP BY "name")'
+    )
+    # Duplicated role/permission pairs would break the unique index
+    migrator.sql(
+        'DELETE FROM "rolepermission" WHERE "id" NOT IN '
+        '(SELECT MIN("id") FROM "rolepermission" GROUP BY "role_id", "permission_id")'
+    )
+    for name, table, columns, unique in INDEXES:
+        columns = ", ".join(f'"{column.strip()}"' for column in columns.split(","))
+        migrator.sql(
+            f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS "{name}" '
+            f'ON "{table}" ({columns})'
+        )
+
+
+def rollback(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your rollback migrations here."""
+    for name, _, _, _ in INDEXES:
+        migrator.sql(f'DROP INDEX IF EXISTS "{name}"')
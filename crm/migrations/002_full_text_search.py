@@ -0,0 +1,33 @@
+"""Peewee migrations -- 002_full_text_search.
+
+FTS5 indexes of the clients and events for python -m crm search,
+kept in sync with their tables by triggers. SQLite only: python -m crm
+search refuses the other backends.
+"""
+
+import peewee as pw
+from peewee_migrate import Migrator
+from crm.config import is_sqlite
+from crm.models.search_index import (
+    INDEXES,
+    drop_search_index_statements,
+    search_index_statements,
+)
+
+
+def migrate(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your migrations here."""
+    if not is_sqlite(database):
+        return
+    for index in INDEXES:
+        for statement in search_index_statements(index):
+            migrator.sql(statement)
+
+
+def rollback(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your rollback migrations here."""
+    if not is_sqlite(database):
+        return
+    for index in INDEXES:
+        for statement in drop_search_index_statements(index):
+            migrator.sql(statement)
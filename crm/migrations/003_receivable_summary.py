@@ -0,0 +1,33 @@
+"""Peewee migrations -- 003_receivable_summary.
+
+Summary of the receivables per commercial contact, client and month
+for python -m crm report, maintained by triggers on the contract table.
+SQLite only: the report sums the contracts on the other backends.
+"""
+
+import peewee as pw
+from peewee_migrate import Migrator
+from crm.config import is_sqlite
+from crm.models.receivable_summary import (
+    ReceivableSummary,
+    drop_summary_statements,
+    summary_statements,
+)
+
+
+def migrate(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your migrations here."""
+    if not is_sqlite(database):
+        return
+    migrator.create_model(ReceivableSummary)
+    for statement in summary_statements():
+        migrator.sql(statement)
+
+
+def rollback(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your rollback migrations here."""
+    if not is_sqlite(database):
+        return
+    for statement in drop_summary_statements():
+        migrator.sql(statement)
+    migrator.remove_model("receivable_summary")
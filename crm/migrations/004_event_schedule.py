@@ -0,0 +1,36 @@
+"""Peewee migrations -- 004_event_schedule.
+
+R*Tree of the dates of the events for python -m crm event calendar and the
+support contact conflict checks, maintained by triggers on the event table,
+and the indexes of the event dates and locations. The R*Tree is SQLite
+only: the other backends compare the dates with their index.
+"""
+
+import peewee as pw
+from peewee_migrate import Migrator
+from crm.config import is_sqlite
+from crm.models.event_span import drop_span_statements, span_statements
+
+INDEXES = [
+    ("event_start_date_end_date", "start_date, end_date"),
+    ("event_location", "location"),
+]
+
+
+def migrate(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your migrations here."""
+    for name, columns in INDEXES:
+        columns = ", ".join(f'"{column.strip()}"' for column in columns.split(","))
+        migrator.sql(f'CREATE INDEX IF NOT EXISTS "{name}" ON "event" ({columns})')
+    if is_sqlite(database):
+        for statement in span_statements():
+            migrator.sql(statement)
+
+
+def rollback(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your rollback migrations here."""
+    if is_sqlite(database):
+        for statement in drop_span_statements():
+            migrator.sql(statement)
+    for name, _ in INDEXES:
+        migrator.sql(f'DROP INDEX IF EXISTS "{name}"')
@@ -0,0 +1,31 @@
+"""Peewee migrations -- 005_audit_journal.
+
+Append-only journal of the changes of the clients, contracts, events and
+users for python -m crm audit, with its indexes by row and by user. The
+triggers keeping it append-only are SQLite ones.
+"""
+
+import peewee as pw
+from peewee_migrate import Migrator
+from crm.config import is_sqlite
+from crm.models.audit_entry import (
+    AuditEntry,
+    audit_statements,
+    drop_audit_statements,
+)
+
+
+def migrate(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your migrations here."""
+    migrator.create_model(AuditEntry)
+    if is_sqlite(database):
+        for statement in audit_statements():
+            migrator.sql(statement)
+
+
+def rollback(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your rollback migrations here."""
+    if is_sqlite(database):
+        for statement in drop_audit_statements():
+            migrator.sql(statement)
+    migrator.remove_model("audit_entry")
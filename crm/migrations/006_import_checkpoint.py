@@ -0,0 +1,21 @@
+"""Peewee migrations -- 006_import_checkpoint.
+
+Checkpoints of the imports, committed with the rows of each chunk so that
+python -m crm import --resume never inserts a committed chunk again.
+"""
+
+import peewee as pw
+from peewee_migrate import Migrator
+
+
+def migrate(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your migrations here."""
+    migrator.sql(
+        'CREATE TABLE IF NOT EXISTS "import_checkpoint" '
+        '("path" TEXT NOT NULL PRIMARY KEY, "last_row" INTEGER NOT NULL)'
+    )
+
+
+def rollback(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your rollback migrations here."""
+    migrator.sql('DROP TABLE IF EXISTS "import_checkpoint"')
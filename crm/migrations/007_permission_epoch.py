@@ -0,0 +1,21 @@
+"""Peewee migrations -- 007_permission_epoch.
+
+Permissions epoch kept in the database instead of a file next to it, so the
+processes of every host using the database see the same one.
+"""
+
+import peewee as pw
+from peewee_migrate import Migrator
+
+
+def migrate(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your migrations here."""
+    migrator.sql(
+        'CREATE TABLE IF NOT EXISTS "permission_epoch" '
+        '("id" INTEGER NOT NULL PRIMARY KEY, "epoch" INTEGER NOT NULL)'
+    )
+
+
+def rollback(migrator: Migrator, database: pw.Database, *, fake=False):
+    """Write your rollback migrations here."""
+    migrator.sql('DROP TABLE IF EXISTS "permission_epoch"')
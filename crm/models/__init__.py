@@ -1,3 +1 @@
-from peewee import SqliteDatabase
-
-db = SqliteDatabase("db.sqlite3")
+from crm.config import db  # noqa: F401
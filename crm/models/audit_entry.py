@@ -0,0 +1,52 @@
+from peewee import Model, CharField, DateTimeField, IntegerField, TextField
+from crm.config import db
+
+
+class AuditEntry(Model):
+    """Append-only journal of the changes of the clients, contracts, events and
+    users: who (user, the id of the user logged in, None for the scripts)
+    changed which fields (changes, JSON of the new values) of which row
+    (entity, the table, and entity_id) with action create, update or delete.
+    The user is not a foreign key, the history of a deleted user is kept.
+    Written by crm.audit, the triggers of audit_statements refuse to change it"""
+
+    at = DateTimeField()
+    user = IntegerField(null=True, column_name="user_id")
+    entity = CharField(max_length=20)
+    entity_id = IntegerField()
+    action = CharField(max_length=10)
+    changes = TextField()
+
+    class Meta:
+        database = db
+        table_name = "audit_entry"
+        # The rowid ends every index: the history of a row or a user is read
+        # in order from its index
+        indexes = (
+            (("entity", "entity_id"), False),
+            (("user",), False),
+        )
+
+
+TRIGGERS = ("audit_entry_bu", "audit_entry_bd")
+
+
+def audit_statements():
+    """Function to get the SQL of the triggers keeping the journal append-only"""
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS "{name}" BEFORE {action} ON "audit_entry" '
+        "BEGIN SELECT RAISE(ABORT, 'The audit journal is append-only'); END"
+        for name, action in zip(TRIGGERS, ("UPDATE", "DELETE"))
+    ]
+
+
+def drop_audit_statements():
+    return [f'DROP TRIGGER IF EXISTS "{name}"' for name in TRIGGERS]
+
+
+def create_audit_journal(database):
+    """Function to create the journal and its triggers in database"""
+    with database.atomic():
+        database.create_tables([AuditEntry])
+        for statement in audit_statements():
+            database.execute_sql(statement)
@@ -6,10 +6,12 @@ from peewee import (
 )
 from datetime import datetime
 from crm.config import db
+from crm.audit import Audited
+from crm.cache import Cached
 from .user import User
 
 
-class Client(Model):
+class Client(Cached, Audited, Model):
     first_name = CharField(max_length=255)
     last_name = CharField(max_length=255)
     email = CharField(max_length=255, unique=True)
@@ -8,18 +8,21 @@ from peewee import (
 )
 from datetime import datetime
 from crm.config import db
+from crm.audit import Audited
+from crm.cache import Cached
 from .client import Client
 from crm.models.user import User
 
 
-class Contract(Model):
+class Contract(Cached, Audited, Model):
     id = AutoField(primary_key=True)
     client = ForeignKeyField(Client, backref="contracts")
     total_amount = DecimalField()
-    remaining_amount = DecimalField()
+    remaining_amount = DecimalField(index=True)
     created_at = DateTimeField(default=datetime.now())
     status = BooleanField(default=False)
     commercial_contact = ForeignKeyField(User, backref="contracts")
 
     class Meta:
         database = db
+        indexes = ((("status", "remaining_amount"), False),)
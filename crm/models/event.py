@@ -10,18 +10,20 @@ from peewee import (
 from .contract import Contract
 from .user import User
 from crm.config import db
+from crm.audit import Audited
 
 
-class Event(Model):
+class Event(Audited, Model):
     id = AutoField(primary_key=True)
     name = CharField(max_length=255)
     contract = ForeignKeyField(Contract, backref="events")
     start_date = DateTimeField()
     end_date = DateTimeField()
     support_contact = ForeignKeyField(User, backref="events", null=True)
-    location = CharField()
+    location = CharField(index=True)
     attendees = IntegerField()
     notes = TextField()
 
     class Meta:
         database = db
+        indexes = ((("start_date", "end_date"), False),)
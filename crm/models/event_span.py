@@ -0,0 +1,82 @@
+import calendar
+from datetime import date, datetime, timezone
+from peewee import Model, FloatField, IntegerField
+from crm.config import db
+
+
+class EventSpan(Model):
+    """R*Tree index of the events: from start_at to end_at in seconds since
+    the epoch, id is the id of the event. Maintained by the triggers of
+    span_statements, never written by the application.
+    The R*Tree keeps 32 bits floats rounded outwards, so its results are
+    a superset to check against the dates of the events"""
+
+    id = IntegerField(primary_key=True)
+    start_at = FloatField()
+    end_at = FloatField()
+
+    class Meta:
+        database = db
+        table_name = "event_span"
+
+
+def epoch_seconds(value):
+    """Function to convert a date, a datetime or a YYYY-MM-DD[ HH:MM:SS] string
+    to seconds since the epoch, as SQLite strftime('%s') does.
+    A number of seconds is returned as it is"""
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime) and isinstance(value, date):
+        value = datetime(value.year, value.month, value.day)
+    return calendar.timegm(value.timetuple())
+
+
+def as_datetime(value):
+    """Function to convert the values of epoch_seconds to a naive UTC datetime"""
+    seconds = epoch_seconds(value)
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+
+EVENT = '"event"'
+
+
+def span_bounds(row):
+    """Function to get the SQL of the bounds of the span of an event row.
+    min and max: an event ending before its start is still indexed"""
+    start = f"CAST(strftime('%s', {row}.\"start_date\") AS INTEGER)"
+    end = f"CAST(strftime('%s', {row}.\"end_date\") AS INTEGER)"
+    return f"min({start}, {end}), max({start}, {end})"
+
+
+def span_statements():
+    """Function to get the SQL creating the R*Tree of the events, the triggers
+    keeping it in sync with the event table and filling it with the events"""
+    insert = f'INSERT INTO "event_span" VALUES (new."id", {span_bounds("new")});'
+    delete = 'DELETE FROM "event_span" WHERE "id" = old."id";'
+    return [
+        'CREATE VIRTUAL TABLE IF NOT EXISTS "event_span" '
+        'USING rtree("id", "start_at", "end_at")',
+        'CREATE TRIGGER IF NOT EXISTS "event_span_ai" AFTER INSERT ON "event" '
+        f"BEGIN {insert} END",
+        'CREATE TRIGGER IF NOT EXISTS "event_span_ad" AFTER DELETE ON "event" '
+        f"BEGIN {delete} END",
+        'CREATE TRIGGER IF NOT EXISTS "event_span_au" AFTER UPDATE OF '
+        f'"start_date", "end_date" ON "event" BEGIN {delete} {insert} END',
+        'DELETE FROM "event_span"',
+        f'INSERT INTO "event_span" SELECT "id", {span_bounds(EVENT)} FROM "event"',
+    ]
+
+
+def drop_span_statements():
+    return [
+        f'DROP TRIGGER IF EXISTS "event_span_{suffix}"' for suffix in ("ai", "ad", "au")
+    ] + ['DROP TABLE IF EXISTS "event_span"']
+
+
+def create_event_span(database):
+    """Function to create the R*Tree of the events and its triggers in database"""
+    with database.atomic():
+        for statement in span_statements():
+            database.execute_sql(statement)
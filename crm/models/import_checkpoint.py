@@ -0,0 +1,14 @@
+from peewee import Model, IntegerField, TextField
+from crm.config import db
+
+
+class ImportCheckpoint(Model):
+    """Last row committed of an interrupted import (path, the absolute path of
+    the file), written in the transaction of its chunk"""
+
+    path = TextField(primary_key=True)
+    last_row = IntegerField()
+
+    class Meta:
+        database = db
+        table_name = "import_checkpoint"
@@ -3,14 +3,25 @@ from peewee import (
     CharField,
 )
 from crm.config import db
+from .permission_index import invalidate_permission_index
 
 
 class Permission(Model):
-    name = CharField()
+    name = CharField(unique=True)
 
     class Meta:
         database = db
 
+    def save(self, *args, **kwargs):
+        rows = super().save(*args, **kwargs)
+        invalidate_permission_index(self._meta.database)
+        return rows
+
+    def delete_instance(self, *args, **kwargs):
+        rows = super().delete_instance(*args, **kwargs)
+        invalidate_permission_index(self._meta.database)
+        return rows
+
     @staticmethod
     def generate_permissions():
         list_actions = ["get", "create", "list", "update", "delete"]
@@ -0,0 +1,15 @@
+from peewee import Model, IntegerField
+from crm.config import db
+
+
+class PermissionEpoch(Model):
+    """Permissions epoch, one row shared by every process using the database:
+    incremented in the transaction changing the permissions, a role or
+    deleting a user"""
+
+    id = IntegerField(primary_key=True)
+    epoch = IntegerField()
+
+    class Meta:
+        database = db
+        table_name = "permission_epoch"
@@ -0,0 +1,107 @@
+_index = None
+_index_epoch = None
+_epoch = None
+
+
+def load_permission_index():
+    """Function to load the whole role x permission matrix in one query.
+    Returns a dict: role id -> frozenset of permission names"""
+    from crm.models.permission import Permission
+    from crm.models.rolepermission import RolePermission
+
+    matrix = {}
+    query = (
+        RolePermission.select(RolePermission.role, Permission.name)
+        .join(Permission)
+        .tuples()
+    )
+    for role_id, permission_name in query:
+        matrix.setdefault(role_id, set()).add(permission_name)
+    return {role_id: frozenset(names) for role_id, names in matrix.items()}
+
+
+def get_role_permissions(role_id):
+    """Function to get the permission names of a role from the process-wide index,
+    reloaded when another process started a new permissions epoch"""
+    global _index, _index_epoch
+    epoch = current_epoch()
+    if _index is None or epoch != _index_epoch:
+        _index = load_permission_index()
+        _index_epoch = epoch
+    return _index.get(role_id, frozenset())
+
+
+def invalidate_permission_index(database=None):
+    """Function to drop the index, it is reloaded on the next permission check.
+    A new permissions epoch starts with the transaction in progress on database:
+    once it commits the other processes reload their index, the claims of the
+    tokens already given are stale"""
+    from crm.config import after_rollback, db
+
+    database = database or db
+    drop_permission_index()
+    # The index reloaded in the transaction holds its writes
+    after_rollback(database, drop_permission_index)
+    bump_epoch()
+
+
+def drop_permission_index():
+    global _index
+    _index = None
+
+
+def permission_mask(names):
+    """Function to pack permission names in an int, one bit per name
+    in the order of Permission.generate_permissions"""
+    from crm.models.permission import Permission
+
+    return sum(
+        1 << bit
+        for bit, name in enumerate(Permission.generate_permissions())
+        if name in names
+    )
+
+
+def mask_permissions(mask):
+    """Function to unpack the permission names of permission_mask"""
+    from crm.models.permission import Permission
+
+    return frozenset(
+        name
+        for bit, name in enumerate(Permission.generate_permissions())
+        if mask >> bit & 1
+    )
+
+
+def current_epoch():
+    """Function to get the permissions epoch, the claims of a token made
+    in another epoch are stale. It is read once per command or request"""
+    global _epoch
+    if _epoch is None:
+        from crm.models.permission_epoch import PermissionEpoch
+
+        query = PermissionEpoch.select(PermissionEpoch.epoch).where(
+            PermissionEpoch.id == 1
+        )
+        _epoch = query.scalar() or 0
+    return _epoch
+
+
+def forget_epoch():
+    """Function to read the epoch again on its next use, at the end of a
+    command or a request"""
+    global _epoch
+    _epoch = None
+
+
+def bump_epoch():
+    """Function to start a new permissions epoch in the transaction in progress,
+    the other processes see it once it commits"""
+    from crm.config import after_commit
+    from crm.models.permission_epoch import PermissionEpoch
+
+    PermissionEpoch.insert(id=1, epoch=1).on_conflict(
+        conflict_target=[PermissionEpoch.id],
+        update={PermissionEpoch.epoch: PermissionEpoch.epoch + 1},
+    ).execute()
+    after_commit(PermissionEpoch._meta.database, forget_epoch)
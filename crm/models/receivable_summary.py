@@ -0,0 +1,87 @@
+from peewee import (
+    Model,
+    CharField,
+    DecimalField,
+    ForeignKeyField,
+    IntegerField,
+)
+from crm.config import db
+from .client import Client
+from crm.models.user import User
+
+
+class ReceivableSummary(Model):
+    """Totals of the contracts per commercial contact, client and month of
+    creation. Maintained by the triggers of summary_statements, never written
+    by the application"""
+
+    commercial_contact = ForeignKeyField(User, backref="receivables")
+    client = ForeignKeyField(Client, backref="receivables")
+    month = CharField(max_length=7)
+    contracts = IntegerField(default=0)
+    total_amount = DecimalField(default=0)
+    remaining_amount = DecimalField(default=0)
+
+    class Meta:
+        database = db
+        table_name = "receivable_summary"
+        indexes = ((("commercial_contact", "client", "month"), True),)
+
+
+KEY = ("commercial_contact_id", "client_id", "month")
+TRIGGERS = ("contract_summary_ai", "contract_summary_ad", "contract_summary_au")
+
+
+def summary_statements():
+    """Function to get the SQL of the triggers keeping ReceivableSummary up to
+    date with the contract table and filling it with the contracts already there"""
+    add = (
+        'INSERT INTO "receivable_summary" ("commercial_contact_id", "client_id", '
+        '"month", "contracts", "total_amount", "remaining_amount") '
+        'VALUES (new."commercial_contact_id", new."client_id", '
+        'substr(new."created_at", 1, 7), 1, new."total_amount", new."remaining_amount") '
+        'ON CONFLICT ("commercial_contact_id", "client_id", "month") DO UPDATE SET '
+        '"contracts" = "contracts" + 1, '
+        '"total_amount" = "total_amount" + excluded."total_amount", '
+        '"remaining_amount" = "remaining_amount" + excluded."remaining_amount";'
+    )
+    old_key = (
+        'WHERE "commercial_contact_id" = old."commercial_contact_id" '
+        'AND "client_id" = old."client_id" '
+        'AND "month" = substr(old."created_at", 1, 7);'
+    )
+    remove = (
+        'UPDATE "receivable_summary" SET "contracts" = "contracts" - 1, '
+        '"total_amount" = "total_amount" - old."total_amount", '
+        '"remaining_amount" = "remaining_amount" - old."remaining_amount" ' + old_key
+        # The rows without contracts are dropped to keep the table small
+        + ' DELETE FROM "receivable_summary" WHERE "contracts" = 0 AND '
+        + old_key[len("WHERE ") :]
+    )
+    return [
+        'CREATE TRIGGER IF NOT EXISTS "contract_summary_ai" AFTER INSERT ON "contract" '
+        f"BEGIN {add} END",
+        'CREATE TRIGGER IF NOT EXISTS "contract_summary_ad" AFTER DELETE ON "contract" '
+        f"BEGIN {remove} END",
+        'CREATE TRIGGER IF NOT EXISTS "contract_summary_au" AFTER UPDATE OF '
+        '"commercial_contact_id", "client_id", "created_at", "total_amount", '
+        f'"remaining_amount" ON "contract" BEGIN {remove} {add} END',
+        'DELETE FROM "receivable_summary"',
+        'INSERT INTO "receivable_summary" ("commercial_contact_id", "client_id", '
+        '"month", "contracts", "total_amount", "remaining_amount") '
+        'SELECT "commercial_contact_id", "client_id", substr("created_at", 1, 7), '
+        'COUNT(*), SUM("total_amount"), SUM("remaining_amount") FROM "contract" '
+        "GROUP BY 1, 2, 3",
+    ]
+
+
+def drop_summary_statements():
+    return [f'DROP TRIGGER IF EXISTS "{trigger}"' for trigger in TRIGGERS]
+
+
+def create_receivable_summary(database):
+    """Function to create the summary table and its triggers in database"""
+    with database.atomic():
+        database.create_tables([ReceivableSummary])
+        for statement in summary_statements():
+            database.execute_sql(statement)
@@ -3,10 +3,22 @@ from peewee import (
     CharField,
 )
 from crm.config import db
+from crm.cache import Cached
+from .permission_index import invalidate_permission_index
 
 
-class Role(Model):
+class Role(Cached, Model):
     name = CharField(unique=True)
 
     class Meta:
         database = db
+
+    def save(self, *args, **kwargs):
+        rows = super().save(*args, **kwargs)
+        invalidate_permission_index(self._meta.database)
+        return rows
+
+    def delete_instance(self, *args, **kwargs):
+        rows = super().delete_instance(*args, **kwargs)
+        invalidate_permission_index(self._meta.database)
+        return rows
@@ -3,6 +3,7 @@ from peewee import (
     ForeignKeyField,
 )
 from crm.config import db
+from .permission_index import invalidate_permission_index
 from .role import Role
 from .permission import Permission
 
@@ -13,3 +14,14 @@ class RolePermission(Model):
 
     class Meta:
         database = db
+        indexes = ((("role", "permission"), True),)
+
+    def save(self, *args, **kwargs):
+        rows = super().save(*args, **kwargs)
+        invalidate_permission_index(self._meta.database)
+        return rows
+
+    def delete_instance(self, *args, **kwargs):
+        rows = super().delete_instance(*args, **kwargs)
+        invalidate_permission_index(self._meta.database)
+        return rows
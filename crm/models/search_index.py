@@ -0,0 +1,87 @@
+from playhouse.sqlite_ext import FTS5Model, SearchField
+from crm.config import db
+
+
+class ClientIndex(FTS5Model):
+    """Full-text index of the clients, its rowid is the id of the client"""
+
+    first_name = SearchField()
+    last_name = SearchField()
+    email = SearchField()
+    company_name = SearchField()
+
+    class Meta:
+        database = db
+        table_name = "client_fts"
+        options = {
+            "content": "client",
+            "content_rowid": "id",
+            "prefix": "2 3",
+            "tokenize": "unicode61 remove_diacritics 2",
+        }
+
+
+class EventIndex(FTS5Model):
+    """Full-text index of the events, its rowid is the id of the event"""
+
+    name = SearchField()
+    location = SearchField()
+    notes = SearchField()
+
+    class Meta:
+        database = db
+        table_name = "event_fts"
+        options = {
+            "content": "event",
+            "content_rowid": "id",
+            "prefix": "2 3",
+            "tokenize": "unicode61 remove_diacritics 2",
+        }
+
+
+INDEXES = [ClientIndex, EventIndex]
+
+
+def search_index_statements(index):
+    """Function to get the SQL creating index, the triggers keeping it in sync
+    with its content table and filling it with the rows already there"""
+    table = index._meta.table_name
+    content = index._meta.options["content"]
+    columns = [field.column_name for field in index._meta.sorted_fields[1:]]
+    names = ", ".join(f'"{column}"' for column in columns)
+    new = ", ".join(f'new."{column}"' for column in columns)
+    old = ", ".join(f'old."{column}"' for column in columns)
+    options = ", ".join(
+        f"{name}='{value}'" for name, value in index._meta.options.items()
+    )
+    insert = f'INSERT INTO "{table}" (rowid, {names}) VALUES (new."id", {new});'
+    delete = (
+        f'INSERT INTO "{table}" ("{table}", rowid, {names}) '
+        f"VALUES ('delete', old.\"id\", {old});"
+    )
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{table}" USING fts5 ({names}, {options})',
+        f'CREATE TRIGGER IF NOT EXISTS "{table}_ai" AFTER INSERT ON "{content}" '
+        f"BEGIN {insert} END",
+        f'CREATE TRIGGER IF NOT EXISTS "{table}_ad" AFTER DELETE ON "{content}" '
+        f"BEGIN {delete} END",
+        # Only the changes of the indexed columns are written in the index
+        f'CREATE TRIGGER IF NOT EXISTS "{table}_au" AFTER UPDATE OF {names} '
+        f'ON "{content}" BEGIN {delete} {insert} END',
+        f"INSERT INTO \"{table}\" (\"{table}\") VALUES ('rebuild')",
+    ]
+
+
+def drop_search_index_statements(index):
+    table = index._meta.table_name
+    return [
+        f'DROP TRIGGER IF EXISTS "{table}_{suffix}"' for suffix in ("ai", "ad", "au")
+    ] + [f'DROP TABLE IF EXISTS "{table}"']
+
+
+def create_search_index(database, indexes=INDEXES):
+    """Function to create the full-text indexes and their triggers in database"""
+    with database.atomic():
+        for index in indexes:
+            for statement in search_index_statements(index):
+                database.execute_sql(statement)
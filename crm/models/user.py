@@ -5,34 +5,61 @@ from peewee import (
 )
 import typer
 from crm.config import db
+from crm.audit import Audited
+from crm.cache import Cached
 from crm.models.role import Role
 from crm.auth import generate_token
-from crm.models.permission import Permission
-from crm.models.rolepermission import RolePermission
+from crm.models.permission_index import (
+    bump_epoch,
+    current_epoch,
+    get_role_permissions,
+    permission_mask,
+)
 
 
-class User(Model):
+class User(Cached, Audited, Model):
 
-    name = CharField()
+    name = CharField(index=True)
     email = CharField(unique=True)
     password = CharField()
     role = ForeignKeyField(Role, backref="user")
 
+    audit_hidden = ("password",)
+
     class Meta:
         database = db
 
+    def save(self, *args, **kwargs):
+        # A new role makes the claims of the tokens of this user stale
+        new_role = self.id is not None and "role" in self._dirty
+        rows = super().save(*args, **kwargs)
+        if new_role:
+            bump_epoch()
+        return rows
+
+    def delete_instance(self, *args, **kwargs):
+        rows = super().delete_instance(*args, **kwargs)
+        bump_epoch()
+        return rows
+
+    def claims(self):
+        """Function to get the authorization claims embedded in the tokens"""
+        return {
+            "role_id": self.role_id,
+            "role": self.role.name,
+            "perms": permission_mask(get_role_permissions(self.role_id)),
+            "epoch": current_epoch(),
+        }
+
     def generate_token(self):
-        return generate_token(self.id)
+        return generate_token(self.id, self.claims())
 
     def has_permission(self, permission_name):
-        permission = Permission.get_or_none(Permission.name == permission_name)
-        if not permission:
-            return False
-        role_perm = (
-            RolePermission.get_or_none(role=self.role, permission=permission)
-            is not None
-        )
-        return role_perm
+        # The user of a token knows its permissions from the claims
+        permissions = getattr(self, "claimed_permissions", None)
+        if permissions is None:
+            permissions = get_role_permissions(self.role_id)
+        return permission_name in permissions
 
     def has_permission_own(self, contact):
         print(self.id)
@@ -0,0 +1,260 @@
+"""Deferred Sentry reporting.
+
+Messages and exceptions are appended to a local spool file instead of being
+sent while the command runs. The spool is drained in batches by the crm serve
+daemon, by python -m crm flush-events or by a detached python -m crm.monitoring
+worker started when a command leaves a full batch behind. sentry_sdk is only
+imported and initialized when the spool is drained.
+
+Environment variables:
+SENTRY_DSN: dsn of the project, "local" to write the events in CRM_SENTRY_LOCAL_FILE,
+    nothing is spooled without it
+SENTRY_TRACES_SAMPLE_RATE: traces sample rate given to sentry_sdk.init
+CRM_SENTRY_SAMPLE_RATE: share of the events kept, 1.0 by default
+CRM_SENTRY_SAMPLE_RATES: per command rates, e.g. "contract=1.0,user update-user=0.1"
+CRM_SENTRY_SPOOL: path of the spool file, next to the SQLite database by default
+CRM_SENTRY_BATCH_SIZE: number of spooled events starting a background drain
+"""
+
+import atexit
+import fcntl
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import traceback
+
+LOCAL_DSN = "local"
+
+_initialized = False
+_worker_hook = False
+
+
+def spool_path():
+    """Function to get the path of the spool file, next to the SQLite database
+    by default: the daemon runs the commands in the directory of each client"""
+    path = os.getenv("CRM_SENTRY_SPOOL")
+    if path:
+        return path
+    from crm.config import DATABASE_PATH, db, is_sqlite, sqlite_path
+
+    database = db.database
+    if (
+        not is_sqlite(db)
+        or database in ("", ":memory:")
+        or database.startswith("file:")
+    ):
+        database = DATABASE_PATH
+    return os.path.join(os.path.dirname(sqlite_path(database)), "sentry_spool.jsonl")
+
+
+def batch_size():
+    return int(os.getenv("CRM_SENTRY_BATCH_SIZE", "50"))
+
+
+def current_command():
+    """Function to get the running command, e.g. "contract create-contract" """
+    click = sys.modules.get("click")
+    ctx = click.get_current_context(silent=True) if click else None
+    names = []
+    while ctx is not None and ctx.parent is not None:
+        names.append(ctx.info_name)
+        ctx = ctx.parent
+    return " ".join(reversed(names))
+
+
+def sample_rate(command):
+    """Function to get the sample rate of a command.
+    The most specific entry of CRM_SENTRY_SAMPLE_RATES wins"""
+    rates = {}
+    for entry in os.getenv("CRM_SENTRY_SAMPLE_RATES", "").split(","):
+        if "=" in entry:
+            name, rate = entry.split("=", 1)
+            rates[name.strip()] = float(rate)
+    words = command.split()
+    while words:
+        name = " ".join(words)
+        if name in rates:
+            return rates[name]
+        words.pop()
+    return float(os.getenv("CRM_SENTRY_SAMPLE_RATE", "1.0"))
+
+
+def spool(record):
+    """Function to append one event to the spool file, if it is sampled"""
+    return spool_records([record]) == 1
+
+
+def spool_records(records):
+    """Function to append the sampled events of records to the spool file in
+    one write, under the lock of the drainers: no event is appended to a spool
+    being swapped. Returns the number of events spooled"""
+    global _worker_hook
+    if not os.getenv("SENTRY_DSN"):
+        return 0
+    command = current_command()
+    rate = sample_rate(command)
+    lines = []
+    for record in records:
+        if random.random() >= rate:
+            continue
+        record.update(time=time.time(), command=command)
+        lines.append(json.dumps(record) + "\n")
+    if not lines:
+        return 0
+    path = spool_path()
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        with open(path, "a", encoding="utf-8") as spool_file:
+            spool_file.write("".join(lines))
+    if not _worker_hook:
+        atexit.register(start_worker_if_full)
+        _worker_hook = True
+    return len(lines)
+
+
+def capture_message(message, level="info"):
+    """Function to report a message to Sentry (deferred)"""
+    return spool({"type": "message", "message": message, "level": level})
+
+
+def capture_messages(messages, level="info"):
+    """Function to report messages to Sentry (deferred), spooled together"""
+    return spool_records(
+        [
+            {"type": "message", "message": message, "level": level}
+            for message in messages
+        ]
+    )
+
+
+def capture_exception(exception):
+    """Function to report an exception to Sentry (deferred)"""
+    return spool(
+        {
+            "type": "exception",
+            "exception": type(exception).__name__,
+            "message": str(exception),
+            "traceback": "".join(
+                traceback.format_exception(
+                    type(exception), exception, exception.__traceback__
+                )
+            ),
+            "level": "error",
+        }
+    )
+
+
+def init_sentry():
+    """Function to initialize sentry_sdk once, on first use"""
+    global _initialized
+    if _initialized:
+        return
+    import sentry_sdk
+    from sentry_sdk.integrations.logging import LoggingIntegration
+    from sentry_sdk.transport import Transport
+
+    class LocalTransport(Transport):
+        """Transport writing the envelopes in a local file, to work offline"""
+
+        def capture_envelope(self, envelope):
+            path = os.getenv("CRM_SENTRY_LOCAL_FILE", "sentry_local.jsonl")
+            with open(path, "a", encoding="utf-8") as local_file:
+                for item in envelope.items:
+                    if item.payload.json is not None:
+                        local_file.write(json.dumps(item.payload.json) + "\n")
+
+    dsn = os.getenv("SENTRY_DSN")
+    options = {
+        "dsn": dsn,
+        "integrations": [LoggingIntegration()],
+        "traces_sample_rate": float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", "1.0")),
+    }
+    if dsn == LOCAL_DSN:
+        options["dsn"] = "http://public@localhost/1"
+        options["transport"] = LocalTransport
+    sentry_sdk.init(**options)
+    _initialized = True
+
+
+def send(record):
+    """Function to send one spooled record with sentry_sdk"""
+    import sentry_sdk
+
+    with sentry_sdk.new_scope() as scope:
+        scope.set_tag("command", record.get("command") or "crm")
+        if record["type"] == "exception":
+            sentry_sdk.capture_event(
+                {
+                    "level": record["level"],
+                    "timestamp": record["time"],
+                    "exception": {
+                        "values": [
+                            {"type": record["exception"], "value": record["message"]}
+                        ]
+                    },
+                    "extra": {"traceback": record["traceback"]},
+                }
+            )
+        else:
+            sentry_sdk.capture_event(
+                {
+                    "level": record["level"],
+                    "timestamp": record["time"],
+                    "message": record["message"],
+                }
+            )
+
+
+def drain_spool():
+    """Function to send every spooled event to Sentry in one batch.
+    Only one drainer (daemon, worker, flush-events) sends at a time, the
+    others return at once. The commands spooling events meanwhile wait for
+    the end of the drain. Returns the number of events sent"""
+    path = spool_path()
+    with open(f"{path}.lock", "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0
+        # A batch left by an interrupted drainer is sent first
+        draining = f"{path}.draining"
+        if not os.path.exists(draining):
+            try:
+                os.replace(path, draining)
+            except FileNotFoundError:
+                return 0
+        with open(draining, encoding="utf-8") as spool_file:
+            records = [json.loads(line) for line in spool_file if line.strip()]
+        if records:
+            init_sentry()
+            import sentry_sdk
+
+            for record in records:
+                send(record)
+            sentry_sdk.flush()
+        os.remove(draining)
+        return len(records)
+
+
+def start_worker_if_full():
+    """Function to start a detached drain worker when a batch is waiting"""
+    try:
+        with open(spool_path(), "rb") as spool_file:
+            count = sum(1 for _ in spool_file)
+    except FileNotFoundError:
+        return
+    if count >= batch_size():
+        subprocess.Popen(
+            [sys.executable, "-m", "crm.monitoring"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+
+if __name__ == "__main__":
+    drain_spool()
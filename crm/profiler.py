@@ -0,0 +1,191 @@
+"""Query profiler of one command: python -m crm --profile contract list-contracts
+
+Every statement run on a cursor of the database the models are bound to is
+timed: the queries of execute_sql as well as the executemany of the bulk
+writes (the journal, the imports, the assignments), one statement for all its
+rows (preparation and first step, the rows are fetched afterwards).
+The report, written on stderr at the end of the command, gives the number
+of statements, their total and 95th percentile times, the statements run
+several times with only their parameters changing (the N+1 queries, grouped
+by fingerprint), the slowest statements and the hits of the row cache
+(crm.cache), as text or JSON.
+"""
+
+import json
+import math
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+import typer
+from crm import cache
+
+FORMATS = ["text", "json"]
+# A list of placeholders (IN, VALUES) is one placeholder in a fingerprint
+PLACEHOLDERS = re.compile(r"\?(\s*,\s*\?)+")
+SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Function to get the shape of a statement: its SQL without the number of
+    parameters of its lists"""
+    return PLACEHOLDERS.sub("?", SPACES.sub(" ", sql.strip()))
+
+
+def percentile(values, share):
+    """Function to get the nearest-rank percentile (share from 0 to 1) of values"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
+
+
+class Profile:
+    """Statements run during a command, with their parameters and durations"""
+
+    def __init__(self):
+        self.statements = []
+        self.cache_start = cache.stats()
+
+    def record(self, sql, params, seconds):
+        self.statements.append((sql, params, seconds))
+
+    def cache_summary(self):
+        """Function to get the hits and misses of the row cache since the start"""
+        now = cache.stats()
+        hits = now["hits"] - self.cache_start["hits"]
+        misses = now["misses"] - self.cache_start["misses"]
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / lookups, 3) if lookups else None,
+        }
+
+    def summary(self, top=5):
+        """Function to sum up the statements: counts, times in milliseconds,
+        repeated fingerprints (most run first), the top slowest and the row
+        cache"""
+        durations = [seconds for _, _, seconds in self.statements]
+        counts = Counter()
+        times = Counter()
+        for sql, _, seconds in self.statements:
+            counts[fingerprint(sql)] += 1
+            times[fingerprint(sql)] += seconds
+        slowest = sorted(self.statements, key=lambda statement: -statement[2])
+        return {
+            "statements": len(durations),
+            "total_ms": round(sum(durations) * 1000, 3),
+            "p95_ms": round(percentile(durations, 0.95) * 1000, 3) if durations else 0,
+            "repeated": [
+                {"count": count, "total_ms": round(times[sql] * 1000, 3), "sql": sql}
+                for sql, count in counts.most_common()
+                if count > 1
+            ],
+            "slowest": [
+                {
+                    "ms": round(seconds * 1000, 3),
+                    "sql": sql,
+                    "params": list(params or ()),
+                }
+                for sql, params, seconds in slowest[:top]
+            ],
+            "cache": self.cache_summary(),
+        }
+
+
+def text_report(summary):
+    lines = [
+        f"{summary['statements']} statements in {summary['total_ms']:.1f} ms,"
+        f" p95 {summary['p95_ms']:.2f} ms"
+    ]
+    if summary["repeated"]:
+        lines.append("Repeated statements (N+1):")
+        lines += [
+            f"  {row['count']}x {row['total_ms']:.1f} ms {row['sql']}"
+            for row in summary["repeated"]
+        ]
+    if summary["slowest"]:
+        lines.append("Slowest statements:")
+        lines += [
+            f"  {row['ms']:.2f} ms {row['sql']} {row['params']}"
+            for row in summary["slowest"]
+        ]
+    rows = summary["cache"]
+    if rows["hit_ratio"] is not None:
+        lines.append(
+            f"Row cache: {rows['hits']} hits, {rows['misses']} misses"
+            f" ({rows['hit_ratio']:.0%} hits)"
+        )
+    return "\n".join(lines)
+
+
+class TimedCursor:
+    """Cursor of the database recording its execute and executemany in profile"""
+
+    def __init__(self, cursor, profile):
+        self._cursor = cursor
+        self._profile = profile
+
+    def execute(self, sql, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            self._cursor.execute(sql, *args, **kwargs)
+            return self
+        finally:
+            params = args[0] if args else None
+            self._profile.record(sql, params, time.perf_counter() - start)
+
+    def executemany(self, sql, rows, *args, **kwargs):
+        rows = rows if isinstance(rows, (list, tuple)) else list(rows)
+        start = time.perf_counter()
+        try:
+            self._cursor.executemany(sql, rows, *args, **kwargs)
+            return self
+        finally:
+            # The parameters of every row would flood the report
+            params = [f"{len(rows)} rows"]
+            self._profile.record(sql, params, time.perf_counter() - start)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+@contextmanager
+def profiled(database):
+    """Context manager timing the statements run on database. Yields the Profile"""
+    profile = Profile()
+    cursor = database.cursor
+    patched = "cursor" in vars(database)
+
+    def timed_cursor(*args, **kwargs):
+        return TimedCursor(cursor(*args, **kwargs), profile)
+
+    database.cursor = timed_cursor
+    try:
+        yield profile
+    finally:
+        if patched:
+            database.cursor = cursor
+        else:
+            del database.cursor
+
+
+def profile_command(ctx, output_format="text", top=5):
+    """Function to profile the command of the click context ctx, the report is
+    written on stderr when the context closes"""
+    if output_format not in FORMATS:
+        raise typer.BadParameter(f"choose from {', '.join(FORMATS)}")
+    from crm.models.user import User
+
+    profile = ctx.with_resource(profiled(User._meta.database))
+
+    def report():
+        summary = profile.summary(top)
+        if output_format == "json":
+            typer.echo(json.dumps(summary, default=str), err=True)
+        else:
+            typer.echo(text_report(summary), err=True)
+
+    ctx.call_on_close(report)
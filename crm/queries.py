@@ -0,0 +1,178 @@
+from peewee import JOIN, fn
+from crm.models.client import Client
+from crm.models.contract import Contract
+from crm.models.event import Event
+from crm.config import is_sqlite
+from crm.models.event_span import EventSpan, as_datetime, epoch_seconds
+from crm.models.role import Role
+from crm.models.user import User
+
+
+def events_with_relations():
+    """Function to select the events with their contract and support contact
+    preloaded in the same query"""
+    return (
+        Event.select(Event, Contract, User)
+        .join(Contract)
+        .switch(Event)
+        .join(User, JOIN.LEFT_OUTER, on=(Event.support_contact == User.id))
+    )
+
+
+def contracts_with_client():
+    """Function to select the contracts with their client preloaded in the same query"""
+    return Contract.select(Contract, Client).join(Client)
+
+
+def users_with_role():
+    """Function to select the users with their role preloaded in the same query"""
+    return User.select(User, Role).join(Role)
+
+
+def paginate(query, model, after_id=None, limit=None):
+    """Function to get one page of query ordered by id (keyset pagination):
+    the rows with an id greater than after_id, at most limit rows"""
+    if after_id is not None:
+        query = query.where(model.id > after_id)
+    query = query.order_by(model.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def seconds(field):
+    """Function to get the SQL of a date column in seconds since the epoch"""
+    if is_sqlite(field.model._meta.database):
+        return fn.strftime("%s", field).cast("INTEGER")
+    return fn.date_part("epoch", field).cast("INTEGER")
+
+
+def month(field):
+    """Function to get the SQL of the YYYY-MM month of a date column"""
+    if is_sqlite(field.model._meta.database):
+        return fn.substr(field, 1, 7)
+    return fn.to_char(field, "YYYY-MM")
+
+
+def overlapping(query, start, end):
+    """Function to keep the events of query overlapping start - end (inclusive).
+    The R*Tree of the events finds the candidates in logarithmic time,
+    their exact dates are then checked. Without SQLite the dates are compared
+    directly, with the index of the event dates"""
+    if not is_sqlite(Event._meta.database):
+        return query.where(
+            (Event.start_date <= as_datetime(end))
+            & (Event.end_date >= as_datetime(start))
+        )
+    start, end = epoch_seconds(start), epoch_seconds(end)
+    return query.join_from(Event, EventSpan, on=(EventSpan.id == Event.id)).where(
+        (EventSpan.start_at <= end)
+        & (EventSpan.end_at >= start)
+        & (seconds(Event.start_date) <= end)
+        & (seconds(Event.end_date) >= start)
+    )
+
+
+def exclude_event(query, event):
+    """Function to leave event out of query, an event not saved yet has no id"""
+    if event.id is None:
+        return query
+    return query.where(Event.id != event.id)
+
+
+def support_conflicts(event, support_contact):
+    """Function to select the other events of support_contact overlapping event"""
+    query = overlapping(Event.select(), event.start_date, event.end_date).where(
+        Event.support_contact == support_contact
+    )
+    return exclude_event(query, event)
+
+
+def venue_conflicts(event):
+    """Function to select the other events at the location of event overlapping it"""
+    query = overlapping(Event.select(), event.start_date, event.end_date).where(
+        fn.lower(Event.location) == event.location.lower()
+    )
+    return exclude_event(query, event)
+
+
+def sweep(intervals):
+    """Function to find the overlapping pairs of (start, end, id) intervals,
+    sorted by start: each interval is only compared to the ones not ended yet"""
+    ongoing = []
+    for start, end, event_id in intervals:
+        ongoing = [other for other in ongoing if other[0] >= start]
+        for _, other_id in ongoing:
+            yield event_id, other_id
+        ongoing.append((end, event_id))
+
+
+def support_double_bookings(support_contact, event_ids):
+    """Function to find the events of support_contact overlapping one of the
+    events event_ids, by a sweep of all its events.
+    Returns the overlapping pairs (event id, other event id)"""
+    event_ids = set(event_ids)
+    intervals = (
+        Event.select(seconds(Event.start_date), seconds(Event.end_date), Event.id)
+        .where(Event.support_contact == support_contact)
+        .tuples()
+    )
+    return [
+        pair
+        for pair in sweep(sorted(intervals))
+        if pair[0] in event_ids or pair[1] in event_ids
+    ]
+
+
+def calendar_conflicts(start, end):
+    """Function to find the support contacts and the locations booked twice by
+    the events overlapping start - end.
+    The R*Tree gives the events overlapping these events, they are then swept
+    by support contact and location.
+    Returns a dict: event id -> list of (kind, other event id)"""
+    start, end = epoch_seconds(start), epoch_seconds(end)
+    # The other event of a conflict overlaps the span of the events of the period
+    if is_sqlite(Event._meta.database):
+        bounds = EventSpan.select(
+            fn.MIN(EventSpan.start_at), fn.MAX(EventSpan.end_at)
+        ).where((EventSpan.start_at <= end) & (EventSpan.end_at >= start))
+    else:
+        bounds = overlapping(
+            Event.select(
+                fn.MIN(seconds(Event.start_date)), fn.MAX(seconds(Event.end_date))
+            ),
+            start,
+            end,
+        )
+    bounds = bounds.tuples().get()
+    if bounds[0] is None:
+        return {}
+    query = overlapping(
+        Event.select(
+            Event.id,
+            seconds(Event.start_date),
+            seconds(Event.end_date),
+            Event.support_contact,
+            Event.location,
+        ),
+        bounds[0],
+        bounds[1],
+    ).tuples()
+    groups = {}
+    in_period = set()
+    for event_id, event_start, event_end, support, location in query:
+        if event_start <= end and event_end >= start:
+            in_period.add(event_id)
+        interval = (event_start, event_end, event_id)
+        groups.setdefault(("venue", location.lower()), []).append(interval)
+        if support is not None:
+            groups.setdefault(("support", support), []).append(interval)
+    conflicts = {}
+    for (kind, _), intervals in groups.items():
+        for event_id, other_id in sweep(sorted(intervals)):
+            for first, second in ((event_id, other_id), (other_id, event_id)):
+                if first in in_period:
+                    conflicts.setdefault(first, []).append((kind, second))
+    for clashes in conflicts.values():
+        clashes.sort(key=lambda clash: (clash[1], clash[0] == "support"))
+    return conflicts
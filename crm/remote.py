@@ -0,0 +1,124 @@
+"""Thin client forwarding a command to the crm daemon (python -m crm serve):
+python -m crm.remote client list-clients
+
+Only the standard library is imported here so a forwarded command does not
+pay for typer, peewee, bcrypt or sentry. If no daemon is listening the
+command is run locally instead.
+
+A stdin redirected from a file or a pipe is read to its end and sent with the
+command. From a terminal the prompts of the command are forwarded: the daemon
+asks the client for each line, the hidden ones are read with getpass."""
+
+import io
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+
+SOCKET_ENV = "CRM_SOCKET"
+HEADER = struct.Struct("!cI")
+
+REQUEST = b"r"
+OUTPUT = b"o"
+EXIT = b"x"
+INPUT = b"i"
+SECRET = b"s"
+
+
+def default_socket_path():
+    """Function to get the path of the daemon socket: CRM_SOCKET or a per user file in /tmp"""
+    return os.getenv(SOCKET_ENV) or f"/tmp/crm-{os.getuid()}.sock"
+
+
+def send_frame(stream, kind, payload):
+    """Function to write one frame: kind (1 byte), payload length, payload"""
+    stream.write(HEADER.pack(kind, len(payload)) + payload)
+    stream.flush()
+
+
+def read_frame(stream):
+    """Function to read one frame, returns (kind, payload) or (None, b"") at end of stream"""
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None, b""
+    kind, length = HEADER.unpack(header)
+    return kind, stream.read(length)
+
+
+def answer(stream, kind, payload, terminal):
+    """Function to answer a prompt of the daemon with a line of the terminal,
+    read with getpass for a hidden one. An empty answer is the end of input"""
+    if kind == SECRET:
+        import getpass
+
+        try:
+            line = getpass.getpass(payload.decode())
+        except EOFError:
+            line = ""
+    else:
+        line = terminal.readline()
+    send_frame(stream, INPUT, line.encode())
+
+
+def forward(argv, socket_path=None, stdin="", stdout=None, terminal=None):
+    """Function to send argv to the daemon and stream its output back.
+    stdin is the input of the command, or None to answer its prompts
+    interactively from terminal (sys.stdin by default).
+    Returns the exit code of the command"""
+    stdout = stdout or sys.stdout.buffer
+    terminal = terminal or sys.stdin
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path or default_socket_path())
+        stream = sock.makefile("rwb")
+        request = {"argv": list(argv), "cwd": os.getcwd()}
+        if stdin is None:
+            request["interactive"] = True
+        else:
+            request["stdin"] = stdin
+        send_frame(stream, REQUEST, json.dumps(request).encode())
+        while True:
+            kind, payload = read_frame(stream)
+            if kind == OUTPUT:
+                stdout.write(payload)
+                stdout.flush()
+            elif kind in (INPUT, SECRET):
+                answer(stream, kind, payload, terminal)
+            elif kind == EXIT:
+                return int(payload)
+            else:
+                return 1
+
+
+def redirected_stdin():
+    """Function to read stdin when it is redirected from a file or a pipe.
+    Returns None for a terminal, whose lines are read on demand, and "" for
+    anything else (closed, /dev/null, a socket) which is not read"""
+    try:
+        fd = sys.stdin.fileno()
+        mode = os.fstat(fd).st_mode
+    except (AttributeError, OSError, ValueError):
+        return ""
+    if os.isatty(fd):
+        return None
+    if stat.S_ISFIFO(mode) or stat.S_ISREG(mode):
+        return sys.stdin.read()
+    return ""
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    stdin = redirected_stdin()
+    try:
+        return forward(argv, stdin=stdin)
+    except (FileNotFoundError, ConnectionRefusedError):
+        from crm.__main__ import app
+
+        if stdin is not None:
+            sys.stdin = io.StringIO(stdin)
+        return app(args=argv, prog_name="crm")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
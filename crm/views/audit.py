@@ -0,0 +1,87 @@
+import json
+import typer
+from typing_extensions import Annotated, Optional
+from crm.models.audit_entry import AuditEntry
+from crm.auth import auth_required
+from crm.views.output import echo_lines
+
+app = typer.Typer()
+
+ENTITIES = ["client", "contract", "event", "user"]
+
+
+def history(entity=None, entity_id=None, user_id=None, before=None, limit=50):
+    """Function to select the latest entries of the journal, of one row
+    (entity and entity_id), of the rows of one table (entity) and/or of one
+    user, before the entry before. Each filter is a range of an index"""
+    query = AuditEntry.select(
+        AuditEntry.id,
+        AuditEntry.at,
+        AuditEntry.user,
+        AuditEntry.action,
+        AuditEntry.entity,
+        AuditEntry.entity_id,
+        AuditEntry.changes,
+    )
+    if entity is not None:
+        query = query.where(AuditEntry.entity == entity)
+    if entity_id is not None:
+        query = query.where(AuditEntry.entity_id == entity_id)
+    if user_id is not None:
+        query = query.where(AuditEntry.user == user_id)
+    if before is not None:
+        query = query.where(AuditEntry.id < before)
+    return query.order_by(AuditEntry.id.desc()).limit(limit).tuples()
+
+
+def entry_line(entry):
+    entry_id, at, user_id, action, entity, entity_id, changes = entry
+    author = f"user n°{user_id}" if user_id is not None else "script"
+    fields = ", ".join(f"{name}={value}" for name, value in json.loads(changes).items())
+    line = f"n°{entry_id} {at} {author}: {action} {entity} n°{entity_id}"
+    return f"{line} {fields}" if fields else line
+
+
+@app.command(name="show")
+@auth_required
+def show(
+    entity: Annotated[
+        Optional[str], typer.Option("-e", help="client, contract, event or user")
+    ] = None,
+    entity_id: Annotated[
+        Optional[int], typer.Option("-i", help="Id of the row, with -e")
+    ] = None,
+    user_id: Annotated[
+        Optional[int], typer.Option("-u", help="Changes made by this user")
+    ] = None,
+    before: Annotated[
+        Optional[int], typer.Option("--before", help="Entries before this one")
+    ] = None,
+    limit: Annotated[int, typer.Option("-l", help="Number of entries")] = 50,
+    user=None,
+):
+    """Function to show who changed what, the latest changes first:
+    python -m crm audit show -e "client, contract, event or user" -i "id" -u "user id".
+    Except for an admin only your own changes are shown.
+    AUTH REQUIRED LOGIN FIRST"""
+    try:
+        if entity is not None and entity not in ENTITIES:
+            typer.echo(f"Invalid entity, choose from {', '.join(ENTITIES)}")
+            return
+        if entity_id is not None and entity is None:
+            typer.echo("The id of a row goes with its entity: -e")
+            return
+        if not user.role.name == "Admin":
+            if user_id is not None and user_id != user.id:
+                typer.echo("You don't have the permissions required")
+                return
+            user_id = user.id
+        entries = history(entity, entity_id, user_id, before, limit)
+        if not echo_lines(entry_line(entry) for entry in entries):
+            typer.echo("No changes found")
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    app()
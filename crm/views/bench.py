@@ -0,0 +1,64 @@
+import secrets
+import time
+import typer
+from typing import Optional
+from typing_extensions import Annotated
+from crm.config import make_database
+from crm.dataset import ADMIN_EMAIL, MODELS, generate
+from crm.models.user import User
+
+app = typer.Typer()
+
+
+@app.command(name="seed")
+def seed(
+    scale: Annotated[
+        float, typer.Option("--scale", help="Number of clients: 1e3 to 1e6")
+    ] = 1000,
+    random_seed: Annotated[
+        int, typer.Option("--seed", help="Seed of the random generator")
+    ] = 12,
+    database_path: Annotated[
+        Optional[str],
+        typer.Option("--database", help="SQLite file to fill, created if needed"),
+    ] = None,
+    yes_bench: Annotated[
+        bool,
+        typer.Option("--yes-bench", help="Fill the configured database instead"),
+    ] = False,
+):
+    """Function to fill an empty database with a synthetic dataset:
+    python -m crm bench seed --scale 1e5 --database bench.sqlite3, or --yes-bench
+    for the configured one (CRM_DATABASE). The same scale and seed give the same
+    rows, the users get a random password shown once
+    """
+    if database_path is None and not yes_bench:
+        typer.echo(
+            "Error: give the file to fill with --database, or --yes-bench to fill "
+            "the configured database"
+        )
+        return
+    database = make_database(database_path) if database_path else None
+    password = secrets.token_urlsafe(12)
+    try:
+        start = time.perf_counter()
+        if database is None:
+            counts = generate(User._meta.database, scale, random_seed, password)
+        else:
+            with database.bind_ctx(MODELS):
+                counts = generate(database, scale, random_seed, password)
+        elapsed = time.perf_counter() - start
+        typer.echo(
+            ", ".join(f"{count} {table}" for table, count in counts.items())
+            + f" inserted in {elapsed:.1f}s"
+        )
+        typer.echo(f"Log in with {ADMIN_EMAIL} and the password {password}")
+    except ValueError as e:
+        typer.echo(f"Error: {e}")
+    finally:
+        if database is not None:
+            database.close()
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,59 @@
+import json
+import operator
+from functools import reduce
+import typer
+from peewee import SQL
+from crm.audit import record_matching
+from crm.cache import forget
+from crm.config import is_sqlite
+from crm.models.user import User
+
+
+def ids_in(model, ids):
+    """Function to get the condition keeping the rows of model whose id is in
+    the comma separated list ids, e.g. "1,2,3". The ids are sent as one JSON
+    parameter with SQLite, whatever their number, as a list elsewhere"""
+    values = [int(value) for value in ids.split(",") if value.strip()]
+    if not is_sqlite(model._meta.database):
+        return model.id.in_(values)
+    return model.id.in_(SQL("(SELECT value FROM json_each(?))", [json.dumps(values)]))
+
+
+def find_role_user(user_id, role):
+    """Function to get the user user_id when it has the role role"""
+    user = User.get_or_none(User.id == user_id)
+    if user is None:
+        typer.echo("User not found")
+        return None
+    if user.role.name != role:
+        typer.echo(f"Only a {role.lower()} user can be assigned")
+        return None
+    return user
+
+
+def owner_scope(user, permission, owner_field, conditions):
+    """Function to limit a bulk update to the rows owned by user when it lacks
+    permission: the check is a condition of the UPDATE instead of one check
+    per row"""
+    if not user.has_permission(permission):
+        conditions.append(owner_field == user.id)
+        typer.echo("Only the rows you are in charge of are updated")
+
+
+def bulk_update(model, conditions, changes, dry_run=False):
+    """Function to apply changes (field -> value) to the rows of model matching
+    every condition with one UPDATE statement, journaled by one INSERT.
+    Returns the number of rows updated, or matched for a dry run"""
+    where = reduce(operator.and_, conditions)
+    if dry_run:
+        return model.select().where(where).count()
+    record_matching(model, where, changes)
+    forget(model)
+    return model.update(changes).where(where).execute()
+
+
+def echo_bulk_result(count, name, dry_run):
+    if dry_run:
+        typer.echo(f"{count} {name} would be updated")
+    else:
+        typer.echo(f"{count} {name} updated")
@@ -4,6 +4,9 @@ from crm.models.client import Client
 from crm.models.user import User
 from datetime import datetime
 from crm.auth import auth_required, check_user_and_permissions
+from crm.queries import paginate
+from crm.views.bulk import bulk_update, echo_bulk_result, find_role_user, ids_in
+from crm.views.output import echo_lines
 
 app = typer.Typer()
 
@@ -93,19 +96,28 @@ def delete_client(
 
 @app.command(name="list-clients")
 @auth_required
-def list_clients(user=None):
-    """Function to get the list of the clients: python -m client list-clients"""
+def list_clients(
+    after_id: Annotated[
+        Optional[int], typer.Option("--after-id", help="List the clients after this id")
+    ] = None,
+    limit: Annotated[
+        Optional[int], typer.Option("--limit", help="Maximum number of clients listed")
+    ] = None,
+    user=None,
+):
+    """Function to get the list of the clients: python -m client list-clients or
+    page by page: python -m crm client list-clients --after-id "last id seen" --limit "page size"
+    """
     try:
-        clients = Client.select()
-        if not clients:
+        clients = paginate(Client.select(), Client, after_id, limit)
+        lines = (
+            f"Client n°{client.id}: Name: {client.first_name} {client.last_name}, Email:{client.email}, "
+            f"Phone: {client.phone}, Company name: {client.company_name}, "
+            f"Last_contact: {client.last_contact}"
+            for client in clients.iterator()
+        )
+        if echo_lines(lines) == 0:
             typer.echo("clients not found")
-            return
-        for client in clients:
-            typer.echo(
-                f"Client n°{client.id}: Name: {client.first_name} {client.last_name}, Email:{client.email}, "
-                f"Phone: {client.phone}, Company name: {client.company_name}, "
-                f"Last_contact: {client.last_contact}"
-            )
     except Exception as e:
         typer.echo(f"error: {e}")
 
@@ -273,5 +285,81 @@ def update_client_direct(
         return
 
 
+@app.command(name="bulk-update")
+@auth_required
+def bulk_update_clients(
+    ids: Annotated[
+        Optional[str], typer.Option("--ids", help="Ids of the clients: 1,2,3")
+    ] = None,
+    commercial_id: Annotated[
+        Optional[int],
+        typer.Option("--commercial", help="Clients of this commercial contact"),
+    ] = None,
+    company_name: Annotated[
+        Optional[str], typer.Option("--company", help="Clients of this company")
+    ] = None,
+    set_commercial: Annotated[
+        Optional[int],
+        typer.Option("--set-commercial", help="Id of the new commercial contact"),
+    ] = None,
+    set_company: Annotated[
+        Optional[str], typer.Option("--set-company", help="New company name")
+    ] = None,
+    set_last_contact: Annotated[
+        Optional[str],
+        typer.Option("--set-last-contact", help="New last contact: YYYY-MM-DD"),
+    ] = None,
+    dry_run: Annotated[
+        bool, typer.Option("--dry-run", help="Count the clients without updating them")
+    ] = False,
+    user=None,
+):
+    """Function to update every client matching the filters with one UPDATE:
+    python -m crm client bulk-update --commercial 5 --set-commercial 1.
+    Except for an admin only your clients are updated.
+    AUTH REQUIRED LOGIN FIRST"""
+    try:
+        conditions = []
+        if ids is not None:
+            conditions.append(ids_in(Client, ids))
+        if commercial_id is not None:
+            conditions.append(Client.epic_events_contact == commercial_id)
+        if company_name is not None:
+            conditions.append(Client.company_name == company_name)
+        if not conditions:
+            typer.echo("At least one filter is required")
+            return
+
+        changes = {}
+        if set_commercial is not None:
+            commercial = find_role_user(set_commercial, "Commercial")
+            if commercial is None:
+                return
+            changes[Client.epic_events_contact] = commercial.id
+        if set_company is not None:
+            changes[Client.company_name] = set_company
+        if set_last_contact is not None:
+            last_contact = check_date(set_last_contact)
+            if last_contact is None:
+                return
+            changes[Client.last_contact] = last_contact
+        if not changes:
+            typer.echo("Nothing to update")
+            return
+
+        if not user.role.name == "Admin":
+            if not check_user_and_permissions(user, "update-client"):
+                return
+            conditions.append(Client.epic_events_contact == user.id)
+            typer.echo("Only the rows you are in charge of are updated")
+        with Client._meta.database.atomic():
+            count = bulk_update(Client, conditions, changes, dry_run)
+        echo_bulk_result(count, "clients", dry_run)
+    except ValueError:
+        typer.echo("The ids must be numbers separated by commas")
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+
+
 if __name__ == "__main__":
     app()
@@ -1,11 +1,19 @@
 import typer
-import sentry_sdk
+from crm import monitoring
 from typing_extensions import Annotated, Optional
 from crm.models.contract import Contract
 from crm.models.client import Client
 from datetime import datetime
 from crm.auth import auth_required, check_user_and_permissions
-
+from crm.queries import contracts_with_client, paginate
+from crm.views.bulk import (
+    bulk_update,
+    echo_bulk_result,
+    find_role_user,
+    ids_in,
+    owner_scope,
+)
+from crm.views.output import echo_lines
 
 app = typer.Typer()
 
@@ -30,19 +38,19 @@ def sign(contract):
 
 def sign_fo_sdk(contract):
     if contract.status is True:
-        sentry_sdk.capture_message(f"Contract sign: {contract.id}")
+        monitoring.capture_message(f"Contract sign: {contract.id}")
 
 
 def get_list(status, remain):
     """Function to filter or not the list of contracts by status or remaining amount"""
     try:
-        contracts = Contract.select()
+        contracts = contracts_with_client()
         if status is not None:
             if status.lower() == "signed":
-                contracts = contracts.where(Contract.status is True)
+                contracts = contracts.where(Contract.status == True)  # noqa: E712
 
             elif status.lower() == "not signed":
-                contracts = contracts.where(Contract.status is False)
+                contracts = contracts.where(Contract.status == False)  # noqa: E712
 
             else:
                 typer.echo("Invalid status value")
@@ -145,26 +153,34 @@ def list_contracts(
         Optional[str],
         typer.Option("-r", help="Remaining amount(rest to pay or paid)"),
     ] = None,
+    after_id: Annotated[
+        Optional[int],
+        typer.Option("--after-id", help="List the contracts after this id"),
+    ] = None,
+    limit: Annotated[
+        Optional[int],
+        typer.Option("--limit", help="Maximum number of contracts listed"),
+    ] = None,
     user=None,
 ):
     """Function to get the list of all contracts: python -m crm contract list-contracts or
     contract by status or remaining amount: python -m crm contract list-contracts -s "signed or not signed" -r "rest to pay or paid".
+    Page by page with --after-id "last id seen" --limit "page size".
     AUTH REQUIRED LOGIN FIRST
     """
     try:
         contracts = get_list(status, remain)
         if contracts is None:
             return
-        if contracts.count() == 0:
+        contracts = paginate(contracts, Contract, after_id, limit)
+        lines = (
+            f"Contract n°{contract.id}, Client: {contract.client.first_name} {contract.client.last_name},"
+            f"Total amount: {contract.total_amount}, Remanining_amount: {contract.remaining_amount},"
+            f"Sign: {sign(contract)}, Created at: {contract.created_at}"
+            for contract in contracts.iterator()
+        )
+        if echo_lines(lines) == 0:
             typer.echo("No elements found")
-            return
-        for contract in contracts:
-            status = sign(contract)
-            typer.echo(
-                f"Contract n°{contract.id}, Client: {contract.client.first_name} {contract.client.last_name},"
-                f"Total amount: {contract.total_amount}, Remanining_amount: {contract.remaining_amount},"
-                f"Sign: {status}, Created at: {contract.created_at}"
-            )
     except Exception as e:
         typer.echo(f"error: {e}")
 
@@ -323,7 +339,7 @@ def update_contract_direct(
         if new_status is not None:
             if new_status.lower() == "signed":
                 contract.status = True
-                sentry_sdk.capture_message(f"Contract signed: {contract.id}")
+                monitoring.capture_message(f"Contract signed: {contract.id}")
             elif new_status.lower() == "not signed":
                 contract.status = False
             else:
@@ -344,5 +360,126 @@ def update_contract_direct(
         typer.echo(f"error: {e}")
 
 
+@app.command(name="bulk-update")
+@auth_required
+def bulk_update_contracts(
+    ids: Annotated[
+        Optional[str], typer.Option("--ids", help="Ids of the contracts: 1,2,3")
+    ] = None,
+    client_id: Annotated[
+        Optional[int], typer.Option("--client", help="Contracts of this client")
+    ] = None,
+    commercial_id: Annotated[
+        Optional[int],
+        typer.Option("--commercial", help="Contracts of this commercial contact"),
+    ] = None,
+    status: Annotated[
+        Optional[str], typer.Option("--status", help="signed or not signed")
+    ] = None,
+    remain: Annotated[
+        Optional[str], typer.Option("--remain", help="rest to pay or paid")
+    ] = None,
+    set_status: Annotated[
+        Optional[str],
+        typer.Option("--set-status", help="New status: signed or not signed"),
+    ] = None,
+    set_remaining: Annotated[
+        Optional[int], typer.Option("--set-remaining", help="New remaining amount")
+    ] = None,
+    set_commercial: Annotated[
+        Optional[int],
+        typer.Option("--set-commercial", help="Id of the new commercial contact"),
+    ] = None,
+    dry_run: Annotated[
+        bool,
+        typer.Option("--dry-run", help="Count the contracts without updating them"),
+    ] = False,
+    user=None,
+):
+    """Function to update every contract matching the filters with one UPDATE:
+    python -m crm contract bulk-update --remain "rest to pay" --client 3 --set-remaining 0.
+    Without the update-contract permission only your contracts are updated.
+    AUTH REQUIRED LOGIN FIRST"""
+    try:
+        conditions = []
+        if ids is not None:
+            conditions.append(ids_in(Contract, ids))
+        if client_id is not None:
+            conditions.append(Contract.client == client_id)
+        if commercial_id is not None:
+            conditions.append(Contract.commercial_contact == commercial_id)
+        if status is not None:
+            if status.lower() not in ("signed", "not signed"):
+                typer.echo("Invalid status value")
+                return
+            conditions.append(Contract.status == (status.lower() == "signed"))
+        if remain is not None:
+            if remain.lower() == "rest to pay":
+                conditions.append(Contract.remaining_amount > 0)
+            elif remain.lower() == "paid":
+                conditions.append(Contract.remaining_amount == 0)
+            else:
+                typer.echo("Invalid remain value")
+                return
+        if not conditions:
+            typer.echo("At least one filter is required")
+            return
+
+        changes = {}
+        if set_status is not None:
+            if set_status.lower() not in ("signed", "not signed"):
+                typer.echo("Invalid status value")
+                return
+            changes[Contract.status] = set_status.lower() == "signed"
+        if set_remaining is not None:
+            if set_remaining < 0:
+                typer.echo("The remaining amount can't be negative")
+                return
+            changes[Contract.remaining_amount] = set_remaining
+        if set_commercial is not None:
+            commercial = find_role_user(set_commercial, "Commercial")
+            if commercial is None:
+                return
+            changes[Contract.commercial_contact] = commercial.id
+        if not changes:
+            typer.echo("Nothing to update")
+            return
+
+        owner_scope(user, "update-contract", Contract.commercial_contact, conditions)
+        signed = []
+        with Contract._meta.database.atomic():
+            if set_remaining is not None:
+                # A contract never owes more than its total amount
+                above = [
+                    contract_id
+                    for contract_id, in Contract.select(Contract.id)
+                    .where(*conditions, Contract.total_amount < set_remaining)
+                    .order_by(Contract.id)
+                    .tuples()
+                ]
+                if above:
+                    typer.echo(
+                        "Remaining amount above the total amount of the contracts "
+                        f"{', '.join(map(str, above))}: nothing updated"
+                    )
+                    return
+            if changes.get(Contract.status) is True and not dry_run:
+                signed = [
+                    contract_id
+                    for contract_id, in Contract.select(Contract.id)
+                    .where(*conditions, Contract.status == False)  # noqa: E712
+                    .tuples()
+                ]
+            count = bulk_update(Contract, conditions, changes, dry_run)
+        monitoring.capture_messages(
+            f"Contract signed: {contract_id}" for contract_id in signed
+        )
+        echo_bulk_result(count, "contracts", dry_run)
+    except ValueError:
+        typer.echo("The ids must be numbers separated by commas")
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+
+
 if __name__ == "__main__":
     app()
@@ -1,10 +1,29 @@
 import typer
+from peewee import fn
 from typing_extensions import Annotated, Optional
 from crm.models.contract import Contract
 from crm.models.event import Event
 from crm.models.user import User
 from datetime import datetime
+from crm.assignment import auto_assign
 from crm.auth import auth_required, check_user_and_permissions
+from crm.queries import (
+    calendar_conflicts,
+    events_with_relations,
+    overlapping,
+    paginate,
+    support_conflicts,
+    support_double_bookings,
+    venue_conflicts,
+)
+from crm.views.bulk import (
+    bulk_update,
+    echo_bulk_result,
+    find_role_user,
+    ids_in,
+    owner_scope,
+)
+from crm.views.output import echo_lines
 
 app = typer.Typer()
 
@@ -54,6 +73,34 @@ def check_date(date):
         return None
 
 
+def event_ids(events):
+    return ", ".join(f"n°{event.id}" for event in events.iterator())
+
+
+def check_schedule(event, check_support=True, check_venue=True):
+    """Function to refuse an event whose support contact is already assigned to
+    an event on the same dates and to warn when its location is already booked.
+    Returns False when the event must not be saved"""
+    if event.start_date is None or event.end_date is None:
+        return True
+    if check_support and event.support_contact is not None:
+        conflicts = event_ids(support_conflicts(event, event.support_contact))
+        if conflicts:
+            typer.echo(
+                f"Support contact {event.support_contact.name} is already assigned "
+                f"to the events {conflicts} on these dates"
+            )
+            return False
+    if check_venue:
+        conflicts = event_ids(venue_conflicts(event))
+        if conflicts:
+            typer.echo(
+                f"Warning: {event.location} is already booked by the events "
+                f"{conflicts} on these dates"
+            )
+    return True
+
+
 @app.command()
 @auth_required
 def create_event(
@@ -90,7 +137,7 @@ def create_event(
         if existing_event:
             typer.echo("An event already exist for this contract.")
             return
-        event = Event.create(
+        event = Event(
             name=name,
             contract=contract,
             location=location,
@@ -100,6 +147,9 @@ def create_event(
             end_date=end_date,
             support_contact=support_contact,
         )
+        if not check_schedule(event):
+            return
+        event.save()
         typer.echo("Event created succesfully")
         typer.echo(f"Event id: {event.id}")
     except Exception as e:
@@ -147,18 +197,25 @@ def list_events(
             "and no support for the ones with no support",
         ),
     ] = None,
+    after_id: Annotated[
+        Optional[int], typer.Option("--after-id", help="List the events after this id")
+    ] = None,
+    limit: Annotated[
+        Optional[int], typer.Option("--limit", help="Maximum number of events listed")
+    ] = None,
     user=None,
 ):
     """Function to get the list of all events: python -m crm event list-events or
     get events by support contact: python -m crm event list-events -s "support contact name" or
     your events only: python -m crm event list-events -o "own or not yours" or
     events with support or no support: python -m crm event list-events -son "support" or "no support".
+    Page by page with --after-id "last id seen" --limit "page size".
     AUTH REQUIRED LOGIN FIRST
     """
     try:
-        events = Event.select()
+        events = events_with_relations()
         if support_contact is not None:
-            events = events.join(User).where(User.name == support_contact)
+            events = events.where(User.name == support_contact)
         if own_events is not None:
             if own_events.lower() == "own":
                 events = events.where(Event.support_contact == user)
@@ -175,22 +232,105 @@ def list_events(
             else:
                 typer.echo("Invalid values for support_or_not")
                 return
-        if events is None:
-            typer.echo("No events found")
-            return
-        if not events:
+        events = paginate(events, Event, after_id, limit)
+        lines = (
+            f"Events n°{event.id}: Name: {event.name}, Contract n°: {event.contract.id}, "
+            f"Location: {event.location}, Attendees: {event.attendees}, "
+            f"Notes: {event.notes}, Start date: {event.start_date}, End date: {event.end_date}, "
+            f"Support contact: {event.support_contact.name if event.support_contact else ''}"
+            for event in events.iterator()
+        )
+        if echo_lines(lines) == 0:
             typer.echo("No events in the database")
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+
+
+@app.command(name="calendar")
+@auth_required
+def calendar(
+    from_date: Annotated[
+        str, typer.Option("--from", help="First day of the calendar YYYY-MM-DD")
+    ],
+    to_date: Annotated[
+        str, typer.Option("--to", help="Last day of the calendar YYYY-MM-DD")
+    ],
+    user=None,
+):
+    """Function to get the events taking place between two dates with their
+    double bookings: python -m crm event calendar --from "YYYY-MM-DD" --to "YYYY-MM-DD".
+    AUTH REQUIRED LOGIN FIRST
+    """
+    try:
+        if not check_user_and_permissions(user, "list-event"):
+            return
+        start, end = check_date(from_date), check_date(to_date)
+        if start is None or end is None:
             return
+        # The events are taken until the end of the last day
+        end = datetime.combine(end, datetime.max.time())
+        conflicts = calendar_conflicts(start, end)
+        events = overlapping(events_with_relations(), start, end).order_by(
+            Event.start_date, Event.id
+        )
 
-        for event in events:
-            if event.support_contact is None:
-                support_contact_name = ""
-            else:
-                support_contact_name = event.support_contact.name
+        def lines():
+            for event in events.iterator():
+                line = (
+                    f"Events n°{event.id}: Name: {event.name}, "
+                    f"Location: {event.location}, Start date: {event.start_date}, "
+                    f"End date: {event.end_date}, Support contact: "
+                    f"{event.support_contact.name if event.support_contact else ''}"
+                )
+                if event.id in conflicts:
+                    clashes = ", ".join(
+                        f"{kind} with n°{other_id}"
+                        for kind, other_id in conflicts[event.id]
+                    )
+                    line += f", Conflicts: {clashes}"
+                yield line
+
+        if echo_lines(lines()) == 0:
+            typer.echo("No events between these dates")
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+
+
+@app.command(name="auto-assign")
+@auth_required
+def auto_assign_events(
+    dry_run: Annotated[
+        bool, typer.Option("--dry-run", help="Show the assignment without saving it")
+    ] = False,
+    user=None,
+):
+    """Function to assign the events without support contact to the support
+    users, the fewest events first and never two events at the same time:
+    python -m crm event auto-assign or python -m crm event auto-assign --dry-run.
+    AUTH REQUIRED LOGIN FIRST
+    """
+    try:
+        if not check_user_and_permissions(user, "update-event"):
+            return
+        plan, left, updated = auto_assign(Event._meta.database, dry_run)
+        counts = {}
+        for support in plan.values():
+            counts[support] = counts.get(support, 0) + 1
+        names = dict(
+            User.select(User.id, User.name).where(User.id.in_(list(counts))).tuples()
+        )
+        echo_lines(
+            f"Support contact n°{support} {names[support]}: {count} events"
+            for support, count in sorted(counts.items())
+        )
+        if dry_run:
+            typer.echo(f"{len(plan)} events would be assigned")
+        else:
+            typer.echo(f"{updated} events assigned")
+        if left:
             typer.echo(
-                f"Events n°{event.id}: Name: {event.name}, Contract n°: {event.contract.id}, "
-                f"Location: {event.location}, Attendees: {event.attendees}, "
-                f"Notes: {event.notes}, Start date: {event.start_date}, End date: {event.end_date}, Support contact: {support_contact_name}"
+                f"{len(left)} events left without support contact, "
+                f"no support user free on their dates"
             )
     except Exception as e:
         typer.echo(f"Error: {e}")
@@ -323,6 +463,8 @@ def update_event(
         else:
             new_end_date = event.end_date
 
+        rescheduled = start_date_change or end_date_change
+        relocated = location != event.location
         event.name = name
         event.location = location
         event.attendees = attendees
@@ -330,6 +472,12 @@ def update_event(
         event.start_date = new_start_date
         event.end_date = new_end_date
 
+        if not check_schedule(
+            event,
+            check_support=change_support_contact or rescheduled,
+            check_venue=relocated or rescheduled,
+        ):
+            return
         event.save()
         typer.echo("Event updated succesfully")
 
@@ -440,6 +588,13 @@ def update_event_direct(
             new_end_date = check_date(end_date)
             event.end_date = new_end_date
 
+        rescheduled = start_date is not None or end_date is not None
+        if not check_schedule(
+            event,
+            check_support=support_contact_id is not None or rescheduled,
+            check_venue=location is not None or rescheduled,
+        ):
+            return
         event.save()
         typer.echo("Event updated succesfully")
 
@@ -463,5 +618,113 @@ def update_event_direct(
         typer.echo(f"Error: {e}")
 
 
+@app.command(name="bulk-update")
+@auth_required
+def bulk_update_events(
+    ids: Annotated[
+        Optional[str], typer.Option("--ids", help="Ids of the events: 1,2,3")
+    ] = None,
+    support_id: Annotated[
+        Optional[int], typer.Option("--support", help="Events of this support contact")
+    ] = None,
+    no_support: Annotated[
+        bool, typer.Option("--no-support", help="Events without support contact")
+    ] = False,
+    location: Annotated[
+        Optional[str], typer.Option("--location", help="Events at this location")
+    ] = None,
+    start: Annotated[
+        Optional[str],
+        typer.Option("--from", help="Events ending from this date: YYYY-MM-DD"),
+    ] = None,
+    end: Annotated[
+        Optional[str],
+        typer.Option("--to", help="Events starting until this date: YYYY-MM-DD"),
+    ] = None,
+    set_support: Annotated[
+        Optional[int],
+        typer.Option("--set-support", help="Id of the new support contact"),
+    ] = None,
+    set_location: Annotated[
+        Optional[str], typer.Option("--set-location", help="New location")
+    ] = None,
+    dry_run: Annotated[
+        bool, typer.Option("--dry-run", help="Count the events without updating them")
+    ] = False,
+    user=None,
+):
+    """Function to update every event matching the filters with one UPDATE:
+    python -m crm event bulk-update --support 3 --from 2025-01-01 --to 2025-06-30 --set-support 7.
+    The events are not assigned to a support contact busy on their dates.
+    Without the update-event permission only your events are updated.
+    AUTH REQUIRED LOGIN FIRST
+    """
+    try:
+        conditions = []
+        if ids is not None:
+            conditions.append(ids_in(Event, ids))
+        if support_id is not None:
+            conditions.append(Event.support_contact == support_id)
+        if no_support:
+            conditions.append(Event.support_contact.is_null(True))
+        if location is not None:
+            conditions.append(fn.lower(Event.location) == location.lower())
+        if start is not None or end is not None:
+            if start is None or end is None:
+                typer.echo("--from and --to go together")
+                return
+            start_date, end_date = check_date(start), check_date(end)
+            if start_date is None or end_date is None:
+                return
+            conditions.append(
+                Event.id.in_(overlapping(Event.select(Event.id), start_date, end_date))
+            )
+        if not conditions:
+            typer.echo("At least one filter is required")
+            return
+
+        changes = {}
+        if set_support is not None:
+            support = find_role_user(set_support, "Support")
+            if support is None:
+                return
+            changes[Event.support_contact] = support.id
+        if set_location is not None:
+            changes[Event.location] = set_location
+        if not changes:
+            typer.echo("Nothing to update")
+            return
+
+        owner_scope(user, "update-event", Event.support_contact, conditions)
+        if set_support is None:
+            with Event._meta.database.atomic():
+                count = bulk_update(Event, conditions, changes, dry_run)
+            return echo_bulk_result(count, "events", dry_run)
+
+        with Event._meta.database.atomic() as transaction:
+            updated = [
+                event_id
+                for event_id, in Event.select(Event.id).where(*conditions).tuples()
+            ]
+            count = bulk_update(Event, conditions, changes)
+            # The events are checked once moved, all together
+            conflicts = support_double_bookings(set_support, updated)
+            if conflicts or dry_run:
+                transaction.rollback()
+        if conflicts:
+            typer.echo(
+                f"Support contact {support.name} would be assigned to events on the "
+                f"same dates: "
+                + ", ".join(f"n°{first} and n°{second}" for first, second in conflicts)
+            )
+            typer.echo("No event updated")
+            return
+        echo_bulk_result(count, "events", dry_run)
+    except ValueError:
+        typer.echo("The ids must be numbers separated by commas")
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+
+
 if __name__ == "__main__":
     app()
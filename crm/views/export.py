@@ -0,0 +1,297 @@
+import csv
+import json
+import sys
+import time
+import typer
+from typing_extensions import Annotated, Optional
+from peewee import (
+    JOIN,
+    Alias,
+    BooleanField,
+    DecimalField,
+    FloatField,
+    ForeignKeyField,
+    IntegerField,
+)
+from crm.models.client import Client
+from crm.models.contract import Contract
+from crm.models.event import Event
+from crm.models.role import Role
+from crm.models.user import User
+from crm.auth import auth_required, check_user_and_permissions
+
+app = typer.Typer()
+
+FORMATS = ["jsonl", "csv", "arrow", "parquet"]
+BATCH_SIZE = 5000
+
+
+def clients_query():
+    """Function to select the clients with their commercial contact"""
+    return (
+        Client.select(Client, User.name.alias("epic_events_contact_name"))
+        .join(User)
+        .order_by(Client.id)
+    )
+
+
+def contracts_query():
+    """Function to select the contracts with their client and commercial contact"""
+    return (
+        Contract.select(
+            Contract,
+            Client.first_name.alias("client_first_name"),
+            Client.last_name.alias("client_last_name"),
+            User.name.alias("commercial_contact_name"),
+        )
+        .join(Client)
+        .switch(Contract)
+        .join(User, on=(Contract.commercial_contact == User.id))
+        .order_by(Contract.id)
+    )
+
+
+def events_query():
+    """Function to select the events with their contract, client and support contact"""
+    return (
+        Event.select(
+            Event,
+            Contract.client.alias("client_id"),
+            User.name.alias("support_contact_name"),
+        )
+        .join(Contract)
+        .switch(Event)
+        .join(User, JOIN.LEFT_OUTER, on=(Event.support_contact == User.id))
+        .order_by(Event.id)
+    )
+
+
+def users_query():
+    """Function to select the users and their role, without the password"""
+    return (
+        User.select(
+            User.id, User.name, User.email, User.role, Role.name.alias("role_name")
+        )
+        .join(Role)
+        .order_by(User.id)
+    )
+
+
+def fetch_batches(query, batch_size=BATCH_SIZE):
+    """Function to run query and yield (columns, rows) batches of raw tuples,
+    straight from the cursor without building a model instance per row"""
+    cursor = query.model._meta.database.execute(query)
+    columns = [description[0] for description in cursor.description]
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield columns, rows
+
+
+def write_jsonl(batches, output):
+    count = 0
+    for columns, rows in batches:
+        output.write(
+            "".join(
+                json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows
+            )
+        )
+        count += len(rows)
+    return count
+
+
+def write_csv(batches, output):
+    writer = csv.writer(output)
+    count = 0
+    for columns, rows in batches:
+        if count == 0:
+            writer.writerow(columns)
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def arrow_types(query):
+    """Function to get the Arrow type of each column of query from its field,
+    the same for every batch whatever its values (NULL, int or float amounts)"""
+    import pyarrow
+
+    types = []
+    for node in query._returning:
+        field = node.node if isinstance(node, Alias) else node
+        if isinstance(field, BooleanField):
+            types.append(pyarrow.bool_())
+        elif isinstance(field, (DecimalField, FloatField)):
+            types.append(pyarrow.float64())
+        elif isinstance(field, (IntegerField, ForeignKeyField)):
+            types.append(pyarrow.int64())
+        else:
+            types.append(pyarrow.string())
+    return types
+
+
+def arrow_column(values, arrow_type):
+    import pyarrow
+
+    if arrow_type == pyarrow.bool_():
+        # SQLite gives the booleans as 0 or 1
+        values = [None if value is None else bool(value) for value in values]
+    return pyarrow.array(values, type=arrow_type)
+
+
+def write_arrow(batches, path, fmt, types):
+    """Function to write the batches as an Arrow IPC or a Parquet file with the
+    column types of arrow_types (pyarrow required)"""
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    writer = None
+    count = 0
+    try:
+        for columns, rows in batches:
+            if writer is None:
+                schema = pyarrow.schema(
+                    [pyarrow.field(name, type) for name, type in zip(columns, types)]
+                )
+                if fmt == "parquet":
+                    writer = pyarrow.parquet.ParquetWriter(path, schema)
+                else:
+                    writer = pyarrow.ipc.new_file(path, schema)
+            batch = pyarrow.RecordBatch.from_arrays(
+                [
+                    arrow_column(column, arrow_type)
+                    for column, arrow_type in zip(zip(*rows), types)
+                ],
+                schema=schema,
+            )
+            if fmt == "parquet":
+                writer.write_batch(batch)
+            else:
+                writer.write(batch)
+            count += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def export(query, fmt, output, stats):
+    """Function to export the rows of query in fmt to output (stdout if None)"""
+    if fmt not in FORMATS:
+        typer.echo(f"Invalid format, choose from {', '.join(FORMATS)}")
+        return
+    start = time.perf_counter()
+    batches = fetch_batches(query)
+    if fmt in ("arrow", "parquet"):
+        if output is None:
+            typer.echo(f"--output is required for the {fmt} format")
+            return
+        try:
+            count = write_arrow(batches, output, fmt, arrow_types(query))
+        except ImportError:
+            typer.echo(f"pyarrow is required for the {fmt} format")
+            return
+    else:
+        writer = write_jsonl if fmt == "jsonl" else write_csv
+        if output is None:
+            count = writer(batches, sys.stdout)
+        else:
+            with open(output, "w", newline="", encoding="utf-8") as output_file:
+                count = writer(batches, output_file)
+    if stats:
+        elapsed = time.perf_counter() - start
+        typer.echo(
+            f"{count} rows exported in {elapsed:.3f}s "
+            f"({count / elapsed if elapsed else 0:.0f} rows/s)",
+            err=True,
+        )
+    return count
+
+
+FormatOption = Annotated[
+    str, typer.Option("-f", help="Format: jsonl, csv, arrow or parquet")
+]
+OutputOption = Annotated[
+    Optional[str], typer.Option("-o", help="Output file, stdout by default")
+]
+StatsOption = Annotated[
+    bool, typer.Option("--stats", help="Print the throughput in rows/s on stderr")
+]
+
+
+@app.command()
+@auth_required
+def clients(
+    fmt: FormatOption = "jsonl",
+    output: OutputOption = None,
+    stats: StatsOption = False,
+    user=None,
+):
+    """Function to export the clients: python -m crm export clients -f "format" -o "file".
+    AUTH REQUIRED LOGIN FIRST"""
+    try:
+        if not check_user_and_permissions(user, "list-client"):
+            return
+        export(clients_query(), fmt, output, stats)
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+
+
+@app.command()
+@auth_required
+def contracts(
+    fmt: FormatOption = "jsonl",
+    output: OutputOption = None,
+    stats: StatsOption = False,
+    user=None,
+):
+    """Function to export the contracts: python -m crm export contracts -f "format" -o "file".
+    AUTH REQUIRED LOGIN FIRST"""
+    try:
+        if not check_user_and_permissions(user, "list-contract"):
+            return
+        export(contracts_query(), fmt, output, stats)
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+
+
+@app.command()
+@auth_required
+def events(
+    fmt: FormatOption = "jsonl",
+    output: OutputOption = None,
+    stats: StatsOption = False,
+    user=None,
+):
+    """Function to export the events: python -m crm export events -f "format" -o "file".
+    AUTH REQUIRED LOGIN FIRST"""
+    try:
+        if not check_user_and_permissions(user, "list-event"):
+            return
+        export(events_query(), fmt, output, stats)
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+
+
+@app.command()
+@auth_required
+def users(
+    fmt: FormatOption = "jsonl",
+    output: OutputOption = None,
+    stats: StatsOption = False,
+    user=None,
+):
+    """Function to export the users: python -m crm export users -f "format" -o "file".
+    AUTH REQUIRED LOGIN FIRST"""
+    try:
+        if not check_user_and_permissions(user, "list-user"):
+            return
+        export(users_query(), fmt, output, stats)
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    app()
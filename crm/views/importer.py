@@ -0,0 +1,508 @@
+import csv
+import json
+import os
+import typer
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing_extensions import Annotated
+from peewee import IntegrityError, chunked, fn
+from crm import audit
+from crm.assignment import Bookings
+from crm.models.client import Client
+from crm.models.contract import Contract
+from crm.models.event import Event
+from crm.models.event_span import epoch_seconds
+from crm.models.import_checkpoint import ImportCheckpoint
+from crm.models.role import Role
+from crm.models.user import User
+from crm.auth import auth_required, check_user_and_permissions
+from crm.hashing import hash_passwords, password_pool
+from crm.queries import seconds
+
+app = typer.Typer()
+
+CHUNK_SIZE = 1000
+TRUE_VALUES = {"1", "true", "yes", "y", "signed"}
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    """Function to parse a date once per distinct value: YYYY-MM-DD or YYYY-MM-DD HH:MM:SS"""
+    for date_format in ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    raise ValueError(f"invalid date {value!r}, date format: YYYY-MM-DD")
+
+
+@lru_cache(maxsize=4096)
+def db_date(value):
+    """Function to get the stored text of a date, once per distinct value"""
+    return str(parse_date(value))
+
+
+def required(row, name):
+    value = row.get(name)
+    value = value.strip() if type(value) is str else "" if value is None else str(value)
+    if not value:
+        raise ValueError(f"{name} is required")
+    return value
+
+
+def to_int(row, name):
+    try:
+        return int(required(row, name))
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+
+
+def to_amount(row, name):
+    try:
+        amount = Decimal(required(row, name))
+    except InvalidOperation:
+        raise ValueError(f"{name} must be a number")
+    if amount < 0:
+        raise ValueError(f"{name} must be positive")
+    return amount
+
+
+def role_user_ids(role_name):
+    """Function to preload the ids of the users of a role"""
+    query = User.select(User.id).join(Role).where(Role.name == role_name).tuples()
+    return {user_id for (user_id,) in query}
+
+
+def client_validator(user):
+    """Function to build the validator of the client rows.
+    Emails are checked against the database and the file in memory"""
+    emails = {email for (email,) in Client.select(Client.email).tuples()}
+    commercial_ids = role_user_ids("Commercial")
+    now = str(datetime.now())
+
+    def validate(row):
+        email = required(row, "email")
+        if email in emails:
+            raise ValueError(f"email {email} already exists")
+        if row.get("epic_events_contact"):
+            contact = to_int(row, "epic_events_contact")
+        else:
+            contact = user.id
+        if contact not in commercial_ids:
+            raise ValueError(f"user {contact} is not a commercial contact")
+        data = {
+            "first_name": required(row, "first_name"),
+            "last_name": required(row, "last_name"),
+            "email": email,
+            "phone": required(row, "phone"),
+            "company_name": required(row, "company_name"),
+            "created_at": (
+                db_date(row["created_at"]) if row.get("created_at") else now
+            ),
+            "last_contact": (
+                db_date(row["last_contact"]) if row.get("last_contact") else now
+            ),
+            "epic_events_contact": contact,
+        }
+        emails.add(email)
+        return data
+
+    return validate
+
+
+def contract_validator(user):
+    """Function to build the validator of the contract rows.
+    The commercial contact defaults to the one of the client"""
+    client_contacts = dict(
+        Client.select(Client.id, Client.epic_events_contact).tuples()
+    )
+    now = str(datetime.now())
+
+    def validate(row):
+        client_id = to_int(row, "client")
+        if client_id not in client_contacts:
+            raise ValueError(f"client {client_id} not found")
+        total_amount = to_amount(row, "total_amount")
+        remaining_amount = to_amount(row, "remaining_amount")
+        if remaining_amount > total_amount:
+            raise ValueError("remaining_amount is greater than total_amount")
+        return {
+            "client": client_id,
+            "total_amount": total_amount,
+            "remaining_amount": remaining_amount,
+            "status": str(row.get("status", "")).strip().lower() in TRUE_VALUES,
+            "created_at": (
+                db_date(row["created_at"]) if row.get("created_at") else now
+            ),
+            "commercial_contact": client_contacts[client_id],
+        }
+
+    return validate
+
+
+class Schedule:
+    """Dates booked by the events of a support contact or a location: the ones
+    of the database in Bookings, the ones of the imported rows in lists sorted
+    by start. The imported rows never overlap, their ends are sorted too"""
+
+    def __init__(self, intervals=()):
+        self.bookings = Bookings(intervals)
+        self.starts = []
+        self.ends = []
+
+    def overlaps(self, start, end):
+        if self.bookings.overlaps(start, end) is not None:
+            return True
+        count = bisect_right(self.starts, end)
+        return count > 0 and self.ends[count - 1] >= start
+
+    def book(self, start, end):
+        index = bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+
+
+def event_schedules():
+    """Function to preload the dates of the events, in seconds, by support
+    contact and by location (lower case) in one query"""
+    supports, venues = defaultdict(list), defaultdict(list)
+    query = Event.select(
+        Event.support_contact,
+        fn.lower(Event.location),
+        seconds(Event.start_date),
+        seconds(Event.end_date),
+    ).tuples()
+    for support, location, start, end in query.iterator():
+        if support is not None:
+            supports[support].append((start, end))
+        venues[location].append((start, end))
+    return (
+        defaultdict(
+            Schedule, {key: Schedule(dates) for key, dates in supports.items()}
+        ),
+        defaultdict(Schedule, {key: Schedule(dates) for key, dates in venues.items()}),
+    )
+
+
+def event_validator(user):
+    """Function to build the validator of the event rows.
+    A contract must be signed and can only have one event. A support contact
+    or a location already booked on the dates, by the database or by an
+    earlier row, is refused"""
+    signed_contracts = {
+        contract_id
+        for (contract_id,) in Contract.select(Contract.id)
+        .where(Contract.status == True)  # noqa: E712
+        .tuples()
+    }
+    used_contracts = {
+        contract_id for (contract_id,) in Event.select(Event.contract).tuples()
+    }
+    support_ids = role_user_ids("Support")
+    supports, venues = event_schedules()
+
+    def validate(row):
+        contract_id = to_int(row, "contract")
+        if contract_id not in signed_contracts:
+            raise ValueError(f"contract {contract_id} not found or not signed")
+        if contract_id in used_contracts:
+            raise ValueError(f"an event already exists for contract {contract_id}")
+        support_contact = None
+        if row.get("support_contact"):
+            support_contact = to_int(row, "support_contact")
+            if support_contact not in support_ids:
+                raise ValueError(f"user {support_contact} is not a support user")
+        start_date = db_date(required(row, "start_date"))
+        end_date = db_date(required(row, "end_date"))
+        if end_date < start_date:
+            raise ValueError("end_date is before start_date")
+        data = {
+            "name": required(row, "name"),
+            "contract": contract_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "location": required(row, "location"),
+            "attendees": to_int(row, "attendees"),
+            "notes": row.get("notes") or "",
+            "support_contact": support_contact,
+        }
+        start, end = epoch_seconds(start_date), epoch_seconds(end_date)
+        schedules = [venues[data["location"].lower()]]
+        if support_contact is not None:
+            if supports[support_contact].overlaps(start, end):
+                raise ValueError(
+                    f"support contact {support_contact} is already assigned on these dates"
+                )
+            schedules.append(supports[support_contact])
+        if schedules[0].overlaps(start, end):
+            raise ValueError(f"{data['location']} is already booked on these dates")
+        for schedule in schedules:
+            schedule.book(start, end)
+        used_contracts.add(contract_id)
+        return data
+
+    return validate
+
+
+def user_validator(user):
+    """Function to build the validator of the user rows.
+    The passwords are hashed a chunk at a time by password_hasher"""
+    emails = {email for (email,) in User.select(User.email).tuples()}
+    roles = {
+        name.lower(): role_id
+        for role_id, name in Role.select(Role.id, Role.name).tuples()
+    }
+
+    def validate(row):
+        email = required(row, "email")
+        if email in emails:
+            raise ValueError(f"email {email} already exists")
+        role_name = required(row, "role").lower()
+        if role_name not in roles:
+            raise ValueError(f"role {role_name} does not exist")
+        if role_name == "admin" and user.role.name != "Admin":
+            raise ValueError("only an admin can create another admin")
+        data = {
+            "name": required(row, "name"),
+            "email": email,
+            "password": required(row, "password"),
+            "role": roles[role_name],
+        }
+        emails.add(email)
+        return data
+
+    return validate
+
+
+def password_hasher(pool):
+    """Function to build the preparation of the user chunks: their passwords
+    are hashed in parallel over the processes of pool"""
+
+    def prepare(rows):
+        passwords = hash_passwords([data["password"] for data in rows], pool)
+        for data, password in zip(rows, passwords):
+            data["password"] = password
+
+    return prepare
+
+
+def read_rows(path):
+    """Function to read the rows of a csv or jsonl file as dicts, one at a time"""
+    with open(path, newline="", encoding="utf-8") as source:
+        if path.endswith(".jsonl"):
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(source)
+
+
+def bulk_insert(model, rows):
+    """Function to insert rows (dicts with the same keys) with executemany:
+    the INSERT statement is generated once instead of once per row"""
+    fields = [model._meta.fields[name] for name in rows[0]]
+    sql, _ = model.insert_many([tuple(rows[0].values())], fields=fields).sql()
+    # Strings are stored as they are, only the other values need converting
+    params = [
+        [
+            value if type(value) is str else field.db_value(value)
+            for field, value in zip(fields, row.values())
+        ]
+        for row in rows
+    ]
+    model._meta.database.cursor().executemany(sql, params)
+
+
+def insert_chunk(model, rows, report):
+    """Function to insert rows in one transaction and journal their creation
+    in it. If the chunk is refused the rows are inserted one by one to report
+    the failing ones"""
+    database = model._meta.database
+    try:
+        with database.atomic():
+            # The ids of the chunk are read back after the last id before it
+            last = model.select(fn.MAX(model.id)).scalar() or 0
+            bulk_insert(model, [data for _, data in rows])
+            ids = (
+                model.select(model.id)
+                .where(model.id > last)
+                .order_by(model.id)
+                .limit(len(rows))
+                .tuples()
+            )
+            audit.record_created(
+                model, zip([row_id for row_id, in ids], [data for _, data in rows])
+            )
+        return len(rows)
+    except IntegrityError:
+        inserted = []
+        with database.atomic():
+            for number, data in rows:
+                try:
+                    with database.atomic():
+                        inserted.append((model.insert(data).execute(), data))
+                except IntegrityError as e:
+                    report(number, data, e)
+            audit.record_created(model, inserted)
+        return len(inserted)
+
+
+def import_file(
+    path, model, validate, chunk_size=CHUNK_SIZE, resume=False, prepare=None
+):
+    """Function to import a file in chunks of chunk_size rows.
+    prepare is called with the valid rows of each chunk before their insertion.
+    The last row of each chunk is saved in the import_checkpoint table in the
+    transaction of the chunk, so an interrupted import is resumed after its
+    last committed chunk. The refused rows are written in path.errors.jsonl.
+    Returns (rows imported, rows refused)"""
+    database = model._meta.database
+    key = os.path.abspath(path)
+    errors_path = f"{path}.errors.jsonl"
+    done = 0
+    if resume:
+        with ImportCheckpoint.bind_ctx(database):
+            checkpoint = ImportCheckpoint.get_or_none(ImportCheckpoint.path == key)
+        done = checkpoint.last_row if checkpoint else 0
+    imported = refused = 0
+    with open(errors_path, "a" if resume else "w", encoding="utf-8") as errors_file:
+
+        def report(number, row, error):
+            nonlocal refused
+            refused += 1
+            # The passwords are not copied in the errors file
+            row = {name: value for name, value in row.items() if name != "password"}
+            errors_file.write(
+                json.dumps(
+                    {"row": number, "error": str(error), "data": row}, default=str
+                )
+                + "\n"
+            )
+
+        for chunk in chunked(enumerate(read_rows(path), start=1), chunk_size):
+            valid = []
+            for number, row in chunk:
+                if number <= done:
+                    continue
+                try:
+                    valid.append((number, validate(row)))
+                except (ValueError, TypeError, AttributeError) as e:
+                    report(number, row, e)
+            if valid and prepare is not None:
+                prepare([data for _, data in valid])
+            with database.atomic(), ImportCheckpoint.bind_ctx(database):
+                if valid:
+                    imported += insert_chunk(model, valid, report)
+                ImportCheckpoint.replace(path=key, last_row=chunk[-1][0]).execute()
+    with ImportCheckpoint.bind_ctx(database):
+        ImportCheckpoint.delete().where(ImportCheckpoint.path == key).execute()
+    # The rows refused before a resume are kept
+    if os.path.getsize(errors_path) == 0:
+        os.remove(errors_path)
+    return imported, refused
+
+
+def run_import(
+    path, model, validator, permission, chunk_size, resume, user, prepare=None
+):
+    """Function shared by the import commands"""
+    try:
+        if not check_user_and_permissions(user, permission):
+            return
+        imported, refused = import_file(
+            path, model, validator(user), chunk_size, resume, prepare
+        )
+        typer.echo(f"{imported} rows imported")
+        if refused:
+            typer.echo(f"{refused} rows refused, see {path}.errors.jsonl")
+    except FileNotFoundError:
+        typer.echo("File not found")
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+        typer.echo("Resume the import with: --resume")
+
+
+PathArgument = Annotated[str, typer.Argument(help="csv or jsonl file")]
+ChunkOption = Annotated[
+    int, typer.Option("--chunk-size", help="Number of rows per transaction")
+]
+ResumeOption = Annotated[
+    bool, typer.Option("--resume", help="Resume from the last checkpoint")
+]
+
+
+@app.command()
+@auth_required
+def clients(
+    path: PathArgument,
+    chunk_size: ChunkOption = CHUNK_SIZE,
+    resume: ResumeOption = False,
+    user=None,
+):
+    """Function to import clients: python -m crm import clients "file.csv or file.jsonl".
+    Columns: first_name, last_name, email, phone, company_name, epic_events_contact (optional),
+    created_at (optional), last_contact (optional). AUTH REQUIRED LOGIN FIRST"""
+    run_import(
+        path, Client, client_validator, "create-client", chunk_size, resume, user
+    )
+
+
+@app.command()
+@auth_required
+def contracts(
+    path: PathArgument,
+    chunk_size: ChunkOption = CHUNK_SIZE,
+    resume: ResumeOption = False,
+    user=None,
+):
+    """Function to import contracts: python -m crm import contracts "file.csv or file.jsonl".
+    Columns: client, total_amount, remaining_amount, status (optional), created_at (optional).
+    AUTH REQUIRED LOGIN FIRST"""
+    run_import(
+        path, Contract, contract_validator, "create-contract", chunk_size, resume, user
+    )
+
+
+@app.command()
+@auth_required
+def events(
+    path: PathArgument,
+    chunk_size: ChunkOption = CHUNK_SIZE,
+    resume: ResumeOption = False,
+    user=None,
+):
+    """Function to import events: python -m crm import events "file.csv or file.jsonl".
+    Columns: name, contract, start_date, end_date, location, attendees, notes (optional),
+    support_contact (optional). AUTH REQUIRED LOGIN FIRST"""
+    run_import(path, Event, event_validator, "create-event", chunk_size, resume, user)
+
+
+@app.command()
+@auth_required
+def users(
+    path: PathArgument,
+    chunk_size: ChunkOption = CHUNK_SIZE,
+    resume: ResumeOption = False,
+    user=None,
+):
+    """Function to import users: python -m crm import users "file.csv or file.jsonl".
+    Columns: name, email, password, role. The passwords are hashed over
+    CRM_HASH_WORKERS processes (one per core by default). AUTH REQUIRED LOGIN FIRST"""
+    with password_pool() as pool:
+        run_import(
+            path,
+            User,
+            user_validator,
+            "create-user",
+            chunk_size,
+            resume,
+            user,
+            password_hasher(pool),
+        )
+
+
+if __name__ == "__main__":
+    app()
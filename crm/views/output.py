@@ -0,0 +1,24 @@
+import time
+import typer
+
+FLUSH_LINES = 500
+FLUSH_SECONDS = 0.05
+
+
+def echo_lines(lines, flush_lines=FLUSH_LINES, flush_seconds=FLUSH_SECONDS):
+    """Function to write lines through one buffer instead of one write per line.
+    The buffer is flushed every flush_lines lines or flush_seconds seconds so
+    the first rows show up at once. Returns the number of lines written"""
+    buffer = []
+    count = 0
+    last_flush = time.monotonic()
+    for line in lines:
+        buffer.append(line)
+        count += 1
+        if len(buffer) >= flush_lines or time.monotonic() - last_flush >= flush_seconds:
+            typer.echo("\n".join(buffer))
+            buffer.clear()
+            last_flush = time.monotonic()
+    if buffer:
+        typer.echo("\n".join(buffer))
+    return count
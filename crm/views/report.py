@@ -0,0 +1,102 @@
+import typer
+from typing_extensions import Annotated, Optional
+from peewee import SQL, fn
+from crm.config import is_sqlite
+from crm.models.client import Client
+from crm.models.contract import Contract
+from crm.models.receivable_summary import ReceivableSummary
+from crm.models.user import User
+from crm.auth import auth_required, check_user_and_permissions
+from crm.queries import month as month_of_date
+from crm.views.output import echo_lines
+
+app = typer.Typer()
+
+GROUPS = ["contact", "client", "month"]
+
+
+def receivables(source, by, month=None):
+    """Function to sum the contracts by commercial contact, client or month,
+    from the summary (ReceivableSummary) or from the contracts (Contract).
+    Returns (key, label, contracts, total, outstanding) tuples"""
+    contracts = (
+        fn.SUM(source.contracts) if source is ReceivableSummary else fn.COUNT(SQL("*"))
+    )
+    month_of = (
+        source.month
+        if source is ReceivableSummary
+        else month_of_date(source.created_at)
+    )
+    if by == "contact":
+        key, label = source.commercial_contact, User.name
+    elif by == "client":
+        client_name = Client.first_name.concat(" ").concat(Client.last_name)
+        key, label = source.client, client_name
+    else:
+        key, label = month_of, month_of
+    query = source.select(
+        key,
+        label,
+        contracts,
+        fn.SUM(source.total_amount),
+        fn.SUM(source.remaining_amount),
+    )
+    if by == "contact":
+        query = query.join(User, on=(source.commercial_contact == User.id))
+    elif by == "client":
+        query = query.join(Client, on=(source.client == Client.id))
+    if month is not None:
+        query = query.where(month_of == month)
+    return query.group_by(key).order_by(fn.SUM(source.remaining_amount).desc()).tuples()
+
+
+@app.command(name="receivables")
+@auth_required
+def receivables_report(
+    by: Annotated[
+        str, typer.Option("-b", help="Group by: contact, client or month")
+    ] = "contact",
+    month: Annotated[
+        Optional[str], typer.Option("-m", help="Only this month: YYYY-MM")
+    ] = None,
+    user=None,
+):
+    """Function to sum the amounts of the contracts and what is left to pay:
+    python -m crm report receivables -b "contact, client or month" -m "YYYY-MM".
+    AUTH REQUIRED LOGIN FIRST"""
+    try:
+        if not check_user_and_permissions(user, "list-contract"):
+            return
+        if by not in GROUPS:
+            typer.echo(f"Invalid group, choose from {', '.join(GROUPS)}")
+            return
+        totals = [0, 0, 0]
+        # The summary and its triggers only exist on SQLite
+        source = ReceivableSummary if is_sqlite(Contract._meta.database) else Contract
+        rows = receivables(source, by, month)
+
+        def lines():
+            for key, label, contracts, total, outstanding in rows:
+                totals[0] += contracts
+                totals[1] += total
+                totals[2] += outstanding
+                name = label if by == "month" else f"n°{key} {label}"
+                yield (
+                    f"{by.capitalize()} {name}: {contracts} contracts, "
+                    f"Total: {total:.2f}, Paid: {total - outstanding:.2f}, "
+                    f"Outstanding: {outstanding:.2f}"
+                )
+
+        if echo_lines(lines()) == 0:
+            typer.echo("No contracts in the database")
+            return
+        typer.echo(
+            f"All: {totals[0]} contracts, Total: {totals[1]:.2f}, "
+            f"Paid: {totals[1] - totals[2]:.2f}, Outstanding: {totals[2]:.2f}"
+        )
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    app()
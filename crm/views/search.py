@@ -0,0 +1,130 @@
+import re
+import typer
+from typing_extensions import Annotated
+from peewee import fn
+from crm.models.event import Event
+from crm.models.search_index import ClientIndex, EventIndex
+from crm.auth import auth_required, check_user_and_permissions
+from crm.config import is_sqlite
+from crm.views.output import echo_lines
+
+app = typer.Typer()
+
+OPERATORS = {"AND", "OR", "NOT"}
+BAREWORD = re.compile(r"^\w+$")
+
+
+def check_backend():
+    """Function to refuse a search without SQLite, the FTS5 indexes only exist there"""
+    if not is_sqlite(Event._meta.database):
+        raise ValueError("The full-text search needs the SQLite backend")
+
+
+def search_terms(text):
+    """Function to turn the text typed by the user into an FTS5 query.
+    A term ending with * is a prefix, the terms with punctuation
+    (emails, dates...) are searched as phrases"""
+    terms = []
+    for term in text.split():
+        if term in OPERATORS:
+            terms.append(term)
+            continue
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if not term:
+            continue
+        if not BAREWORD.match(term):
+            term = '"' + term.replace('"', '""') + '"'
+        terms.append(term + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def highlight(index, column):
+    return fn.highlight(index._meta.entity, column, "[", "]")
+
+
+def search_clients(text, limit):
+    """Function to select the clients matching text, best match first"""
+    return (
+        ClientIndex.select(
+            ClientIndex.rowid,
+            highlight(ClientIndex, 0).alias("first_name"),
+            highlight(ClientIndex, 1).alias("last_name"),
+            highlight(ClientIndex, 2).alias("email"),
+            highlight(ClientIndex, 3).alias("company_name"),
+        )
+        .where(ClientIndex.match(search_terms(text)))
+        .order_by(ClientIndex.rank())
+        .limit(limit)
+    )
+
+
+def search_events(text, limit):
+    """Function to select the events matching text, best match first"""
+    return (
+        EventIndex.select(
+            EventIndex.rowid,
+            highlight(EventIndex, 0).alias("name"),
+            highlight(EventIndex, 1).alias("location"),
+            fn.snippet(EventIndex._meta.entity, 2, "[", "]", "...", 10).alias("notes"),
+            Event.start_date,
+            Event.end_date,
+        )
+        .join(Event, on=(EventIndex.rowid == Event.id))
+        .where(EventIndex.match(search_terms(text)))
+        .order_by(EventIndex.rank())
+        .limit(limit)
+    )
+
+
+TextArgument = Annotated[
+    str, typer.Argument(help='Words to search, "word*" for the words starting with')
+]
+LimitOption = Annotated[
+    int, typer.Option("--limit", help="Maximum number of results shown")
+]
+
+
+@app.command()
+@auth_required
+def clients(text: TextArgument, limit: LimitOption = 20, user=None):
+    """Function to search the clients by name, email or company:
+    python -m crm search clients "words". AUTH REQUIRED LOGIN FIRST"""
+    try:
+        if not check_user_and_permissions(user, "list-client"):
+            return
+        check_backend()
+        lines = (
+            f"Client n°{client['rowid']}: {client['first_name']} {client['last_name']}, "
+            f"Email: {client['email']}, Company: {client['company_name']}"
+            for client in search_clients(text, limit).dicts().iterator()
+        )
+        if echo_lines(lines) == 0:
+            typer.echo("No clients found")
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+
+
+@app.command()
+@auth_required
+def events(text: TextArgument, limit: LimitOption = 20, user=None):
+    """Function to search the events by name, location or notes:
+    python -m crm search events "words". AUTH REQUIRED LOGIN FIRST"""
+    try:
+        if not check_user_and_permissions(user, "list-event"):
+            return
+        check_backend()
+        lines = (
+            f"Event n°{event['rowid']}: {event['name']}, Location: {event['location']}, "
+            f"Start date: {event['start_date']}, End date: {event['end_date']}, "
+            f"Notes: {event['notes']}"
+            for event in search_events(text, limit).dicts().iterator()
+        )
+        if echo_lines(lines) == 0:
+            typer.echo("No events found")
+    except Exception as e:
+        typer.echo(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    app()
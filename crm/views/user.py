@@ -1,10 +1,12 @@
 import typer
-import sentry_sdk
-import bcrypt
+from crm import monitoring
 from typing_extensions import Annotated, Optional
 from crm.models.user import User
 from crm.models.role import Role
 from crm.auth import auth_required, check_user_and_permissions
+from crm.hashing import check_password, hash_password, needs_rehash
+from crm.queries import paginate, users_with_role
+from crm.views.output import echo_lines
 import os
 
 
@@ -55,17 +57,17 @@ def create_user(
     try:
         if not check_user_and_permissions(user, "create-user"):
             return
-        hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+        hashed_password = hash_password(password)
         user_create = User.create(
             name=name, email=email, password=hashed_password, role=role
         )
         typer.echo("User created successfully")
-        sentry_sdk.capture_message(
+        monitoring.capture_message(
             f"User created: {user_create.id} - {user_create.name}"
         )
         return user_create
     except Exception as e:
-        sentry_sdk.capture_exception(e)
+        monitoring.capture_exception(e)
         return typer.echo(f"Error : {e}")
 
 
@@ -77,7 +79,11 @@ def login(
     """Function to login: python -m crm user login or python -m crm user login -e "email" -p "password" """
     try:
         user = User.get(email=email)
-        if user and bcrypt.checkpw(password.encode(), user.password.encode()):
+        if user and check_password(password, user.password):
+            if needs_rehash(user.password):
+                # The work factor has changed since the last login
+                user.password = hash_password(password)
+                user.save()
             token = user.generate_token()
             print(f"salut {token}")
             with open("token.txt", "w") as token_file:
@@ -110,26 +116,34 @@ def logout():
 @auth_required
 def list_users(
     role: Annotated[Optional[str], typer.Option("-r", help="name of the role")] = None,
+    after_id: Annotated[
+        Optional[int], typer.Option("--after-id", help="List the users after this id")
+    ] = None,
+    limit: Annotated[
+        Optional[int], typer.Option("--limit", help="Maximum number of users listed")
+    ] = None,
     user=None,
 ):
     """Function to get the list of all users: python -m crm user list-users or
-    to get users by role: python -m crm user list-users -r "role". AUTH REQUIRED LOGIN FIRST
+    to get users by role: python -m crm user list-users -r "role".
+    Page by page with --after-id "last id seen" --limit "page size". AUTH REQUIRED LOGIN FIRST
     """
     try:
         valid_roles = {"Admin", "Commercial", "Gestion", "Support"}
-        users = User.select()
+        users = users_with_role()
         if role is not None:
             if role not in valid_roles:
                 typer.echo("Invalid role value")
                 return
-            users = User.select().join(Role).where(Role.name == role)
-        if users.count() == 0:
+            users = users.where(Role.name == role)
+        users = paginate(users, User, after_id, limit)
+        lines = (
+            f"User n°{user.id}: Name: {user.name}, "
+            f"Email: {user.email}, Role: {user.role.name}"
+            for user in users.iterator()
+        )
+        if echo_lines(lines) == 0:
             typer.echo("No users found")
-        for user in users:
-            typer.echo(
-                f"User n°{user.id}: Name: {user.name}, "
-                f"Email: {user.email}, Role: {user.role.name}"
-            )
     except Exception as e:
         typer.echo(f"Error: {e}")
 
@@ -209,7 +223,7 @@ def update_user(
             new_password = typer.prompt(
                 "Enter new password", hide_input=True, confirmation_prompt=True
             )
-            password = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt()).decode()
+            password = hash_password(new_password)
         else:
             password = user_to_up.password
 
@@ -219,14 +233,14 @@ def update_user(
 
         user_to_up.save()
         typer.echo("User updated succesfully")
-        sentry_sdk.capture_message(f"User updated: {user_to_up.id} - {user_to_up.name}")
+        monitoring.capture_message(f"User updated: {user_to_up.id} - {user_to_up.name}")
 
     except User.DoesNotExist:
         typer.echo("Not found")
-        sentry_sdk.capture_message(f"Attempted to update non-existent user: {user_id}")
+        monitoring.capture_message(f"Attempted to update non-existent user: {user_id}")
 
     except Exception as e:
-        sentry_sdk.capture_exception(e)
+        monitoring.capture_exception(e)
         typer.echo(f"Error: {e}")
 
 
@@ -263,19 +277,19 @@ def update_user_direct(
         if email is not None:
             user_to_up.email = email
         if password is not None:
-            new_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+            new_password = hash_password(password)
             user_to_up.password = new_password
 
         user_to_up.save()
         typer.echo("User updated succesfully")
-        sentry_sdk.capture_message(f"User updated: {user_to_up.id} - {user_to_up.name}")
+        monitoring.capture_message(f"User updated: {user_to_up.id} - {user_to_up.name}")
 
     except User.DoesNotExist:
         typer.echo("User not found")
-        sentry_sdk.capture_message(f"Attempted to update non-existent user: {user_id}")
+        monitoring.capture_message(f"Attempted to update non-existent user: {user_id}")
 
     except Exception as e:
-        sentry_sdk.capture_exception(e)
+        monitoring.capture_exception(e)
         typer.echo(f"Error: {e}")
 
 
@@ -1,7 +1,7 @@
 import sys
 import os
+import contextlib
 import pytest
-import bcrypt
 from unittest.mock import patch
 from peewee import SqliteDatabase
 from typer.testing import CliRunner
@@ -12,23 +12,55 @@ from crm.models.contract import Contract
 from crm.models.event import Event
 from crm.models.rolepermission import RolePermission
 from crm.models.permission import Permission
+from crm.models.import_checkpoint import ImportCheckpoint
+from crm.models.permission_epoch import PermissionEpoch
+from crm.models.permission_index import forget_epoch
+from crm.hashing import hash_password
+from crm.models.search_index import INDEXES as SEARCH_INDEXES, create_search_index
+from crm.models.receivable_summary import (
+    ReceivableSummary,
+    create_receivable_summary,
+)
+from crm.models.event_span import EventSpan, create_event_span
+from crm.models.audit_entry import AuditEntry, create_audit_journal
+from crm import audit, cache
+from crm.profiler import profiled, text_report
 
 # Ajoute le répertoire parent au PYTHONPATH
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-
-
+# The cheapest bcrypt work factor, the tests don't need slow hashes
+os.environ.setdefault("CRM_BCRYPT_ROUNDS", "4")
+
+
+TABLES = [
+    User,
+    Role,
+    Client,
+    Contract,
+    Event,
+    RolePermission,
+    Permission,
+    ImportCheckpoint,
+    PermissionEpoch,
+]
+MODELS = TABLES + SEARCH_INDEXES + [ReceivableSummary, EventSpan, AuditEntry]
 test_db = SqliteDatabase(":memory:")
 runner = CliRunner()
 
 
-@pytest.fixture
-def setup_db():
+@pytest.fixture(scope="session")
+def template_db():
+    """The seeded database, built once per session (once per worker with
+    pytest-xdist, each in its own process memory) and copied by setup_db"""
+    template = SqliteDatabase(":memory:")
     # Link models to database
-    test_db.bind([User, Role, Client, Contract, Event, RolePermission, Permission])
-    test_db.connect()
-    test_db.create_tables(
-        [User, Role, Client, Contract, Event, RolePermission, Permission]
-    )
+    template.bind(MODELS)
+    template.connect()
+    template.create_tables(TABLES)
+    create_search_index(template)
+    create_receivable_summary(template)
+    create_event_span(template)
+    create_audit_journal(template)
 
     def create_roles():
         Role.create(name="Commercial"),
@@ -40,32 +72,32 @@ def setup_db():
         user1 = User.get_or_create(
             name="Com",
             email="com@gmail.com",
-            password=bcrypt.hashpw("com".encode(), bcrypt.gensalt()).decode(),
+            password=hash_password("com"),
             role=Role.get(id=1),
         )
         user2 = User.get_or_create(
             name="Gest",
             email="gest@gmail.com",
-            password=bcrypt.hashpw("gest".encode(), bcrypt.gensalt()).decode(),
+            password=hash_password("gest"),
             role=Role.get(id=2),
         )
         user3 = User.get_or_create(
             name="Sup",
             email="sup@gmail.com",
-            password=bcrypt.hashpw("sup".encode(), bcrypt.gensalt()).decode(),
+            password=hash_password("sup"),
             role=Role.get(id=3),
         )
         user4 = User.get_or_create(
             name="Admin",
             email="admin@gmail.com",
-            password=bcrypt.hashpw("admin".encode(), bcrypt.gensalt()).decode(),
+            password=hash_password("admin"),
             role=Role.get(id=4),
         )
 
         user5 = User.get_or_create(
             name="Com1",
             email="com1@gmail.com",
-            password=bcrypt.hashpw("com1".encode(), bcrypt.gensalt()).decode(),
+            password=hash_password("com1"),
             role=Role.get(id=1),
         )
 
@@ -236,12 +268,99 @@ def setup_db():
     create_contracts()
     create_events()
     create_permissions()
+    audit.flush()
+    yield template
+    template.close()
+
+
+@pytest.fixture
+def setup_db(template_db, tmp_path, monkeypatch):
+    """A copy of the template database for one test, by the online backup
+    API, in a working directory of its own (token.txt)"""
+    test_db.bind(MODELS)
+    test_db.connect()
+    template_db.connection().backup(test_db.connection())
+    # The epoch is read from this database
+    forget_epoch()
+    monkeypatch.chdir(tmp_path)
     yield test_db
-    # Clean database
-    test_db.drop_tables([User, Role, Client, Contract, Event, RolePermission])
+    # The changes not written by a command belong to this database only
+    audit.clear()
+    cache.clear()
+    # The in-memory database is dropped with its connection
     test_db.close()
 
 
+@pytest.fixture
+def query_budget(setup_db):
+    """Context manager failing the test when the statements run on the test
+    database in its block exceed budget: with query_budget(2): runner.invoke(...)"""
+
+    @contextlib.contextmanager
+    def within(budget):
+        with profiled(setup_db) as profile:
+            yield profile
+        summary = profile.summary()
+        if summary["statements"] > budget:
+            pytest.fail(
+                f"{summary['statements']} statements for a budget of {budget}\n"
+                + text_report(summary),
+                pytrace=False,
+            )
+
+    return within
+
+
+@pytest.fixture
+def count_queries(setup_db):
+    """Context manager yielding the Profile of the statements run on the test
+    database in its block: with count_queries() as profile: ..."""
+    return lambda: profiled(setup_db)
+
+
+@pytest.fixture
+def add_rows(setup_db):
+    """Function to add count users, clients, contracts and events in the
+    test database: add_rows(20)"""
+
+    def add(count):
+        support = User.get(id=3)
+        commercial = User.get(id=1)
+        for i in range(count):
+            User.create(
+                name=f"bench{i}", email=f"bench{i}@gmail.com", password="x", role=3
+            )
+            client = Client.create(
+                first_name=f"bench{i}",
+                last_name="client",
+                email=f"bench{i}@gmail.com",
+                phone="0123456",
+                company_name="bench&co",
+                epic_events_contact=commercial,
+            )
+            contract = Contract.create(
+                client=client,
+                total_amount=1000,
+                remaining_amount=500,
+                commercial_contact=commercial,
+                status=True,
+            )
+            Event.create(
+                name=f"bench event {i}",
+                contract=contract,
+                start_date="2025-10-12",
+                end_date="2025-10-13",
+                location="paris",
+                attendees=10,
+                notes="",
+                support_contact=support if i % 2 else None,
+            )
+        # The journal of these rows is not written by the command measured
+        audit.flush()
+
+    return add
+
+
 @pytest.fixture
 def admin_logged():
     user = User.get(id=4)
@@ -274,7 +393,7 @@ def user2(setup_db):
         user_data = {
             "name": "Nath",
             "email": "nath@gmail.com",
-            "password": bcrypt.hashpw("com".encode(), bcrypt.gensalt()).decode(),
+            "password": hash_password("com"),
             "role": role.id,
         }
         user = User.create(**user_data)
@@ -289,7 +408,7 @@ def user3(setup_db):
         user_data = {
             "name": "Carlos",
             "email": "carlos@gmail.com",
-            "password": bcrypt.hashpw("carlositos".encode(), bcrypt.gensalt()).decode(),
+            "password": hash_password("carlositos"),
             "role": role.id,
         }
         user = User.create(**user_data)
@@ -324,3 +443,11 @@ def contract1(setup_db, user2, client1):
             commercial_contact=user2,
         )
         yield contract
+
+
+@pytest.fixture(autouse=True)
+def sentry_offline(tmp_path, monkeypatch):
+    """Keep the Sentry events of the tests in a temporary spool, sent nowhere"""
+    monkeypatch.setenv("CRM_SENTRY_SPOOL", str(tmp_path / "sentry_spool.jsonl"))
+    monkeypatch.setenv("CRM_SENTRY_LOCAL_FILE", str(tmp_path / "sentry_local.jsonl"))
+    monkeypatch.setenv("SENTRY_DSN", "local")
@@ -0,0 +1,75 @@
+import json
+import pytest
+from peewee import IntegrityError
+from crm import audit
+from crm.models.audit_entry import AuditEntry
+from crm.models.client import Client
+from crm.models.user import User
+
+
+def journal(entity, entity_id):
+    return [
+        (entry.action, json.loads(entry.changes))
+        for entry in AuditEntry.select()
+        .where((AuditEntry.entity == entity) & (AuditEntry.entity_id == entity_id))
+        .order_by(AuditEntry.id)
+    ]
+
+
+def test_save_and_delete_are_journaled(setup_db, user2):
+    with setup_db.atomic():
+        client = Client.create(
+            first_name="Tom",
+            last_name="Cruise",
+            email="top-gun@gmail.com",
+            phone="0011223344",
+            company_name="Top Gun company",
+            epic_events_contact=user2,
+        )
+        client.company_name = "Maverick"
+        client.save()
+        client.save()
+        client.delete_instance()
+        audit.flush()
+
+        create, update, delete = journal("client", client.id)
+        assert create[0] == "create"
+        assert create[1]["email"] == "top-gun@gmail.com"
+        assert create[1]["epic_events_contact"] == user2.id
+        assert update == ("update", {"company_name": "Maverick"})
+        assert delete == ("delete", {})
+
+
+def test_password_is_hidden(setup_db):
+    with setup_db.atomic():
+        user = User.get(id=1)
+        user.password = "new hash"
+        user.save()
+        audit.flush()
+
+        assert journal("user", 1)[-1] == ("update", {"password": audit.HIDDEN})
+
+
+def test_buffer_is_written_by_batch(setup_db, monkeypatch):
+    monkeypatch.setenv("CRM_AUDIT_BATCH", "2")
+    with setup_db.atomic():
+        audit.flush()
+        before = AuditEntry.select().count()
+        for name in ("a", "b", "c"):
+            user = User.get(id=1)
+            user.name = name
+            user.save()
+
+        assert AuditEntry.select().count() == before + 2
+        assert audit.flush() == 1
+
+
+def test_journal_is_append_only(setup_db):
+    with setup_db.atomic():
+        audit.flush()
+        with pytest.raises(IntegrityError):
+            with setup_db.atomic():
+                AuditEntry.update(action="forged").execute()
+        with pytest.raises(IntegrityError):
+            with setup_db.atomic():
+                AuditEntry.delete().execute()
@@ -0,0 +1,45 @@
+import pytest
+from crm.models.client import Client
+from crm.models.event import Event
+from crm.models.permission import Permission
+from crm.models.role import Role
+from crm.models.rolepermission import RolePermission
+from crm.models.user import User
+from crm.queries import events_with_relations, users_with_role
+from crm.views.contract import get_list
+
+VIEW_QUERIES = {
+    "permission by name": lambda: Permission.select().where(
+        Permission.name == "create-client"
+    ),
+    "role permission": lambda: RolePermission.select().where(
+        (RolePermission.role == 1) & (RolePermission.permission == 1)
+    ),
+    "role by name": lambda: Role.select().where(Role.name == "Admin"),
+    "user by name": lambda: User.select().where(User.name == "Sup"),
+    "users by role": lambda: users_with_role().where(Role.name == "Support"),
+    "events by support contact": lambda: events_with_relations().where(
+        User.name == "Sup"
+    ),
+    "events without support": lambda: events_with_relations().where(
+        Event.support_contact.is_null(True)
+    ),
+    "event of a contract": lambda: Event.select().where(Event.contract == 1),
+    "contracts signed": lambda: get_list("signed", None),
+    "contracts signed with rest to pay": lambda: get_list("signed", "rest to pay"),
+    "contracts with rest to pay": lambda: get_list(None, "rest to pay"),
+    "contracts paid": lambda: get_list(None, "paid"),
+    "clients of a contact": lambda: Client.select().where(
+        Client.epic_events_contact == 1
+    ),
+}
+
+
+@pytest.mark.parametrize("name", VIEW_QUERIES)
+def test_view_query_uses_index(setup_db, name):
+    query = VIEW_QUERIES[name]()
+    sql, params = query.sql()
+    plan = setup_db.execute_sql(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+
+    scans = [row[-1] for row in plan if row[-1].startswith("SCAN")]
+    assert not scans, f"{name}: {scans}"
@@ -0,0 +1,186 @@
+import asyncio
+import json
+from concurrent.futures import Executor, Future
+import crm.api
+from crm.api import ApiServer
+from crm.models.audit_entry import AuditEntry
+
+
+class InlineExecutor(Executor):
+    """Executor running the queries in the thread of the test, the only one
+    seeing the in memory database"""
+
+    def submit(self, function, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(function(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+async def send(connection, method, path, body=None, token=None):
+    """Function to send one request on connection and read its response:
+    (status, headers, body)"""
+    reader, writer = connection
+    data = json.dumps(body).encode() if body is not None else b""
+    headers = [
+        f"{method} {path} HTTP/1.1",
+        "Host: test",
+        f"Content-Length: {len(data)}",
+    ]
+    if token:
+        headers.append(f"Authorization: Bearer {token}")
+    writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + data)
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode()
+    status = int(head.split(" ")[1])
+    headers = dict(
+        line.lower().split(": ", 1) for line in head.split("\r\n")[1:] if line
+    )
+    if headers.get("transfer-encoding") == "chunked":
+        body = b""
+        while size := int((await reader.readuntil(b"\r\n"))[:-2], 16):
+            body += (await reader.readexactly(size + 2))[:-2]
+        await reader.readexactly(2)
+    else:
+        body = await reader.readexactly(int(headers["content-length"]))
+    return status, headers, body.decode()
+
+
+def run_with_api(scenario):
+    """Function to serve the API on a free port while scenario(connect) runs"""
+
+    async def main():
+        server = ApiServer(executor=InlineExecutor())
+        listening = await server.serve("127.0.0.1", 0)
+        port = listening.sockets[0].getsockname()[1]
+        try:
+            return await scenario(lambda: asyncio.open_connection("127.0.0.1", port))
+        finally:
+            listening.close()
+
+    return asyncio.run(main())
+
+
+async def login(connection, email, password):
+    status, _, body = await send(
+        connection, "POST", "/login", {"email": email, "password": password}
+    )
+    return status, json.loads(body)
+
+
+def test_api_login(setup_db):
+    async def scenario(connect):
+        connection = await connect()
+        return (
+            await login(connection, "admin@gmail.com", "admin"),
+            await login(connection, "admin@gmail.com", "wrong"),
+        )
+
+    with setup_db.atomic():
+        (status, body), (wrong_status, wrong_body) = run_with_api(scenario)
+
+    assert status == 200 and body["token"]
+    assert wrong_status == 401
+    assert wrong_body == {"error": "Wrong email or password"}
+
+
+def test_api_lists_and_gets_on_one_connection(setup_db):
+    async def scenario(connect):
+        connection = await connect()
+        _, body = await login(connection, "admin@gmail.com", "admin")
+        token = body["token"]
+        return [
+            await send(connection, "GET", "/clients", token=token),
+            await send(connection, "GET", "/clients?after_id=1&limit=1", token=token),
+            await send(connection, "GET", "/events/2", token=token),
+            await send(connection, "GET", "/events/99", token=token),
+        ]
+
+    with setup_db.atomic():
+        clients, page, event, missing = run_with_api(scenario)
+
+    assert clients[1]["connection"] == "keep-alive"
+    rows = [json.loads(line) for line in clients[2].splitlines()]
+    assert [row["id"] for row in rows] == [1, 2, 3]
+    assert rows[0]["email"] == "client1@gmail.com"
+    assert [json.loads(line)["id"] for line in page[2].splitlines()] == [2]
+    assert json.loads(event[2])["support_contact"] == 3
+    assert missing[0] == 404
+
+
+def test_api_streams_in_chunks(setup_db, monkeypatch):
+    monkeypatch.setattr(crm.api, "STREAM_ROWS", 2)
+
+    async def scenario(connect):
+        connection = await connect()
+        _, body = await login(connection, "admin@gmail.com", "admin")
+        return await send(connection, "GET", "/users?limit=3", token=body["token"])
+
+    with setup_db.atomic():
+        status, _, body = run_with_api(scenario)
+
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert status == 200
+    assert [row["id"] for row in rows] == [1, 2, 3]
+    assert "password" not in rows[0]
+
+
+def test_api_streams_to_http_10_until_close(setup_db):
+    async def scenario(connect):
+        connection = await connect()
+        _, body = await login(connection, "admin@gmail.com", "admin")
+        reader, writer = await connect()
+        writer.write(
+            (
+                "GET /clients HTTP/1.0\r\n"
+                "Connection: keep-alive\r\n"
+                f"Authorization: Bearer {body['token']}\r\n\r\n"
+            ).encode()
+        )
+        # The body ends when the server closes the connection
+        return (await reader.read()).decode()
+
+    with setup_db.atomic():
+        response = run_with_api(scenario)
+
+    head, body = response.split("\r\n\r\n", 1)
+    assert "Transfer-Encoding" not in head
+    assert "Connection: close" in head
+    assert [json.loads(line)["id"] for line in body.splitlines()] == [1, 2, 3]
+
+
+def test_api_login_rehash_is_journaled_as_the_user(setup_db, monkeypatch):
+    # The seeded passwords are hashed with another work factor
+    monkeypatch.setenv("CRM_BCRYPT_ROUNDS", "5")
+
+    async def scenario(connect):
+        return await login(await connect(), "admin@gmail.com", "admin")
+
+    with setup_db.atomic():
+        run_with_api(scenario)
+        entry = AuditEntry.select().order_by(AuditEntry.id.desc()).get()
+
+    assert (entry.user, entry.entity, entry.entity_id) == (4, "user", 4)
+    assert entry.changes == '{"password": "***"}'
+
+
+def test_api_permissions(setup_db):
+    async def scenario(connect):
+        connection = await connect()
+        _, body = await login(connection, "com@gmail.com", "com")
+        return [
+            await send(connection, "GET", "/users", token=body["token"]),
+            await send(connection, "GET", "/users"),
+            await send(connection, "GET", "/users", token="not a token"),
+            await send(connection, "DELETE", "/users/1", token=body["token"]),
+        ]
+
+    with setup_db.atomic():
+        forbidden, anonymous, invalid, method = run_with_api(scenario)
+
+    assert forbidden[0] == 403
+    assert anonymous[0] == 401
+    assert json.loads(invalid[2]) == {"error": "Invalid Token"}
+    assert method[0] == 405
@@ -0,0 +1,63 @@
+from typer.testing import CliRunner
+from crm.__main__ import app
+from crm.assignment import Bookings, plan_assignments, save_assignments
+from crm.models.event import Event
+
+runner = CliRunner()
+
+
+def test_plan_is_balanced_and_without_overlap():
+    events = [(1, 0, 10), (2, 5, 15), (3, 11, 20), (4, 21, 30), (5, 10, 12)]
+    plan, left = plan_assignments(events, ["a", "b", "c"])
+
+    assert left == []
+    assert plan == {1: "a", 2: "b", 5: "c", 3: "a", 4: "b"}
+
+
+def test_plan_skips_bookings_and_leaves_full_events():
+    bookings = {"a": Bookings([(0, 4), (8, 11)])}
+    plan, left = plan_assignments(
+        [(1, 2, 3), (2, 9, 12), (3, 10, 11)], ["a", "b"], bookings
+    )
+
+    assert plan == {1: "b", 2: "b"}
+    assert left == [3]
+    assert not bookings["a"].overlaps(5, 7)
+    assert bookings["a"].overlaps(4, 5)
+
+
+def test_auto_assign_no_support_free(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["event", "auto-assign"])
+
+        assert "0 events assigned" in result.output
+        assert "1 events left without support contact" in result.output
+        assert Event.get(id=1).support_contact is None
+
+
+def test_auto_assign_valid(setup_db, admin_logged, user1):
+    with setup_db.atomic():
+        dry_run = runner.invoke(app, ["event", "auto-assign", "--dry-run"])
+        assert "1 events would be assigned" in dry_run.output
+        assert Event.get(id=1).support_contact is None
+
+        result = runner.invoke(app, ["event", "auto-assign"])
+
+        assert f"Support contact n°{user1.id} Jean: 1 events" in result.output
+        assert "1 events assigned" in result.output
+        assert Event.get(id=1).support_contact == user1
+
+
+def test_auto_assign_permission(setup_db, com_logged):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["event", "auto-assign"])
+
+        assert "You don't have the permissions required" in result.output
+
+
+def test_save_keeps_support_assigned_meanwhile(setup_db, user1):
+    with setup_db.atomic():
+        Event.update(support_contact=3).where(Event.id == 1).execute()
+
+        assert save_assignments({1: user1.id}) == 0
+        assert Event.get(id=1).support_contact.id == 3
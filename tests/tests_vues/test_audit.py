@@ -0,0 +1,120 @@
+import json
+from typer.testing import CliRunner
+from crm import audit
+from crm.__main__ import app
+from crm.assignment import save_assignments
+from crm.models.client import Client
+from crm.models.event import Event
+from crm.models.user import User
+from crm.models.audit_entry import AuditEntry
+
+runner = CliRunner()
+
+
+def test_command_changes_are_journaled_with_their_user(setup_db, admin_logged):
+    with setup_db.atomic():
+        runner.invoke(
+            app, ["client", "update-client-direct", "-i", 1, "-c", "new company"]
+        )
+        entry = AuditEntry.select().order_by(AuditEntry.id.desc()).get()
+
+        assert (entry.user, entry.entity, entry.entity_id) == (4, "client", 1)
+        assert entry.action == "update"
+        assert json.loads(entry.changes)["company_name"] == "new company"
+
+
+def test_bulk_update_is_journaled_per_row(setup_db, admin_logged):
+    with setup_db.atomic():
+        runner.invoke(
+            app, ["contract", "bulk-update", "--ids", "1,3", "--set-remaining", "0"]
+        )
+        entries = (
+            AuditEntry.select()
+            .where(AuditEntry.entity == "contract", AuditEntry.action == "update")
+            .order_by(AuditEntry.entity_id)
+        )
+
+        assert [entry.entity_id for entry in entries] == [1, 3]
+        assert all(entry.user == 4 for entry in entries)
+        assert json.loads(entries[0].changes) == {"remaining_amount": "0"}
+
+
+def test_audit_show_history_of_a_row(setup_db, admin_logged):
+    with setup_db.atomic():
+        runner.invoke(
+            app, ["client", "update-client-direct", "-i", 2, "-c", "new company"]
+        )
+        result = runner.invoke(app, ["audit", "show", "-e", "client", "-i", 2])
+        wrong = runner.invoke(app, ["audit", "show", "-e", "table"])
+
+        lines = result.output.splitlines()
+        assert "user n°4: update client n°2" in lines[0]
+        assert "company_name=new company" in lines[0]
+        assert "script: create client n°2" in lines[-1]
+        assert "Invalid entity" in wrong.output
+
+
+def test_audit_show_only_own_changes(setup_db, com_logged):
+    with setup_db.atomic():
+        runner.invoke(
+            app, ["client", "update-client-direct", "-i", 1, "-c", "new company"]
+        )
+        own = runner.invoke(app, ["audit", "show"])
+        other = runner.invoke(app, ["audit", "show", "-u", 4])
+
+        assert own.output.count("\n") == 1
+        assert "user n°1: update client n°1" in own.output
+        assert "You don't have the permissions required" in other.output
+
+
+def test_rolled_back_change_is_not_journaled(setup_db):
+    with setup_db.atomic() as transaction:
+        client = Client.get(id=1)
+        client.company_name = "rolled back"
+        client.save()
+        transaction.rollback(False)
+
+    assert audit.flush() == 0
+
+
+def test_assignment_journals_only_the_events_updated(setup_db, user1):
+    with setup_db.atomic():
+        # The event 2 is assigned already
+        assert save_assignments({1: user1.id, 2: user1.id}) == 1
+        entries = AuditEntry.select().where(
+            AuditEntry.entity == "event", AuditEntry.action == "update"
+        )
+
+        assert [entry.entity_id for entry in entries] == [1]
+        assert json.loads(entries[0].changes) == {"support_contact": user1.id}
+
+
+def test_imported_rows_are_journaled(setup_db, admin_logged, tmp_path):
+    with setup_db.atomic():
+        clients = tmp_path / "clients.csv"
+        clients.write_text(
+            "first_name,last_name,email,phone,company_name,epic_events_contact\n"
+            "Ada,Lovelace,ada@gmail.com,0102,Engine,1\n"
+            "Alan,Turing,alan@gmail.com,0103,Enigma,1\n"
+        )
+        users = tmp_path / "users.csv"
+        users.write_text(
+            "name,email,password,role\n"
+            "Grace,grace@gmail.com,hopper,Support\n"
+            "Copy,com@gmail.com,copy,Support\n"
+        )
+        runner.invoke(app, ["import", "clients", str(clients)])
+        runner.invoke(app, ["import", "users", str(users)])
+        entries = AuditEntry.select().where(AuditEntry.action == "create")
+
+        ids = {
+            (entry.entity, entry.entity_id): json.loads(entry.changes)
+            for entry in entries
+            if entry.user == 4
+        }
+        ada = Client.get(email="ada@gmail.com").id
+        alan = Client.get(email="alan@gmail.com").id
+        grace = User.get(email="grace@gmail.com").id
+        assert set(ids) == {("client", ada), ("client", alan), ("user", grace)}
+        assert ids["client", alan]["company_name"] == "Enigma"
+        assert ids["user", grace]["password"] == "***"
@@ -0,0 +1,90 @@
+import jwt
+from crm.auth import decode_token, get_authenticated_user
+from crm.config import SECRET_KEY
+from crm.models.permission import Permission
+from crm.models.permission_index import (
+    get_role_permissions,
+    forget_epoch,
+    invalidate_permission_index,
+    mask_permissions,
+    permission_mask,
+)
+from crm.models.role import Role
+from crm.models.user import User
+
+
+def login(user, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open("token.txt", "w") as token_file:
+        token_file.write(user.generate_token())
+
+
+def read_token():
+    with open("token.txt") as token_file:
+        return token_file.read()
+
+
+def test_permission_mask_round_trip():
+    names = {"list-client", "update-event", "delete-user"}
+
+    assert mask_permissions(permission_mask(names)) == names
+    assert permission_mask(Permission.generate_permissions()) == (1 << 25) - 1
+
+
+def test_token_claims(setup_db):
+    with setup_db.atomic():
+        user = User.get(User.name == "Sup")
+        payload = decode_token(user.generate_token())
+
+    assert payload["role_id"] == user.role_id
+    assert payload["role"] == "Support"
+    assert mask_permissions(payload["perms"]) == get_role_permissions(user.role_id)
+
+
+def test_authenticated_user_without_queries(
+    setup_db, count_queries, tmp_path, monkeypatch
+):
+    with setup_db.atomic():
+        login(User.get(User.name == "Com"), tmp_path, monkeypatch)
+        with count_queries() as counter:
+            user = get_authenticated_user()
+            allowed = user.has_permission("create-client")
+            denied = user.has_permission("delete-client")
+            role_name = user.role.name
+
+    assert len(counter.statements) == 0
+    assert user.id == User.get(User.name == "Com").id
+    assert (allowed, denied, role_name) == (True, False, "Commercial")
+
+
+def test_stale_epoch_reloads_user(setup_db, count_queries, tmp_path, monkeypatch):
+    with setup_db.atomic():
+        login(User.get(User.name == "Com"), tmp_path, monkeypatch)
+        expiry = decode_token(read_token())["exp"]
+        invalidate_permission_index()
+        # A next command reads the new epoch
+        forget_epoch()
+        with count_queries() as counter:
+            user = get_authenticated_user()
+        refreshed = jwt.decode(read_token(), SECRET_KEY, algorithms="HS256")
+        with count_queries() as counter_after:
+            get_authenticated_user()
+
+    assert len(counter.statements) > 0
+    assert user.name == "Com"
+    assert refreshed["exp"] == expiry
+    assert len(counter_after.statements) == 0
+
+
+def test_role_change_makes_claims_stale(setup_db, tmp_path, monkeypatch):
+    with setup_db.atomic():
+        user = User.get(User.name == "Com")
+        login(user, tmp_path, monkeypatch)
+        user.role = Role.get(Role.name == "Gestion")
+        user.save()
+        # The claims are stale once the new role is committed
+        assert get_authenticated_user().role.name == "Commercial"
+    reloaded = get_authenticated_user()
+
+    assert reloaded.role.name == "Gestion"
+    assert reloaded.has_permission("update-contract")
@@ -0,0 +1,135 @@
+import json
+from typer.testing import CliRunner
+from crm import monitoring
+from crm.__main__ import app
+from crm.models.client import Client
+from crm.models.contract import Contract
+from crm.models.event import Event
+
+runner = CliRunner()
+
+
+def spooled_messages():
+    with open(monitoring.spool_path(), encoding="utf-8") as spool_file:
+        return [json.loads(line)["message"] for line in spool_file]
+
+
+def test_bulk_sign_contracts(setup_db, admin_logged):
+    with setup_db.atomic():
+        args = ["contract", "bulk-update", "--status", "not signed"]
+        dry_run = runner.invoke(app, args + ["--set-status", "signed", "--dry-run"])
+        result = runner.invoke(app, args + ["--set-status", "signed"])
+
+        assert "3 contracts would be updated" in dry_run.output
+        assert "3 contracts updated" in result.output
+        assert Contract.select().where(Contract.status == False).count() == 0  # noqa
+        assert sorted(spooled_messages()) == [
+            "Contract signed: 1",
+            "Contract signed: 3",
+            "Contract signed: 5",
+        ]
+
+
+def test_bulk_update_contracts_limited_to_owner(setup_db, com_logged):
+    with setup_db.atomic():
+        result = runner.invoke(
+            app,
+            ["contract", "bulk-update", "--ids", "1,3,5", "--set-remaining", "0"],
+        )
+
+        assert "1 contracts updated" in result.output
+        assert Contract.get(id=1).remaining_amount == 0
+        assert Contract.get(id=3).remaining_amount == 2500
+
+
+def test_bulk_update_contracts_needs_filter_and_change(setup_db, admin_logged):
+    with setup_db.atomic():
+        no_filter = runner.invoke(
+            app, ["contract", "bulk-update", "--set-remaining", "0"]
+        )
+        no_change = runner.invoke(app, ["contract", "bulk-update", "--ids", "1"])
+        wrong_ids = runner.invoke(
+            app, ["contract", "bulk-update", "--ids", "1,a", "--set-remaining", "0"]
+        )
+
+        assert "At least one filter is required" in no_filter.output
+        assert "Nothing to update" in no_change.output
+        assert "The ids must be numbers separated by commas" in wrong_ids.output
+
+
+def test_bulk_update_remaining_amount_checked(setup_db, admin_logged):
+    with setup_db.atomic():
+        negative = runner.invoke(
+            app, ["contract", "bulk-update", "--ids", "1", "--set-remaining", "-5"]
+        )
+        above = runner.invoke(
+            app,
+            ["contract", "bulk-update", "--ids", "1,2,3", "--set-remaining", "12000"],
+        )
+
+        assert "The remaining amount can't be negative" in negative.output
+        assert "of the contracts 2, 3: nothing updated" in above.output
+        assert Contract.get(id=1).remaining_amount == 50000
+
+
+def test_bulk_reassign_clients(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(
+            app, ["client", "bulk-update", "--commercial", "5", "--set-commercial", "1"]
+        )
+        not_commercial = runner.invoke(
+            app, ["client", "bulk-update", "--ids", "1", "--set-commercial", "3"]
+        )
+
+        assert "1 clients updated" in result.output
+        assert Client.get(id=3).epic_events_contact.id == 1
+        assert "Only a commercial user can be assigned" in not_commercial.output
+
+
+def test_bulk_update_clients_limited_to_owner(setup_db, com_logged):
+    with setup_db.atomic():
+        result = runner.invoke(
+            app, ["client", "bulk-update", "--ids", "1,2,3", "--set-company", "acme"]
+        )
+
+        assert "2 clients updated" in result.output
+        assert Client.get(id=3).company_name == "client3&co"
+
+
+def test_bulk_update_events_support(setup_db, admin_logged, user1):
+    with setup_db.atomic():
+        result = runner.invoke(
+            app, ["event", "bulk-update", "--ids", "2", "--set-support", str(user1.id)]
+        )
+        # Events 2 and 3 overlap: one support contact cannot take both
+        conflict = runner.invoke(
+            app,
+            ["event", "bulk-update", "--support", "3", "--set-support", str(user1.id)],
+        )
+
+        assert "1 events updated" in result.output
+        assert Event.get(id=2).support_contact.id == user1.id
+        assert "n°2 and n°3" in conflict.output or "n°3 and n°2" in conflict.output
+        assert "No event updated" in conflict.output
+        assert Event.get(id=3).support_contact.id == 3
+
+
+def test_bulk_update_events_by_period(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(
+            app,
+            [
+                "event",
+                "bulk-update",
+                "--from",
+                "2025-12-12",
+                "--to",
+                "2025-12-31",
+                "--set-location",
+                "berlin",
+            ],
+        )
+
+        assert "1 events updated" in result.output
+        assert Event.get(id=2).location == "berlin"
+        assert Event.get(id=1).location == "paris"
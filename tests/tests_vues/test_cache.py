@@ -0,0 +1,91 @@
+import json
+from typer.testing import CliRunner
+from crm import cache
+from crm.__main__ import app
+from crm.models.client import Client
+from crm.models.contract import Contract
+from crm.models.user import User
+from crm.profiler import profiled
+from crm.views.bulk import bulk_update
+
+runner = CliRunner(mix_stderr=False)
+
+
+def test_lookups_by_id_are_cached(setup_db):
+    with setup_db.atomic():
+        first = Client.get(id=1)
+        first.company_name = "not saved"
+        with profiled(setup_db) as profile:
+            again = Client.get_by_id(1)
+            contract = Contract.get(Contract.id == 1)
+            contract.client
+
+        assert again is not first
+        assert again.company_name == "client1&co"
+        assert len(profile.statements) == 1
+        assert profile.cache_summary() == {"hits": 2, "misses": 1, "hit_ratio": 0.667}
+
+
+def test_other_lookups_are_not_cached(setup_db):
+    with setup_db.atomic():
+        with profiled(setup_db) as profile:
+            Client.get(Client.email == "client1@gmail.com")
+            Client.get(id=1, email="client1@gmail.com")
+
+        assert profile.cache_summary()["hit_ratio"] is None
+
+
+def test_saved_and_deleted_rows_are_evicted(setup_db):
+    with setup_db.atomic():
+        client = Client.get(id=1)
+        client.company_name = "saved"
+        client.save()
+        user = User.get(id=2)
+        user.delete_instance()
+
+        assert Client.get(id=1).company_name == "saved"
+        assert User.get_or_none(User.id == 2) is None
+
+
+def test_least_recently_used_rows_are_evicted(setup_db, monkeypatch):
+    monkeypatch.setenv("CRM_ROW_CACHE_SIZE", "2")
+    with setup_db.atomic():
+        for user_id in (1, 2, 1, 3):
+            User.get(id=user_id)
+        with profiled(setup_db) as profile:
+            User.get(id=1)
+            User.get(id=2)
+
+        assert profile.cache_summary()["hits"] == 1
+
+
+def test_bulk_update_evicts_the_rows_of_its_model(setup_db):
+    with setup_db.atomic():
+        assert Client.get(id=3).epic_events_contact_id == 5
+        bulk_update(Client, [Client.id == 3], {Client.epic_events_contact: 1})
+
+        assert Client.get(id=3).epic_events_contact_id == 1
+
+
+def test_commands_end_with_an_empty_cache(setup_db, admin_logged):
+    with setup_db.atomic():
+        User.get(id=1)
+        runner.invoke(app, ["client", "get-client", "-i", 3])
+
+        assert not cache._rows
+
+
+def test_profile_reports_the_row_cache(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(
+            app,
+            ["--profile", "--profile-format", "json", "client", "get-client", "-i", 1],
+        )
+        text = runner.invoke(app, ["--profile", "contract", "get-contract", "-i", 2])
+
+        assert json.loads(result.stderr)["cache"] == {
+            "hits": 0,
+            "misses": 1,
+            "hit_ratio": 0.0,
+        }
+        assert "Row cache: 0 hits, 2 misses (0% hits)" in text.stderr
@@ -0,0 +1,112 @@
+from datetime import datetime
+from peewee import PostgresqlDatabase
+from typer.testing import CliRunner
+from crm.__main__ import app
+from crm.models.event import Event
+from crm.models.event_span import EventSpan
+from crm.queries import overlapping, seconds
+
+runner = CliRunner()
+
+
+def calendar(start, end):
+    return runner.invoke(app, ["event", "calendar", "--from", start, "--to", end])
+
+
+def test_calendar_lists_events_and_conflicts(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = calendar("2025-10-12", "2025-10-12")
+        lines = result.output.splitlines()
+
+        assert [line.split(":")[0] for line in lines] == [
+            "Events n°3",
+            "Events n°2",
+            "Events n°1",
+        ]
+        assert lines[0].endswith("Conflicts: support with n°2")
+        assert lines[1].endswith("Conflicts: support with n°3")
+        assert "Conflicts" not in lines[2]
+
+
+def test_calendar_only_overlapping_events(setup_db, admin_logged):
+    with setup_db.atomic():
+        december = calendar("2025-12-12", "2025-12-31")
+        nothing = calendar("2026-01-01", "2026-12-31")
+        invalid = calendar("12/12/2025", "2025-12-31")
+
+        assert "Events n°2" in december.output
+        assert "Events n°1" not in december.output
+        assert "No events between these dates" in nothing.output
+        assert "Non valid format" in invalid.output
+
+
+def test_assign_support_already_booked(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["event", "update-event-direct", "-i", 1, "-s", 3])
+
+        assert (
+            "Support contact Sup is already assigned to the events n°2, n°3"
+            in result.output
+        )
+        assert Event.get(id=1).support_contact is None
+
+
+def test_create_event_support_already_booked(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(
+            app,
+            ["event", "create-event", "-na", "JO", "-l", "Paris", "-a", 10]
+            + ["-ic", 4, "-iu", 3],
+            input="2025-12-01\n2025-12-20\n",
+        )
+
+        assert "is already assigned to the events n°2" in result.output
+        assert Event.select().count() == 3
+
+
+def test_reschedule_removes_conflict(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(
+            app,
+            ["event", "update-event-direct", "-i", 3]
+            + ["-sd", "2025-01-01", "-ed", "2025-02-01"],
+        )
+
+        assert "Event updated succesfully" in result.output
+        assert "Conflicts" not in calendar("2025-01-01", "2025-12-31").output
+
+
+def test_venue_double_booking_warns(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(
+            app, ["event", "update-event-direct", "-i", 1, "-l", "London"]
+        )
+
+        assert "Warning: London is already booked by the events n°2" in result.output
+        assert "Event updated succesfully" in result.output
+        assert "venue with n°2" in calendar("2025-10-12", "2025-10-12").output
+
+
+def test_span_follows_events(setup_db):
+    with setup_db.atomic():
+        event = Event.get(id=3)
+        event.end_date = "2026-03-01"
+        event.save()
+        Event.get(id=1).delete_instance()
+
+        assert EventSpan.select().count() == 2
+        start, end = datetime(2026, 2, 1), datetime(2026, 2, 2)
+        assert [event.id for event in overlapping(Event.select(), start, end)] == [3]
+
+
+def test_overlapping_without_sqlite():
+    # The SQL is only generated, no connection is opened
+    with PostgresqlDatabase("crm").bind_ctx([Event, EventSpan]):
+        sql, params = overlapping(
+            Event.select(Event.id), "2025-01-01", "2025-01-31"
+        ).sql()
+        seconds_sql, _ = Event.select(seconds(Event.start_date)).sql()
+
+    assert "event_span" not in sql
+    assert params == [datetime(2025, 1, 31), datetime(2025, 1, 1)]
+    assert "date_part" in seconds_sql
@@ -0,0 +1,122 @@
+import getpass
+import io
+import os
+import sys
+import threading
+from crm.__main__ import app
+from crm.daemon import Daemon
+from crm.hashing import check_password
+from crm.models.user import User
+from crm.remote import forward, redirected_stdin
+
+
+def forward_in_thread(argv, socket_path, stdin="", terminal=None):
+    """Function to run the thin client in a thread while the test thread serves"""
+    output = io.BytesIO()
+    result = {}
+
+    def target():
+        result["code"] = forward(
+            argv, socket_path, stdin=stdin, stdout=output, terminal=terminal
+        )
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, output, result
+
+
+def test_daemon_forwards_command(setup_db, admin_logged, tmp_path):
+    socket_path = str(tmp_path / "crm.sock")
+    daemon = Daemon(app, socket_path)
+    try:
+        thread, output, result = forward_in_thread(
+            ["client", "list-clients"], socket_path
+        )
+        daemon.handle_request()
+        thread.join(5)
+    finally:
+        daemon.server_close()
+
+    assert result["code"] == 0
+    assert "client1" in output.getvalue().decode()
+
+
+def test_daemon_forwards_stdin(setup_db, admin_logged, tmp_path):
+    socket_path = str(tmp_path / "crm.sock")
+    daemon = Daemon(app, socket_path)
+    try:
+        thread, output, result = forward_in_thread(
+            ["event", "get-event"], socket_path, stdin="1\n"
+        )
+        daemon.handle_request()
+        thread.join(5)
+    finally:
+        daemon.server_close()
+
+    assert "event1" in output.getvalue().decode()
+
+
+def test_daemon_reports_usage_error(setup_db, tmp_path):
+    socket_path = str(tmp_path / "crm.sock")
+    daemon = Daemon(app, socket_path)
+    try:
+        thread, output, result = forward_in_thread(["not-a-command"], socket_path)
+        daemon.handle_request()
+        thread.join(5)
+    finally:
+        daemon.server_close()
+
+    assert result["code"] == 2
+    assert "No such command" in output.getvalue().decode()
+
+
+def test_daemon_forwards_the_prompts_of_a_terminal(setup_db, admin_logged, tmp_path):
+    socket_path = str(tmp_path / "crm.sock")
+    daemon = Daemon(app, socket_path)
+    try:
+        thread, output, result = forward_in_thread(
+            ["event", "get-event"], socket_path, None, io.StringIO("1\n")
+        )
+        daemon.handle_request()
+        thread.join(5)
+    finally:
+        daemon.server_close()
+
+    assert "Enter id of the event" in output.getvalue().decode()
+    assert "event1" in output.getvalue().decode()
+
+
+def test_daemon_forwards_the_hidden_prompts(
+    setup_db, admin_logged, tmp_path, monkeypatch
+):
+    socket_path = str(tmp_path / "crm.sock")
+    passwords = iter(["s3cret", "s3cret"])
+    monkeypatch.setattr(getpass, "getpass", lambda prompt: next(passwords))
+    daemon = Daemon(app, socket_path)
+    try:
+        with setup_db.atomic():
+            thread, output, result = forward_in_thread(
+                ["user", "update-user", "-i", "4"],
+                socket_path,
+                None,
+                io.StringIO("\n\ny\n"),
+            )
+            daemon.handle_request()
+            thread.join(5)
+
+            assert "User updated" in output.getvalue().decode()
+            assert check_password("s3cret", User.get(id=4).password)
+    finally:
+        daemon.server_close()
+
+
+def test_stdin_forwarded_only_when_redirected(tmp_path, monkeypatch):
+    path = tmp_path / "input.txt"
+    path.write_text("1\n")
+    with open(path) as redirected, open(os.devnull) as null:
+        monkeypatch.setattr(sys, "stdin", redirected)
+        assert redirected_stdin() == "1\n"
+        monkeypatch.setattr(sys, "stdin", null)
+        assert redirected_stdin() == ""
+        monkeypatch.setattr(sys, "stdin", io.StringIO("not a file"))
+        assert redirected_stdin() == ""
@@ -0,0 +1,87 @@
+import pytest
+from peewee import SqliteDatabase
+from typer.testing import CliRunner
+from crm.__main__ import app
+from crm.dataset import ADMIN_EMAIL, MODELS, check_scale, generate
+from crm.hashing import check_password
+from crm.models.client import Client
+from crm.models.contract import Contract
+from crm.models.event import Event
+from crm.models.user import User
+
+runner = CliRunner()
+
+
+def seeded_rows(seed):
+    database = SqliteDatabase(":memory:")
+    with database.bind_ctx(MODELS):
+        counts = generate(database, 1000, seed)
+        # The hashes of the passwords are salted
+        rows = [list(User.select(User.name, User.email, User.role).tuples())] + [
+            list(model.select().order_by(model.id).tuples())
+            for model in (Client, Contract, Event)
+        ]
+    database.close()
+    return counts, rows
+
+
+def test_generate_is_deterministic():
+    counts, rows = seeded_rows(12)
+
+    assert counts["users"] == 10
+    assert counts["clients"] == counts["contracts"] == 1000
+    assert 0 < counts["events"] < 1000
+    assert seeded_rows(12) == (counts, rows)
+    assert seeded_rows(13)[1][1] != rows[1]
+
+
+def test_check_scale():
+    assert check_scale("1e5") == 100000
+    with pytest.raises(ValueError):
+        check_scale(999)
+    with pytest.raises(ValueError):
+        check_scale("1e7")
+
+
+def test_seed_refuses_a_database_with_users(setup_db):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["bench", "seed", "--scale", "1000", "--yes-bench"])
+
+        assert "Error: The database already has users, clients, contracts" in result.output
+        assert Client.select().count() == 3
+
+
+def test_seed_refuses_a_database_with_events(setup_db):
+    with setup_db.atomic():
+        User.delete().execute()
+        Client.delete().execute()
+        result = runner.invoke(app, ["bench", "seed", "--scale", "1000", "--yes-bench"])
+
+        assert "Error: The database already has" in result.output
+        assert User.select().count() == 0
+
+
+def test_seed_needs_an_explicit_target(setup_db):
+    with setup_db.atomic():
+        User.delete().execute()
+        result = runner.invoke(app, ["bench", "seed", "--scale", "1000"])
+
+        assert "Error: give the file to fill with --database" in result.output
+        assert User.select().count() == 0
+
+
+def test_seed_a_database_file_with_a_random_password(setup_db, tmp_path):
+    path = tmp_path / "bench.sqlite3"
+    result = runner.invoke(
+        app, ["bench", "seed", "--scale", "1000", "--database", str(path)]
+    )
+    password = result.output.split("the password ")[1].strip()
+
+    database = SqliteDatabase(str(path))
+    with database.bind_ctx([User]):
+        admin = User.get(User.email == ADMIN_EMAIL)
+        assert check_password(password, admin.password)
+        assert not check_password("bench", admin.password)
+    database.close()
+    assert "1000 clients" in result.output
+    assert User.select().count() == 5
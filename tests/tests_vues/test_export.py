@@ -0,0 +1,103 @@
+import csv
+import json
+from io import StringIO
+import pytest
+from typer.testing import CliRunner
+from crm.__main__ import app
+from crm.models.contract import Contract
+from crm.views.export import (
+    arrow_types,
+    contracts_query,
+    events_query,
+    fetch_batches,
+    users_query,
+    write_arrow,
+)
+
+runner = CliRunner()
+
+
+def test_export_clients_jsonl(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["export", "clients"])
+
+        rows = [json.loads(line) for line in result.output.splitlines()]
+        assert [row["first_name"] for row in rows] == ["client1", "client2", "client3"]
+        assert rows[0]["epic_events_contact_name"] == "Com"
+
+
+def test_export_events_csv(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["export", "events", "-f", "csv"])
+
+        rows = list(csv.DictReader(StringIO(result.output)))
+        assert len(rows) == 3
+        assert rows[0]["support_contact_name"] == ""
+        assert rows[1]["support_contact_name"] == "Sup"
+        assert rows[2]["client_id"] == "3"
+
+
+def test_export_contracts_to_file(setup_db, admin_logged, tmp_path):
+    with setup_db.atomic():
+        output = tmp_path / "contracts.jsonl"
+        result = runner.invoke(
+            app, ["export", "contracts", "-o", str(output), "--stats"]
+        )
+
+        assert "5 rows exported" in result.output
+        rows = [json.loads(line) for line in output.read_text().splitlines()]
+        assert rows[1]["client_first_name"] == "client2"
+
+
+def test_export_users_without_password(setup_db):
+    with setup_db.atomic():
+        columns, rows = next(fetch_batches(users_query()))
+
+        assert "password" not in columns
+        assert len(rows) == 5
+
+
+def test_export_invalid_format(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["export", "users", "-f", "xml"])
+
+        assert "Invalid format" in result.output
+
+
+def test_export_without_permission(setup_db, com_logged):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["export", "contracts"])
+
+        assert "You don't have the permissions required" in result.output
+
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_export_arrow_schema_is_the_same_for_every_batch(setup_db, tmp_path, fmt):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    with setup_db.atomic():
+        Contract.update(remaining_amount=2.5).where(Contract.id == 2).execute()
+        tables = {}
+        for name, query in (
+            ("events", events_query()),
+            ("contracts", contracts_query()),
+        ):
+            # One row per batch: the first event has no support contact
+            path = str(tmp_path / f"{name}.{fmt}")
+            count = write_arrow(
+                fetch_batches(query, batch_size=1), path, fmt, arrow_types(query)
+            )
+            if fmt == "parquet":
+                tables[name] = pyarrow.parquet.read_table(path)
+            else:
+                tables[name] = pyarrow.ipc.open_file(path).read_all()
+            assert tables[name].num_rows == count
+
+        events, contracts = tables["events"], tables["contracts"]
+        assert events.schema.field("support_contact_name").type == pyarrow.string()
+        assert events.column("support_contact_id").to_pylist() == [None, 3, 3]
+        assert contracts.schema.field("remaining_amount").type == pyarrow.float64()
+        assert contracts.column("remaining_amount").to_pylist()[:2] == [50000, 2.5]
+        assert contracts.column("status").to_pylist()[:2] == [False, True]
@@ -0,0 +1,45 @@
+from typer.testing import CliRunner
+from crm.__main__ import app
+from crm.hashing import (
+    check_password,
+    hash_password,
+    hash_passwords,
+    needs_rehash,
+    password_pool,
+    password_rounds,
+)
+from crm.models.user import User
+
+runner = CliRunner()
+
+
+def test_hash_password_rounds_from_environment(monkeypatch):
+    monkeypatch.setenv("CRM_BCRYPT_ROUNDS", "5")
+    hashed = hash_password("secret")
+
+    assert password_rounds(hashed) == 5
+    assert check_password("secret", hashed)
+    assert not needs_rehash(hashed)
+    assert needs_rehash(hashed, rounds=6)
+
+
+def test_hash_passwords_over_a_pool():
+    passwords = [f"password{i}" for i in range(8)]
+    with password_pool(2) as pool:
+        hashed = hash_passwords(passwords, pool)
+
+    assert len(hashed) == len(passwords)
+    assert all(check_password(p, h) for p, h in zip(passwords, hashed))
+
+
+def test_login_rehashes_password(setup_db, monkeypatch):
+    with setup_db.atomic():
+        monkeypatch.setenv("CRM_BCRYPT_ROUNDS", "5")
+        result = runner.invoke(
+            app, ["user", "login", "-e", "admin@gmail.com", "-p", "admin"]
+        )
+        password = User.get(email="admin@gmail.com").password
+
+        assert "Welcome Admin" in result.output
+        assert password_rounds(password) == 5
+        assert check_password("admin", password)
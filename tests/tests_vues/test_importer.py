@@ -0,0 +1,212 @@
+import json
+import pytest
+from typer.testing import CliRunner
+from crm.__main__ import app
+from crm.models.client import Client
+from crm.models.contract import Contract
+from crm.models.event import Event
+from crm.models.import_checkpoint import ImportCheckpoint
+from crm.models.user import User
+from crm.hashing import check_password
+from crm.views.importer import client_validator, event_validator, import_file
+
+runner = CliRunner()
+
+CLIENTS_CSV = (
+    "first_name,last_name,email,phone,company_name,epic_events_contact,last_contact\n"
+    "Ada,Lovelace,ada@gmail.com,0102,Engine,1,2024-06-24\n"
+    "Alan,Turing,alan@gmail.com,0103,Enigma,5,\n"
+    "Copy,Cat,ada@gmail.com,0104,Copy,1,\n"
+    "Sup,Port,sup@gmail.com,0105,Support,3,\n"
+    "Bad,Date,bad@gmail.com,0106,Date,1,24/06/2024\n"
+)
+
+
+def test_import_clients(setup_db, admin_logged, tmp_path):
+    with setup_db.atomic():
+        path = tmp_path / "clients.csv"
+        path.write_text(CLIENTS_CSV)
+        result = runner.invoke(app, ["import", "clients", str(path)])
+
+        assert "2 rows imported" in result.output
+        assert "3 rows refused" in result.output
+        assert Client.get(email="ada@gmail.com").last_contact.year == 2024
+        errors = [
+            json.loads(line)
+            for line in (tmp_path / "clients.csv.errors.jsonl").read_text().splitlines()
+        ]
+        assert [error["row"] for error in errors] == [3, 4, 5]
+        assert "already exists" in errors[0]["error"]
+
+
+def test_import_contracts_and_events_jsonl(setup_db, admin_logged, tmp_path):
+    with setup_db.atomic():
+        contracts = tmp_path / "contracts.jsonl"
+        contracts.write_text(
+            json.dumps(
+                {
+                    "client": 1,
+                    "total_amount": 100,
+                    "remaining_amount": 0,
+                    "status": "signed",
+                }
+            )
+            + "\n"
+            + json.dumps({"client": 999, "total_amount": 1, "remaining_amount": 0})
+            + "\n"
+        )
+        result = runner.invoke(app, ["import", "contracts", str(contracts)])
+        assert "1 rows imported" in result.output
+        contract = Contract.get(id=6)
+        assert contract.commercial_contact.id == 1
+
+        events = tmp_path / "events.jsonl"
+        events.write_text(
+            json.dumps(
+                {
+                    "name": "imported",
+                    "contract": 6,
+                    "start_date": "2025-01-01",
+                    "end_date": "2025-01-02",
+                    "location": "lyon",
+                    "attendees": 10,
+                    "support_contact": 3,
+                }
+            )
+            + "\n"
+            + json.dumps({"name": "twice", "contract": 6})
+            + "\n"
+        )
+        result = runner.invoke(app, ["import", "events", str(events)])
+        assert "1 rows imported" in result.output
+        assert Event.get(name="imported").support_contact.id == 3
+
+
+def test_import_resume_from_checkpoint(setup_db, tmp_path):
+    with setup_db.atomic():
+        path = tmp_path / "clients.csv"
+        path.write_text(CLIENTS_CSV)
+        ImportCheckpoint.create(path=str(path), last_row=1)
+        (tmp_path / "clients.csv.errors.jsonl").write_text('{"row": 1}\n')
+        user = Client.get(id=1).epic_events_contact
+
+        imported, refused = import_file(
+            str(path), Client, client_validator(user), chunk_size=2, resume=True
+        )
+
+        assert imported == 2
+        assert refused == 2
+        assert not ImportCheckpoint.select().exists()
+        errors = (tmp_path / "clients.csv.errors.jsonl").read_text().splitlines()
+        assert errors[0] == '{"row": 1}'
+        assert len(errors) == 3
+
+
+def test_import_resume_keeps_the_errors_of_the_interrupted_run(setup_db, tmp_path):
+    with setup_db.atomic():
+        path = tmp_path / "clients.csv"
+        path.write_text(CLIENTS_CSV)
+        ImportCheckpoint.create(path=str(path), last_row=5)
+        (tmp_path / "clients.csv.errors.jsonl").write_text('{"row": 3}\n')
+        user = Client.get(id=1).epic_events_contact
+
+        imported, refused = import_file(
+            str(path), Client, client_validator(user), resume=True
+        )
+
+        assert (imported, refused) == (0, 0)
+        assert (tmp_path / "clients.csv.errors.jsonl").exists()
+
+
+def test_import_resume_after_a_crash(setup_db, tmp_path):
+    with setup_db.atomic():
+        path = tmp_path / "clients.csv"
+        path.write_text(CLIENTS_CSV)
+        user = Client.get(id=1).epic_events_contact
+        count = Client.select().count()
+        chunks = []
+
+        def crash_on_second_chunk(rows):
+            chunks.append(rows)
+            if len(chunks) == 2:
+                raise RuntimeError("interrupted")
+
+        with pytest.raises(RuntimeError):
+            import_file(
+                str(path),
+                Client,
+                client_validator(user),
+                chunk_size=1,
+                prepare=crash_on_second_chunk,
+            )
+        assert ImportCheckpoint.get(path=str(path)).last_row == 1
+
+        imported, refused = import_file(
+            str(path), Client, client_validator(user), chunk_size=1, resume=True
+        )
+
+        assert (imported, refused) == (1, 3)
+        assert Client.select().count() == count + 2
+
+
+def test_import_without_permission(setup_db, com_logged, tmp_path):
+    with setup_db.atomic():
+        path = tmp_path / "contracts.csv"
+        path.write_text("client,total_amount,remaining_amount\n1,10,0\n")
+        result = runner.invoke(app, ["import", "contracts", str(path)])
+
+        assert "You don't have the permissions required" in result.output
+
+
+def test_import_users(setup_db, admin_logged, tmp_path):
+    with setup_db.atomic():
+        path = tmp_path / "users.csv"
+        path.write_text(
+            "name,email,password,role\n"
+            "Grace,grace@gmail.com,hopper,Support\n"
+            "Linus,linus@gmail.com,torvalds,gestion\n"
+            "Copy,com@gmail.com,copy,Support\n"
+            "Nobody,nobody@gmail.com,pw-nobody,Boss\n"
+        )
+        result = runner.invoke(app, ["import", "users", str(path)])
+
+        assert "2 rows imported" in result.output
+        assert "2 rows refused" in result.output
+        grace = User.get(email="grace@gmail.com")
+        assert grace.role.name == "Support"
+        assert check_password("hopper", grace.password)
+        assert "pw-nobody" not in (tmp_path / "users.csv.errors.jsonl").read_text()
+
+
+def test_import_events_refuses_double_bookings(setup_db, tmp_path):
+    with setup_db.atomic():
+        contracts = [
+            Contract.create(
+                client=1,
+                total_amount=10,
+                remaining_amount=0,
+                commercial_contact=1,
+                status=True,
+            ).id
+            for _ in range(4)
+        ]
+        path = tmp_path / "events.csv"
+        path.write_text(
+            "name,contract,start_date,end_date,location,attendees,support_contact\n"
+            f"busy,{contracts[0]},2025-11-01,2025-11-02,nice,10,3\n"
+            f"first,{contracts[1]},2026-01-01,2026-01-03,lyon,10,\n"
+            f"second,{contracts[2]},2026-01-03,2026-01-04,Lyon,10,\n"
+            f"free,{contracts[3]},2026-01-04,2026-01-05,nice,10,3\n"
+        )
+        user = User.get(id=4)
+
+        imported, refused = import_file(str(path), Event, event_validator(user))
+
+        errors = [
+            json.loads(line)
+            for line in (tmp_path / "events.csv.errors.jsonl").read_text().splitlines()
+        ]
+        assert (imported, refused) == (2, 2)
+        assert [error["row"] for error in errors] == [1, 3]
+        assert "support contact 3 is already assigned" in errors[0]["error"]
+        assert "Lyon is already booked" in errors[1]["error"]
@@ -0,0 +1,64 @@
+import subprocess
+import sys
+from typer.testing import CliRunner
+from crm.__main__ import app, COMMANDS
+
+runner = CliRunner()
+
+# Regression threshold of the cumulative import time of crm.__main__
+STARTUP_BUDGET_US = 1_000_000
+
+
+def import_times(statement):
+    """Function to run statement with python -X importtime.
+    Returns a dict: module name -> cumulative import time in microseconds"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_startup_does_not_import_views():
+    times = import_times("import crm.__main__")
+
+    assert not [name for name in times if name.startswith("crm.views")]
+    assert "bcrypt" not in times
+    assert "sentry_sdk" not in times
+
+
+def test_startup_budget():
+    times = import_times("import crm.__main__")
+
+    assert times["crm.__main__"] < STARTUP_BUDGET_US
+
+
+def test_help_from_manifest():
+    times = import_times(
+        "import sys; from crm.__main__ import app; sys.argv = ['crm', '--help']\n"
+        "try:\n    app()\nexcept SystemExit:\n    pass"
+    )
+
+    assert not [name for name in times if name.startswith("crm.views")]
+
+
+def test_help_lists_sub_apps():
+    result = runner.invoke(app, ["--help"])
+
+    for name in COMMANDS:
+        assert name in result.output
+
+
+def test_sub_app_loaded_on_demand():
+    result = runner.invoke(app, ["user", "--help"])
+
+    assert "list-users" in result.output
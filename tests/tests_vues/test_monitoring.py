@@ -0,0 +1,116 @@
+import json
+import fcntl
+import os
+import threading
+from typer.testing import CliRunner
+from crm import monitoring
+from crm.__main__ import app
+
+runner = CliRunner()
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as jsonl_file:
+        return [json.loads(line) for line in jsonl_file]
+
+
+def test_capture_message_is_spooled():
+    assert monitoring.capture_message("Contract sign: 1") is True
+
+    records = read_jsonl(monitoring.spool_path())
+    assert records[0]["message"] == "Contract sign: 1"
+    assert records[0]["type"] == "message"
+
+
+def test_capture_exception_is_spooled():
+    try:
+        raise ValueError("boom")
+    except ValueError as e:
+        monitoring.capture_exception(e)
+
+    record = read_jsonl(monitoring.spool_path())[0]
+    assert record["exception"] == "ValueError"
+    assert "boom" in record["traceback"]
+
+
+def test_sample_rate_per_command(monkeypatch):
+    monkeypatch.setenv("CRM_SENTRY_SAMPLE_RATE", "0.5")
+    monkeypatch.setenv("CRM_SENTRY_SAMPLE_RATES", "user=0.2,user update-user=0")
+
+    assert monitoring.sample_rate("user update-user") == 0
+    assert monitoring.sample_rate("user create-user") == 0.2
+    assert monitoring.sample_rate("contract create-contract") == 0.5
+
+
+def test_sampled_out_event_is_dropped(monkeypatch):
+    monkeypatch.setenv("CRM_SENTRY_SAMPLE_RATE", "0")
+
+    assert monitoring.capture_message("dropped") is False
+    assert not os.path.exists(monitoring.spool_path())
+
+
+def test_drain_spool_with_local_dsn(monkeypatch):
+    monkeypatch.setattr(monitoring, "_initialized", False)
+    monitoring.capture_message("User created: 6 - Jean")
+    monitoring.capture_message("User updated: 6 - Jean")
+
+    assert monitoring.drain_spool() == 2
+    assert not os.path.exists(monitoring.spool_path())
+    messages = [
+        event.get("message") for event in read_jsonl(os.getenv("CRM_SENTRY_LOCAL_FILE"))
+    ]
+    assert "User created: 6 - Jean" in messages
+    assert "User updated: 6 - Jean" in messages
+
+
+def test_one_drainer_at_a_time(monkeypatch):
+    monkeypatch.setattr(monitoring, "_initialized", False)
+    monitoring.capture_message("Contract signed: 1")
+    with open(f"{monitoring.spool_path()}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        assert monitoring.drain_spool() == 0
+        assert os.path.exists(monitoring.spool_path())
+
+    assert monitoring.drain_spool() == 1
+    assert monitoring.drain_spool() == 0
+
+
+def test_append_waits_for_the_drain():
+    with open(f"{monitoring.spool_path()}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        thread = threading.Thread(target=monitoring.capture_message, args=["late"])
+        thread.start()
+        thread.join(0.2)
+
+        assert thread.is_alive()
+        assert not os.path.exists(monitoring.spool_path())
+
+    thread.join(5)
+    assert read_jsonl(monitoring.spool_path())[0]["message"] == "late"
+
+
+def test_nothing_spooled_without_dsn(monkeypatch):
+    monkeypatch.delenv("SENTRY_DSN")
+
+    assert monitoring.capture_message("Contract signed: 1") is False
+    assert not os.path.exists(monitoring.spool_path())
+
+
+def test_spool_next_to_the_database(monkeypatch, tmp_path):
+    monkeypatch.delenv("CRM_SENTRY_SPOOL")
+    monkeypatch.setattr("crm.config.db.database", str(tmp_path / "crm.sqlite3"))
+    monkeypatch.chdir("/")
+
+    assert monitoring.spool_path() == str(tmp_path / "sentry_spool.jsonl")
+
+
+def test_command_message_is_spooled(setup_db, admin_logged):
+    with setup_db.atomic():
+        runner.invoke(
+            app, ["contract", "update-contract-direct", "-i", 1, "-s", "signed"]
+        )
+
+    record = read_jsonl(monitoring.spool_path())[0]
+    assert record["message"] == "Contract signed: 1"
+    assert record["command"] == "contract update-contract-direct"
@@ -1,4 +1,13 @@
 from crm.auth import check_user_and_permissions
+from crm.models.permission import Permission
+from crm.models.permission_index import (
+    bump_epoch,
+    current_epoch,
+    forget_epoch,
+    get_role_permissions,
+)
+from crm.models.permission_epoch import PermissionEpoch
+from crm.models.rolepermission import RolePermission
 from unittest.mock import patch
 
 
@@ -23,3 +32,71 @@ def test_not_permission_no_user(setup_db):
             result = check_user_and_permissions(user, "create-contract")
             assert result is False
             mock_echo.assert_called_once_with("Authentication required")
+
+
+def test_permission_index_cached(setup_db, com_logged):
+    with setup_db.atomic():
+        com_logged.has_permission("create-client")
+        with patch("crm.models.permission_index.load_permission_index") as mock_load:
+            assert com_logged.has_permission("create-client") is True
+            assert com_logged.has_permission("delete-client") is False
+            mock_load.assert_not_called()
+
+
+def test_permission_index_invalidated_on_write(setup_db, com_logged):
+    with setup_db.atomic():
+        assert com_logged.has_permission("delete-client") is False
+        permission = Permission.get(name="delete-client")
+        RolePermission.create(role=com_logged.role, permission=permission)
+
+        assert com_logged.has_permission("delete-client") is True
+
+
+def test_permission_index_reloaded_in_a_new_epoch(setup_db, com_logged):
+    with setup_db.atomic():
+        com_logged.has_permission("create-client")
+        # Another process changed the permissions before this command
+        bump_epoch()
+        forget_epoch()
+        with patch(
+            "crm.models.permission_index.load_permission_index", return_value={}
+        ) as mock_load:
+            assert com_logged.has_permission("create-client") is False
+            mock_load.assert_called_once()
+
+
+def test_epoch_starts_after_the_commit(setup_db, com_logged):
+    epoch = current_epoch()
+    permission = Permission.get(name="delete-client")
+    with setup_db.atomic():
+        RolePermission.create(role=com_logged.role, permission=permission)
+        assert current_epoch() == epoch
+    assert current_epoch() != epoch
+
+
+def test_rolled_back_write_keeps_the_epoch(setup_db, com_logged):
+    epoch = current_epoch()
+    permission = Permission.get(name="delete-client")
+    with setup_db.atomic() as transaction:
+        RolePermission.create(role=com_logged.role, permission=permission)
+        assert "delete-client" in get_role_permissions(com_logged.role_id)
+        transaction.rollback(False)
+
+    assert current_epoch() == epoch
+    assert "delete-client" not in get_role_permissions(com_logged.role_id)
+
+
+def test_epoch_read_once_per_command(setup_db, count_queries):
+    with setup_db.atomic():
+        PermissionEpoch.replace(id=1, epoch=7).execute()
+        with count_queries() as profile:
+            epochs = [current_epoch(), current_epoch()]
+        # Changed by another process during the command
+        PermissionEpoch.replace(id=1, epoch=8).execute()
+        during = current_epoch()
+        forget_epoch()
+
+        assert epochs == [7, 7]
+        assert len(profile.statements) == 1
+        assert during == 7
+        assert current_epoch() == 8
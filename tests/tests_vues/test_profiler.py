@@ -0,0 +1,65 @@
+import json
+from typer.testing import CliRunner
+from crm import audit
+from crm.__main__ import app
+from crm.models.client import Client
+from crm.models.event import Event
+from crm.profiler import Profile, fingerprint, profiled
+
+runner = CliRunner(mix_stderr=False)
+
+
+def test_fingerprint_ignores_the_length_of_lists():
+    assert fingerprint('SELECT 1 FROM "t"\n WHERE id IN (?, ?,?)') == fingerprint(
+        'SELECT 1 FROM "t" WHERE id IN (?)'
+    )
+
+
+def test_repeated_statements_are_grouped(setup_db):
+    with setup_db.atomic():
+        with profiled(setup_db) as profile:
+            for event in Event.select():
+                event.contract.total_amount
+        summary = profile.summary(top=2)
+
+        assert summary["statements"] == 4
+        assert summary["repeated"][0]["count"] == 3
+        assert '"contract"' in summary["repeated"][0]["sql"]
+        assert len(summary["slowest"]) == 2
+        assert summary["p95_ms"] == max(row["ms"] for row in summary["slowest"])
+    assert "cursor" not in vars(setup_db)
+
+
+def test_executemany_is_one_statement(setup_db):
+    with setup_db.atomic():
+        client = Client.get(id=1)
+        with profiled(setup_db) as profile:
+            for name in ("a", "b"):
+                client.company_name = name
+                client.save()
+            audit.flush()
+        summary = profile.summary(top=3)
+
+    inserts = [row for row in summary["slowest"] if '"audit_entry"' in row["sql"]]
+    assert [row["params"] for row in inserts] == [["2 rows"]]
+
+
+def test_summary_of_no_statement():
+    assert Profile().summary()["statements"] == 0
+
+
+def test_profile_option_reports_on_stderr(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(
+            app,
+            ["--profile", "--profile-format", "json", "client", "get-client", "-i", 1],
+        )
+        text = runner.invoke(app, ["--profile", "user", "list-users"])
+        wrong = runner.invoke(app, ["--profile", "--profile-format", "xml", "user"])
+
+        summary = json.loads(result.stderr)
+        assert "client1" in result.stdout
+        assert len(summary["slowest"]) == min(5, summary["statements"])
+        assert any('FROM "client"' in row["sql"] for row in summary["slowest"])
+        assert "statements in" in text.stderr
+        assert wrong.exit_code != 0
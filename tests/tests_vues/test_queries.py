@@ -0,0 +1,71 @@
+import pytest
+from typer.testing import CliRunner
+from crm.__main__ import app
+from crm.views.output import echo_lines
+from unittest.mock import patch
+
+runner = CliRunner()
+
+
+def run_counted(count_queries, args):
+    with count_queries() as profile:
+        result = runner.invoke(app, args)
+    assert "rror" not in result.output
+    return len(profile.statements)
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["event", "list-events"],
+        ["contract", "list-contracts"],
+        ["user", "list-users"],
+    ],
+)
+def test_list_query_count_is_constant(
+    setup_db, admin_logged, count_queries, add_rows, args
+):
+    with setup_db.atomic():
+        run_counted(count_queries, args)
+        small = run_counted(count_queries, args)
+        add_rows(20)
+        large = run_counted(count_queries, args)
+
+        assert small == large
+
+
+def test_list_events_without_support(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["event", "list-events", "-son", "no support"])
+
+        assert "event1" in result.output
+        assert "Support contact: \n" in result.output
+
+
+def test_list_events_page(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(
+            app, ["event", "list-events", "--after-id", 1, "--limit", 1]
+        )
+
+        assert "event1" not in result.output
+        assert "event2" in result.output
+        assert "event3" not in result.output
+
+
+def test_list_clients_after_last_page(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["client", "list-clients", "--after-id", 3])
+
+        assert "clients not found" in result.output
+
+
+def test_echo_lines_writes_in_batches():
+    with patch("typer.echo") as mock_echo:
+        count = echo_lines(
+            (f"line {i}" for i in range(5)), flush_lines=2, flush_seconds=60
+        )
+
+    assert count == 5
+    assert mock_echo.call_count == 3
+    mock_echo.assert_any_call("line 0\nline 1")
@@ -0,0 +1,59 @@
+import pytest
+from typer.testing import CliRunner
+from crm import cache
+from crm.__main__ import app
+
+runner = CliRunner()
+
+# Statements allowed per command, whatever the number of rows. A write also
+# counts the executemany of its journal entries, a permission check the read
+# of the permissions epoch
+BUDGETS = [
+    (["user", "list-users"], 1),
+    (["client", "list-clients"], 1),
+    (["contract", "list-contracts"], 1),
+    (["contract", "list-contracts", "-s", "signed"], 1),
+    (["event", "list-events"], 1),
+    (["event", "list-events", "-son", "no support"], 1),
+    (["user", "get-user", "-i", 2], 2),
+    (["client", "get-client", "-i", 2], 1),
+    (["contract", "get-contract", "-i", 2], 3),
+    (["event", "get-event", "-i", 2], 3),
+    (["event", "calendar", "--from", "2025-01-01", "--to", "2025-12-31"], 4),
+    (["search", "clients", "client*"], 2),
+    (["search", "events", "paris"], 2),
+    (["report", "receivables"], 2),
+    (["audit", "show"], 1),
+    (["export", "events"], 2),
+    (["user", "update-user-direct", "-i", 2, "-n", "Renamed"], 6),
+    (["client", "update-client-direct", "-i", 2, "-c", "New Co"], 5),
+    (["contract", "update-contract-direct", "-i", 2, "-r", 0], 7),
+    (["event", "update-event-direct", "-i", 2, "-l", "lyon"], 9),
+    (["contract", "create-contract", "-i", 2, "-t", 100, "-r", 50], 7),
+    (["contract", "bulk-update", "--client", 1, "--set-remaining", 0], 6),
+    (["event", "auto-assign", "--dry-run"], 7),
+    (["event", "auto-assign"], 9),
+]
+
+
+@pytest.mark.parametrize(
+    "args, budget", BUDGETS, ids=[" ".join(map(str, args)) for args, _ in BUDGETS]
+)
+def test_command_query_budget(
+    setup_db, admin_logged, query_budget, add_rows, args, budget
+):
+    with setup_db.atomic():
+        # The caches of the process are warmed by a first run
+        runner.invoke(app, args, input="n\n")
+        counts = []
+        for rows in (0, 25):
+            add_rows(rows)
+            # A command starts with an empty row cache
+            cache.clear()
+            with query_budget(budget) as profile:
+                result = runner.invoke(app, args, input="n\n")
+            assert "rror" not in result.output
+            counts.append(len(profile.statements))
+
+        # No statement per row
+        assert counts[0] == counts[1]
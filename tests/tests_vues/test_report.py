@@ -0,0 +1,81 @@
+from peewee import PostgresqlDatabase
+from typer.testing import CliRunner
+from crm.__main__ import app
+from crm.models.contract import Contract
+from crm.models.receivable_summary import ReceivableSummary
+from crm.views.report import receivables
+
+runner = CliRunner()
+
+
+def assert_summary_matches_contracts():
+    for by in ("contact", "client", "month"):
+        assert sorted(receivables(ReceivableSummary, by)) == sorted(
+            receivables(Contract, by)
+        )
+
+
+def test_report_by_contact(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["report", "receivables"])
+
+        assert (
+            "Contact n°1 Com: 2 contracts, Total: 160000.00, Paid: 110000.00, "
+            "Outstanding: 50000.00" in result.output
+        )
+        assert "All: 5 contracts, Total: 187000.00" in result.output
+
+
+def test_report_by_client_and_month(setup_db, admin_logged):
+    with setup_db.atomic():
+        by_client = runner.invoke(app, ["report", "receivables", "-b", "client"])
+        month = Contract.get(id=1).created_at.strftime("%Y-%m")
+        by_month = runner.invoke(app, ["report", "receivables", "-b", "month"])
+        other_month = runner.invoke(app, ["report", "receivables", "-m", "1999-01"])
+
+        assert "Client n°2 client2 second: 3 contracts" in by_client.output
+        assert f"Month {month}: 5 contracts" in by_month.output
+        assert "No contracts in the database" in other_month.output
+
+
+def test_summary_follows_contracts(setup_db):
+    with setup_db.atomic():
+        assert_summary_matches_contracts()
+
+        contract = Contract.get(id=1)
+        contract.remaining_amount = 0
+        contract.client = 3
+        contract.save()
+        assert_summary_matches_contracts()
+
+        Contract.create(
+            client=1,
+            total_amount=500,
+            remaining_amount=500,
+            commercial_contact=1,
+            created_at="2023-01-15 10:00:00",
+        )
+        assert_summary_matches_contracts()
+
+        Contract.get(id=2).delete_instance()
+        Contract.delete().where(Contract.client == 3).execute()
+        assert_summary_matches_contracts()
+        assert (
+            not ReceivableSummary.select()
+            .where(ReceivableSummary.contracts == 0)
+            .exists()
+        )
+
+
+def test_report_invalid_group(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["report", "receivables", "-b", "year"])
+
+        assert "Invalid group" in result.output
+
+
+def test_report_by_month_without_sqlite():
+    with PostgresqlDatabase("crm").bind_ctx([Contract]):
+        sql, _ = receivables(Contract, "month").sql()
+
+    assert "to_char" in sql
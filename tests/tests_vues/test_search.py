@@ -0,0 +1,71 @@
+from typer.testing import CliRunner
+from crm.__main__ import app
+import crm.views.search
+from crm.models.client import Client
+from crm.models.event import Event
+from crm.views.search import search_clients, search_events, search_terms
+
+runner = CliRunner()
+
+
+def test_search_terms():
+    assert search_terms("par*") == "par*"
+    assert search_terms("client1@gmail.com") == '"client1@gmail.com"'
+    assert search_terms("paris OR london") == "paris OR london"
+    assert search_terms('say "hi"') == 'say """hi"""'
+
+
+def test_search_clients(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["search", "clients", "client3"])
+
+        assert "Client n°3: [client3] third" in result.output
+        assert "Client n°1" not in result.output
+
+
+def test_search_clients_prefix_and_email(setup_db):
+    with setup_db.atomic():
+        prefix = [row["rowid"] for row in search_clients("clie*", 10).dicts()]
+        email = [
+            row["rowid"] for row in search_clients("client2@gmail.com", 10).dicts()
+        ]
+
+    assert sorted(prefix) == [1, 2, 3]
+    assert email == [2]
+
+
+def test_search_index_follows_changes(setup_db):
+    with setup_db.atomic():
+        client = Client.get(id=1)
+        client.company_name = "Zeppelin"
+        client.save()
+        Client.get(id=2).delete_instance()
+
+        assert [row["rowid"] for row in search_clients("zeppelin", 10).dicts()] == [1]
+        assert not list(search_clients("client2", 10))
+
+
+def test_search_events_ranked(setup_db, admin_logged):
+    with setup_db.atomic():
+        Event.update(notes="paris paris paris").where(Event.id == 3).execute()
+        ranked = [row["rowid"] for row in search_events("paris", 10).dicts()]
+        result = runner.invoke(app, ["search", "events", "party"])
+
+        assert ranked == [3, 1]
+        assert "Event n°1: event1" in result.output
+        assert "[party]" in result.output.lower()
+
+
+def test_search_nothing_found(setup_db, admin_logged):
+    with setup_db.atomic():
+        result = runner.invoke(app, ["search", "events", "nowhere"])
+
+        assert "No events found" in result.output
+
+
+def test_search_refused_without_sqlite(setup_db, admin_logged, monkeypatch):
+    monkeypatch.setattr(crm.views.search, "is_sqlite", lambda database: False)
+    with setup_db.atomic():
+        result = runner.invoke(app, ["search", "clients", "client1"])
+
+    assert "Error: The full-text search needs the SQLite backend" in result.output